@@ -0,0 +1,91 @@
+"""
+Benchmark do Enquadramento das Mensagens dos Canais
+
+Envia mensagens com prefixo de tamanho por um par de sockets e as lê de
+duas formas: com Connection.receive, que usa recv_into em um buffer
+reaproveitado, e com a leitura ingênua, que cria bytes novos a cada
+recv e os concatena. Mede a vazão e a memória alocada durante a
+leitura.
+
+Uso:
+    python benchmarks/channel_framing.py --size 64 --messages 100000
+    python benchmarks/channel_framing.py --size 1000000 --messages 200
+"""
+
+import argparse
+import socket
+import sys
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from minipar.channel import CLOSED, HEADER, Connection  # noqa: E402
+from minipar.serialization import decode, encode  # noqa: E402
+
+
+def naive_receive(sock: socket.socket) -> object:
+    header = b''
+    while len(header) < HEADER.size:
+        chunk = sock.recv(HEADER.size - len(header))
+        if not chunk:
+            return CLOSED
+        header += chunk
+    (length,) = HEADER.unpack(header)
+    data = b''
+    while len(data) < length:
+        data += sock.recv(length - len(data))
+    return decode(data)
+
+
+def measure(size: int, messages: int, naive: bool) -> tuple[float, int]:
+    reader, writer = socket.socketpair()
+    text = 'x' * size
+    payload = encode(text)
+    frame = HEADER.pack(len(payload)) + payload
+
+    def produce():
+        for _ in range(messages):
+            writer.sendall(frame)
+        writer.close()
+
+    producer = threading.Thread(target=produce)
+    connection = Connection(reader)
+    tracemalloc.start()
+    start = time.perf_counter()
+    producer.start()
+    received = 0
+    while True:
+        message = naive_receive(reader) if naive else connection.receive()
+        if message is CLOSED:
+            break
+        if len(message) != size:
+            raise SystemExit('mensagem corrompida')
+        received += 1
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    producer.join()
+    reader.close()
+    if received != messages:
+        raise SystemExit(f'{received} de {messages} mensagens')
+    return elapsed, peak
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    arg_parser.add_argument('--size', type=int, default=64)
+    arg_parser.add_argument('--messages', type=int, default=100_000)
+    args = arg_parser.parse_args()
+
+    total = args.size * args.messages / 1024 / 1024
+    for name, naive in (('ingênua', True), ('recv_into', False)):
+        elapsed, peak = measure(args.size, args.messages, naive)
+        print(
+            f'{name:<10}{args.messages / elapsed:>12.0f} mensagens/s'
+            f'{total / elapsed:>10.1f} MiB/s'
+            f'{peak / 1024:>12.1f} KiB de pico'
+        )
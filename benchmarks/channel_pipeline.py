@@ -0,0 +1,139 @@
+"""
+Benchmark do Envio em Pipeline pelos Canais
+
+Sobe um servidor que devolve o dobro de cada número em um processo
+separado e, de um cliente Minipar, envia --requests pedidos de três
+formas: com send, esperando cada resposta antes do próximo pedido; com
+send_async, enviando todos e lendo as respostas depois com receive; e
+com send_many, que envia o lote em uma única escrita. Com --delay, o
+servidor espera esse tempo em milissegundos a cada pedido.
+
+Uso:
+    python benchmarks/channel_pipeline.py --requests 5000
+    python benchmarks/channel_pipeline.py --mode thread --backend vm
+"""
+
+import argparse
+import signal
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from minipar.interpreter import Minipar  # noqa: E402
+
+SERVER = """
+import sys
+sys.path.insert(0, sys.argv[3])
+from minipar.interpreter import Minipar
+Minipar().run(sys.argv[1], backend=sys.argv[2])
+"""
+
+SOURCE = """
+func dobro(x: number) -> number {
+  DELAY
+  return x * 2
+}
+var description: string = "DOBRO"
+s_channel server {dobro, description, "localhost", PORT, "MODE"}
+"""
+
+CLIENTS = {
+    'send': """
+c_channel c {"localhost", PORT}
+var total: number = 0
+for (var i: number in range(REQUESTS)) {
+  var r: number = c.send(i)
+  total = total + r
+}
+print(total)
+c.close()
+""",
+    'send_async': """
+c_channel c {"localhost", PORT}
+var handles: list = []
+for (var i: number in range(REQUESTS)) {
+  handles.append(c.send_async(i))
+}
+var total: number = 0
+for (var h: number in handles) {
+  var r: number = c.receive(h)
+  total = total + r
+}
+print(total)
+c.close()
+""",
+    'send_many': """
+c_channel c {"localhost", PORT}
+var total: number = 0
+for (var r: number in c.send_many(range(REQUESTS))) {
+  total = total + r
+}
+print(total)
+c.close()
+""",
+}
+
+
+def wait_server(port: int):
+    for _ in range(100):
+        try:
+            socket.create_connection(('localhost', port)).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise SystemExit('o servidor não respondeu')
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    arg_parser.add_argument(
+        '--mode', choices=['thread', 'async', 'process'], default='thread'
+    )
+    arg_parser.add_argument('--requests', type=int, default=5000)
+    arg_parser.add_argument('--delay', type=float, default=0)
+    arg_parser.add_argument('--port', type=int, default=8586)
+    arg_parser.add_argument(
+        '--backend', choices=['tree', 'closure', 'vm', 'python'], default='vm'
+    )
+    args = arg_parser.parse_args()
+
+    delay = f'sleep({args.delay / 1000})' if args.delay else ''
+    source = (
+        SOURCE
+        .replace('DELAY', delay)
+        .replace('PORT', str(args.port))
+        .replace('MODE', args.mode)
+    )
+    server = subprocess.Popen(
+        [sys.executable, '-c', SERVER, source, args.backend, str(ROOT)],
+        stdout=subprocess.DEVNULL,
+    )
+    expected = f'DOBRO\n{args.requests * (args.requests - 1)}\n'
+    try:
+        wait_server(args.port)
+        for name, template in CLIENTS.items():
+            client = template.replace('PORT', str(args.port)).replace(
+                'REQUESTS', str(args.requests)
+            )
+            start = time.perf_counter()
+            output = Minipar().run(client, backend=args.backend)
+            elapsed = time.perf_counter() - start
+            if output != expected:
+                raise SystemExit(f'saída inesperada de {name}: {output!r}')
+            print(
+                f'{name:<12}{args.requests / elapsed:>10.0f} pedidos/s'
+                f'{elapsed * 1000:>10.1f} ms'
+            )
+    finally:
+        # Com SIGINT, o servidor do modo process encerra os seus processos
+        server.send_signal(signal.SIGINT)
+        try:
+            server.wait(5)
+        except subprocess.TimeoutExpired:
+            server.kill()
+            server.wait()
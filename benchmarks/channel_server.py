@@ -0,0 +1,115 @@
+"""
+Benchmark dos Modos do Servidor dos Canais
+
+Sobe o servidor da calculadora (examples/minipar/server.minipar) em um
+processo separado, abre milhares de conexões ociosas e mede as threads
+e a memória residente do servidor, somando os processos do modo
+`process`. Depois, cada conexão envia uma expressão e o tempo até todas
+as respostas chegarem é medido. Com --terms, a expressão tem mais
+termos e a função do canal passa a usar mais CPU.
+
+Uso:
+    python benchmarks/channel_server.py --mode async --clients 5000
+    python benchmarks/channel_server.py --mode process --terms 200
+"""
+
+import argparse
+import asyncio
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from minipar.channel import receive_message, write_message  # noqa: E402
+
+SERVER = """
+import sys
+sys.path.insert(0, sys.argv[3])
+from minipar.interpreter import Minipar
+Minipar().run(sys.argv[1], backend=sys.argv[2])
+"""
+
+
+def status(pid: int) -> tuple[int, int, int]:
+    """Processos, threads e memória residente em kB do servidor"""
+    with open(f'/proc/{pid}/task/{pid}/children', encoding='ascii') as f:
+        pids = [pid, *map(int, f.read().split())]
+    threads = rss = 0
+    for process in pids:
+        with open(f'/proc/{process}/status', encoding='ascii') as f:
+            fields = dict(line.split(':', 1) for line in f if ':' in line)
+        threads += int(fields['Threads'])
+        rss += int(fields['VmRSS'].split()[0])
+    return len(pids), threads, rss
+
+
+async def connect(port: int, clients: int) -> list:
+    connections = []
+    for _ in range(clients):
+        reader, writer = await asyncio.open_connection('localhost', port)
+        await receive_message(reader)
+        connections.append((reader, writer))
+    return connections
+
+
+async def request(reader, writer, message: str) -> str:
+    write_message(writer, message)
+    await writer.drain()
+    return await receive_message(reader)
+
+
+async def main(args: argparse.Namespace, pid: int):
+    connections = await connect(args.port, args.clients)
+    await asyncio.sleep(0.5)
+    processes, threads, rss = status(pid)
+    print(f'conexões ociosas  {args.clients}')
+    print(f'processos         {processes}')
+    print(f'threads           {threads}')
+    print(f'memória residente {rss} kB')
+
+    message = ' + '.join(['1'] * args.terms)
+    start = time.perf_counter()
+    replies = await asyncio.gather(
+        *(request(*c, message) for c in connections)
+    )
+    elapsed = time.perf_counter() - start
+    if set(replies) != {str(args.terms)}:
+        raise SystemExit(f'respostas inesperadas: {set(replies)}')
+    print(f'requisições/s     {args.clients / elapsed:.0f}')
+
+    for _, writer in connections:
+        writer.close()
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    arg_parser.add_argument(
+        '--mode', choices=['thread', 'async', 'process'], default='async'
+    )
+    arg_parser.add_argument('--clients', type=int, default=2000)
+    arg_parser.add_argument('--terms', type=int, default=2)
+    arg_parser.add_argument('--port', type=int, default=8585)
+    arg_parser.add_argument(
+        '--backend', choices=['tree', 'closure', 'vm'], default='tree'
+    )
+    args = arg_parser.parse_args()
+
+    source = (ROOT / 'examples' / 'minipar' / 'server.minipar').read_text(
+        encoding='utf-8'
+    )
+    source = source.replace(
+        '"localhost", 8585}', f'"localhost", {args.port}, "{args.mode}"}}'
+    )
+    server = subprocess.Popen(
+        [sys.executable, '-c', SERVER, source, args.backend, str(ROOT)],
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        time.sleep(1)
+        asyncio.run(main(args, server.pid))
+    finally:
+        server.kill()
+        server.wait()
@@ -0,0 +1,70 @@
+"""
+Benchmark da Serialização dos Valores dos Canais
+
+Compara a codificação binária dos canais com o texto que os programas
+montavam à mão antes dela, representado aqui por JSON: tamanho da
+mensagem e tempo de codificar e decodificar. Os vetores numéricos
+homogêneos usam o caminho rápido da codificação; a lista mista e o
+dicionário passam pelo caminho geral.
+
+Uso:
+    python benchmarks/channel_values.py --size 1000
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from minipar.serialization import decode, encode  # noqa: E402
+
+
+def values(size: int) -> dict[str, object]:
+    rng = random.Random(1)
+    return {
+        'pesos (float)': [rng.uniform(-1, 1) for _ in range(size)],
+        'contagens (int)': [rng.randrange(100_000) for _ in range(size)],
+        'lista mista': [
+            rng.choice([rng.random(), rng.randrange(100), 'abc', True])
+            for _ in range(size)
+        ],
+        'dicionário': {
+            f'chave{i}': [rng.random(), i] for i in range(size // 10)
+        },
+    }
+
+
+def timed(function, runs: int) -> float:
+    start = time.perf_counter()
+    for _ in range(runs):
+        function()
+    return (time.perf_counter() - start) / runs
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    arg_parser.add_argument('--size', type=int, default=1000)
+    arg_parser.add_argument('--runs', type=int, default=200)
+    args = arg_parser.parse_args()
+
+    print(
+        f'{"valor":<18}{"texto":>10}{"binário":>10}{"razão":>8}'
+        f'{"texto µs":>12}{"binário µs":>12}'
+    )
+    for name, value in values(args.size).items():
+        text = json.dumps(value).encode()
+        data = encode(value)
+        if decode(data) != value:
+            raise SystemExit(f'{name}: valor diferente após decodificar')
+        text_time = timed(lambda: json.loads(json.dumps(value)), args.runs)
+        binary_time = timed(lambda: decode(encode(value)), args.runs)
+        print(
+            f'{name:<18}{len(text):>10}{len(data):>10}'
+            f'{len(data) / len(text):>8.2f}'
+            f'{text_time * 1e6:>12.1f}{binary_time * 1e6:>12.1f}'
+        )
@@ -0,0 +1,83 @@
+"""
+Benchmark do Programa Compilado
+
+Executa o mesmo programa com centenas de entradas, como um corretor
+automático, de três formas: Minipar.run sem o cache de programas,
+Minipar.run com o cache e Minipar.compile seguido de run() para cada
+entrada.
+
+Uso:
+    python benchmarks/compiled_program.py --inputs 500 --backend vm
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from minipar import interpreter  # noqa: E402
+from minipar.cache import ProgramCache  # noqa: E402
+from minipar.interpreter import Minipar  # noqa: E402
+
+EXAMPLE = ROOT / 'examples' / 'minipar' / 'quicksort.minipar'
+
+
+def inputs(count: int) -> list[str]:
+    rng = random.Random(1)
+    return [
+        ' '.join(str(rng.randint(0, 99)) for _ in range(8)) + '\n'
+        for _ in range(count)
+    ]
+
+
+def measure(run, cases: list[str]) -> tuple[float, list[str]]:
+    start = time.perf_counter()
+    outputs = [run(case) for case in cases]
+    return time.perf_counter() - start, outputs
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    arg_parser.add_argument('--inputs', type=int, default=500)
+    arg_parser.add_argument(
+        '--backend', choices=['tree', 'closure', 'vm'], default='tree'
+    )
+    args = arg_parser.parse_args()
+
+    source = EXAMPLE.read_text(encoding='utf-8')
+    cases = inputs(args.inputs)
+    minipar = Minipar()
+
+    interpreter.PROGRAMS = ProgramCache(max_bytes=0)
+    plain, expected = measure(
+        lambda case: minipar.run(source, case, args.backend), cases
+    )
+
+    interpreter.PROGRAMS = ProgramCache()
+    cached, outputs = measure(
+        lambda case: minipar.run(source, case, args.backend), cases
+    )
+    if outputs != expected:
+        raise SystemExit('saídas diferentes com o cache')
+
+    start = time.perf_counter()
+    program = minipar.compile(source, args.backend)
+    _, outputs = measure(program.run, cases)
+    compiled = time.perf_counter() - start
+    if outputs != expected:
+        raise SystemExit('saídas diferentes com o programa compilado')
+
+    for name, elapsed in (
+        ('run sem cache', plain),
+        ('run com cache', cached),
+        ('compile + run', compiled),
+    ):
+        print(
+            f'{name:<16}{elapsed:>8.3f} s'
+            f'{elapsed / args.inputs * 1e6:>10.1f} µs/entrada'
+            f'{plain / elapsed:>8.2f}x'
+        )
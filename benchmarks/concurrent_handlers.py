@@ -0,0 +1,155 @@
+"""
+Verificação de Handlers Concorrentes do s_channel
+
+Sobe um s_channel por backend e conecta vários clientes ao mesmo tempo.
+Cada mensagem passa por uma variável local da função associada ao
+canal, e a resposta precisa ser a própria mensagem: se os handlers
+compartilhassem o contexto de execução, um cliente receberia valores de
+outro. O script termina com erro quando isso acontece e informa a
+vazão de cada backend.
+
+Com --shared, todos os clientes usam o mesmo executor, como antes dos
+contextos por thread, para conferir que a verificação detecta o
+vazamento. Só tree e closure o acusam: no vm e no python as variáveis
+locais já ficam no quadro de cada chamada.
+
+As mensagens usam o mesmo protocolo dos canais, com o cabeçalho de
+tamanho e os valores codificados, por meio de uma ClientConnection.
+
+Uso:
+    python benchmarks/concurrent_handlers.py --clients 8 --messages 50
+"""
+
+import argparse
+import io
+import socket
+import sys
+import threading
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from minipar import channel  # noqa: E402
+from minipar.interpreter import BACKENDS, Minipar  # noqa: E402
+from minipar.transpiler import PythonRunnerImpl  # noqa: E402
+
+PROGRAM = """
+func eco(mensagem: string) -> string {
+    var propria: string = mensagem
+    var i: number = 0
+    while (i < 300) {
+        i = i + 1
+    }
+    # Cede a vez às outras threads antes de ler a variável local
+    sleep(0.001)
+    return propria
+}
+
+s_channel servidor {eco, "ECO", "localhost", PORT}
+"""
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+        probe.bind(('localhost', 0))
+        return probe.getsockname()[1]
+
+
+def start_server(backend: str, shared: bool) -> int:
+    port = free_port()
+    runner_class = BACKENDS[backend]
+    if shared:
+        # Todos os clientes no mesmo executor
+        runner_class = type(
+            f'Shared{runner_class.__name__}',
+            (runner_class,),
+            {'spawn': lambda self: self},
+        )
+    runner = runner_class()
+    source = PROGRAM.replace('PORT', str(port))
+    if isinstance(runner, PythonRunnerImpl):
+        target = lambda: runner.run_source(source, Minipar.analyse)  # noqa: E731
+    else:
+        program = Minipar.analyse(source)
+        target = lambda: runner.run(program)  # noqa: E731
+    threading.Thread(target=target, daemon=True).start()
+
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('localhost', port)).close()
+            return port
+        except OSError:
+            time.sleep(0.05)
+    raise SystemExit(f'o servidor do backend {backend} não subiu')
+
+
+def client(port: int, index: int, messages: int, leaks: list[str]):
+    conn = channel.ClientConnection(
+        socket.create_connection(('localhost', port))
+    )
+    try:
+        conn.receive()
+        for count in range(messages):
+            message = f'cliente{index}-{count}'
+            try:
+                reply = conn.reply(conn.request(message))
+            except OSError as e:
+                reply = e
+            if reply is channel.CLOSED:
+                # O handler falhou e fechou a conexão
+                leaks.append(f'{message} recebeu a conexão fechada')
+                return
+            if reply != message:
+                leaks.append(f'{message} recebeu {reply}')
+    finally:
+        conn.close()
+
+
+def check(backend: str, clients: int, messages: int, shared: bool):
+    port = start_server(backend, shared)
+    leaks: list[str] = []
+    threads = [
+        threading.Thread(target=client, args=(port, i, messages, leaks))
+        for i in range(clients)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return elapsed, leaks
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    arg_parser.add_argument('--clients', type=int, default=8)
+    arg_parser.add_argument('--messages', type=int, default=50)
+    arg_parser.add_argument('--shared', action='store_true')
+    arg_parser.add_argument(
+        '--backend', choices=list(BACKENDS), nargs='+', default=list(BACKENDS)
+    )
+    args = arg_parser.parse_args()
+
+    failed = False
+    total = args.clients * args.messages
+    for backend in args.backend:
+        # Os servidores imprimem cada mensagem; a saída é descartada
+        with redirect_stdout(io.StringIO()):
+            elapsed, leaks = check(
+                backend, args.clients, args.messages, args.shared
+            )
+        status = 'ok' if not leaks else f'{len(leaks)} respostas trocadas'
+        print(
+            f'{backend:<9}{total / elapsed:>9.0f} msg/s   {status}',
+            flush=True,
+        )
+        if leaks:
+            failed = True
+            print(f'    ex.: {leaks[0]}')
+
+    raise SystemExit(1 if failed else 0)
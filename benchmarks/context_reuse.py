@@ -0,0 +1,90 @@
+"""
+Benchmark do Reaproveitamento de Contextos
+
+Executa milhares de programas pelo Minipar.run, como o editor faz a cada
+requisição, e mede a memória alocada com tracemalloc. Cada programa
+define funções com nomes próprios: se os executores compartilhassem a
+tabela de funções, como acontecia com os valores padrão mutáveis do
+construtor, a memória cresceria com o número de execuções.
+
+Com --shared, os executores voltam a usar tabelas compartilhadas entre
+as execuções, para comparar.
+
+Uso:
+    python benchmarks/context_reuse.py --runs 3000
+"""
+
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+from contextlib import nullcontext
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from minipar import interpreter  # noqa: E402
+from minipar.context import ExecutionContext  # noqa: E402
+from minipar.interpreter import Minipar  # noqa: E402
+
+PROGRAM = """
+func dobro_N(x: number) -> number {
+    return x * 2
+}
+
+var total: number = 0
+for (var i: number in range(20)) {
+    total = total + dobro_N(i)
+}
+print(total)
+"""
+
+
+class SharedContextPool:
+    # Todos os executores recebem as mesmas tabelas
+    def __init__(self):
+        self.shared = ExecutionContext()
+
+    def context(self):
+        return nullcontext(self.shared)
+
+
+def measure(runs: int, backend: str) -> tuple[list[tuple[int, int]], float]:
+    # Os programas são todos diferentes: sem desligar o cache de
+    # programas, a medida incluiria as ASTs guardadas nele
+    interpreter.PROGRAMS.max_bytes = 0
+    minipar = Minipar()
+    samples = []
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    for run in range(1, runs + 1):
+        output = minipar.run(PROGRAM.replace('N', str(run)), backend=backend)
+        if output != '380\n':
+            raise SystemExit(f'saída inesperada: {output!r}')
+        if run % (runs // 5) == 0:
+            gc.collect()
+            samples.append((run, tracemalloc.get_traced_memory()[0]))
+    elapsed = time.perf_counter() - start
+    tracemalloc.stop()
+    return samples, elapsed
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    arg_parser.add_argument('--runs', type=int, default=3000)
+    arg_parser.add_argument('--shared', action='store_true')
+    arg_parser.add_argument(
+        '--backend', choices=['tree', 'closure', 'vm'], default='tree'
+    )
+    args = arg_parser.parse_args()
+
+    if args.shared:
+        interpreter.CONTEXTS = SharedContextPool()
+
+    samples, elapsed = measure(args.runs, args.backend)
+    for run, size in samples:
+        print(f'{run:>7} execuções{size / 1024:>10.1f} KiB')
+    print(f'{args.runs / elapsed:.0f} execuções/s')
@@ -0,0 +1,163 @@
+"""
+Benchmark de Controle de Fluxo
+
+Compara os sinais de término usados pelo interpretador com a
+estratégia anterior, em que return, break e continue levantavam
+exceções capturadas pelo laço ou pela chamada de função. Os programas
+medidos são recursivos (ex9.minipar e fatorial_rec.minipar) ou
+dominados por laços com break e continue.
+
+Uso:
+    python benchmarks/control_flow.py --repeat 15
+"""
+
+import argparse
+import io
+import sys
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from minipar import ast  # noqa: E402
+from minipar.interpreter import Minipar  # noqa: E402
+from minipar.runner import RunnerImpl  # noqa: E402
+
+EXAMPLES = ROOT / 'examples' / 'minipar'
+
+LOOPS = """
+var total: number = 0
+for (var i: number in range(5000)) {
+    if (i % 3 == 0) {
+        continue
+    }
+    var j: number = 0
+    while (true) {
+        j = j + 1
+        if (j > 5) {
+            break
+        }
+        total = total + j
+    }
+}
+print(total)
+"""
+
+
+class ReturnInterruption(Exception):
+    def __init__(self, value=None):
+        self.value = value
+        super().__init__()
+
+
+class BreakInterruption(Exception):
+    pass
+
+
+class ContinueInterruption(Exception):
+    pass
+
+
+class ExceptionRunnerImpl(RunnerImpl):
+    """Interpretador com return, break e continue baseados em exceções"""
+
+    def exec_Call(self, node: ast.Call):
+        try:
+            return super().exec_Call(node)
+        except ReturnInterruption as ret:
+            # O frame já foi restaurado pelo `finally` de exec_Call
+            return ret.value
+
+    def exec_Return(self, node: ast.Return):
+        raise ReturnInterruption(self.execute(node.expr))
+
+    @staticmethod
+    def exec_Break(_: ast.Break):
+        raise BreakInterruption
+
+    @staticmethod
+    def exec_Continue(_: ast.Continue):
+        raise ContinueInterruption
+
+    def exec_block(self, block: ast.Body):
+        for inst in block:
+            self.execute(inst)
+
+    def exec_For(self, node: ast.For):
+        iterable = self.execute(node.iterable)
+        slots = self.frame.slots
+        slot = node.iterator.left.slot
+        for value in iterable:
+            slots[slot] = value
+            try:
+                self.exec_block(node.body)
+            except ContinueInterruption:
+                continue
+            except BreakInterruption:
+                break
+
+    def exec_While(self, node: ast.While):
+        temp = self.execute(node.condition)
+        while temp:
+            try:
+                self.exec_block(node.body)
+                temp = self.execute(node.condition)
+            except ContinueInterruption:
+                continue
+            except BreakInterruption:
+                break
+
+    def exec_If(self, node: ast.If):
+        if self.execute(node.condition):
+            self.exec_block(node.body)
+        elif node.else_stmt is not None:
+            self.exec_block(node.else_stmt)
+
+
+def workloads() -> dict[str, str]:
+    fibonacci = (EXAMPLES / 'ex9.minipar').read_text(encoding='utf-8')
+    factorial = (EXAMPLES / 'fatorial_rec.minipar').read_text(encoding='utf-8')
+    return {
+        'fibonacci(16)': fibonacci.replace('fibonacci(10)', 'fibonacci(16)'),
+        'fatorial x500': factorial.replace(
+            'print("Fatorial: ", fatorial(valor))',
+            'for (var _: number in range(500)) { fatorial(valor) }',
+        ),
+        'laços': LOOPS,
+    }
+
+
+def run(runner_class: type[RunnerImpl], program: ast.Program):
+    runner = runner_class(func_table={})
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()) as output:
+        runner.run(program)
+    return time.perf_counter() - start, output.getvalue()
+
+
+def measure(source: str, repeat: int) -> tuple[float, float]:
+    program = Minipar.analyse(source)
+    best = {ExceptionRunnerImpl: float('inf'), RunnerImpl: float('inf')}
+    outputs = {}
+    # As execuções são intercaladas para que variações da máquina
+    # afetem as duas estratégias por igual
+    for _ in range(repeat):
+        for runner_class, current in best.items():
+            elapsed, outputs[runner_class] = run(runner_class, program)
+            best[runner_class] = min(current, elapsed)
+    if outputs[ExceptionRunnerImpl] != outputs[RunnerImpl]:
+        raise SystemExit('as estratégias produziram saídas diferentes')
+    return best[ExceptionRunnerImpl], best[RunnerImpl]
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    arg_parser.add_argument('--repeat', type=int, default=15)
+    args = arg_parser.parse_args()
+
+    print(f'{"programa":<18}{"exceções":>12}{"sinais":>12}{"ganho":>8}')
+    for name, source in workloads().items():
+        old, new = measure(source, args.repeat)
+        print(f'{name:<18}{old:>11.3f}s{new:>11.3f}s{old / new:>7.2f}x')
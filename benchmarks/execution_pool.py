@@ -0,0 +1,89 @@
+"""
+Benchmark do Pool de Execuções
+
+Simula uma turma enviando programas ao mesmo tempo, como no editor: um
+dos alunos envia um laço infinito e os demais enviam programas curtos.
+Os programas curtos devem terminar enquanto o laço ocupa um único
+trabalhador, o laço deve ser interrompido pelo tempo limite e os envios
+além da fila devem ser recusados. Ao final são exibidas as métricas do
+pool.
+
+Uso:
+    python benchmarks/execution_pool.py --students 30 --workers 2
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from minipar.execution import ExecutionPool, PoolFull  # noqa: E402
+
+SHORT = """
+var total: number = 0
+for (var i: number in range(2000)) {
+    total = total + i
+}
+print(total)
+"""
+
+INFINITE = """
+while (true) {
+    var x: number = 1
+}
+"""
+
+
+def submit(pool: ExecutionPool, source: str, results: list):
+    start = time.perf_counter()
+    try:
+        output = pool.run(source)
+    except PoolFull:
+        output = 'recusado'
+    results.append((source is INFINITE, output, time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    arg_parser.add_argument('--students', type=int, default=30)
+    arg_parser.add_argument('--workers', type=int, default=2)
+    arg_parser.add_argument('--queue', type=int, default=16)
+    arg_parser.add_argument('--timeout', type=float, default=2.0)
+    args = arg_parser.parse_args()
+
+    pool = ExecutionPool(args.workers, args.queue, args.timeout)
+    start = time.perf_counter()
+    pool.start()
+    print(f'pool iniciado em {time.perf_counter() - start:.2f}s')
+
+    results: list[tuple[bool, str, float]] = []
+    sources = [INFINITE] + [SHORT] * (args.students - 1)
+    threads = [
+        threading.Thread(target=submit, args=(pool, source, results))
+        for source in sources
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    short = [r for r in results if not r[0] and r[1] == '1999000\n']
+    rejected = [r for r in results if r[1] == 'recusado']
+    infinite = next(r for r in results if r[0])
+    print(f'programas curtos concluídos: {len(short)}')
+    if short:
+        slowest = max(elapsed for *_, elapsed in short)
+        print(f'mais lento dos curtos:       {slowest:.2f}s')
+    print(f'envios recusados:            {len(rejected)}')
+    print(f'laço infinito:               {infinite[1].strip()}')
+    print(json.dumps(pool.metrics.snapshot(), indent=2))
+
+    # O trabalhador substituído também atende
+    if pool.run(SHORT) != '1999000\n':
+        raise SystemExit('o trabalhador substituído não respondeu')
+    pool.shutdown()
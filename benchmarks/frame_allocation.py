@@ -0,0 +1,68 @@
+"""
+Benchmark de Alocação de Frames
+
+Executa o exemplo rede-neural.minipar com e sem o pool de frames e
+exibe, para cada backend, quantos frames foram alocados, o pico de
+memória rastreado pelo tracemalloc e o tempo de execução.
+
+Uso:
+    python benchmarks/frame_allocation.py --epochs 2000
+"""
+
+import argparse
+import io
+import random
+import sys
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from minipar.interpreter import BACKENDS, Minipar  # noqa: E402
+from minipar.symbol import FramePool  # noqa: E402
+
+EXAMPLE = ROOT / 'examples' / 'minipar' / 'rede-neural.minipar'
+
+
+def measure(source: str, backend: str, pooled: bool):
+    program = Minipar.analyse(source)
+    runner = BACKENDS[backend]()
+    runner.frames = FramePool() if pooled else FramePool(limit=0)
+
+    random.seed(1)
+    tracemalloc.start()
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        runner.run(program)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return runner.frames.allocated, peak, elapsed
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    arg_parser.add_argument('--epochs', type=int, default=2000)
+    arg_parser.add_argument(
+        '--backend',
+        choices=['tree', 'closure', 'vm'],
+        action='append',
+    )
+    args = arg_parser.parse_args()
+
+    source = EXAMPLE.read_text(encoding='utf-8')
+    source = source.replace('range(20000)', f'range({args.epochs})')
+
+    header = f'{"backend":<10}{"pool":<6}{"frames":>10}'
+    print(f'{header}{"pico (KiB)":>14}{"tempo":>10}')
+    for backend in args.backend or ['tree', 'closure', 'vm']:
+        for pooled in (False, True):
+            frames, peak, elapsed = measure(source, backend, pooled)
+            print(
+                f'{backend:<10}{"sim" if pooled else "não":<6}'
+                f'{frames:>10}{peak / 1024:>14.1f}{elapsed:>9.2f}s'
+            )
@@ -0,0 +1,74 @@
+"""
+Benchmark do Orçamento de Execução
+
+Mede um programa com laços e chamadas sem orçamento, com orçamento de
+passos e com limite de memória, em cada backend. Sem orçamento, o
+código executado é o mesmo de antes da contagem de passos; com ele, o
+custo é o de decrementar um contador por iteração e por chamada.
+
+Uso:
+    python benchmarks/fuel_overhead.py --size 200000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from minipar.interpreter import BACKENDS, Minipar  # noqa: E402
+
+PROGRAM = """
+func passo(x: number) -> number {
+    return x % 7
+}
+
+var total: number = 0
+for (var i: number in range(SIZE)) {
+    total = total + passo(i)
+}
+print(total)
+"""
+
+
+def measure(source: str, backend: str, **limits) -> tuple[float, str]:
+    minipar = Minipar()
+    # Primeira execução aquece os caches do backend Python
+    minipar.run(source, backend=backend, **limits)
+    start = time.perf_counter()
+    output = minipar.run(source, backend=backend, **limits)
+    return time.perf_counter() - start, output
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    arg_parser.add_argument('--size', type=int, default=200_000)
+    arg_parser.add_argument(
+        '--backend', choices=list(BACKENDS), nargs='+', default=list(BACKENDS)
+    )
+    args = arg_parser.parse_args()
+
+    source = PROGRAM.replace('SIZE', str(args.size))
+    variants = {
+        'sem orçamento': {},
+        'passos': {'fuel': 10 * args.size},
+        'memória': {'memory_limit': 256 * 1024 * 1024},
+    }
+    print(f'{"":<9}' + ''.join(f'{name:>16}' for name in variants))
+    for backend in args.backend:
+        times = []
+        expected = None
+        for limits in variants.values():
+            elapsed, output = measure(source, backend, **limits)
+            if expected is None:
+                expected = output
+            elif output != expected:
+                raise SystemExit(f'{backend}: saída diferente: {output!r}')
+            times.append(elapsed)
+        base = times[0]
+        print(
+            f'{backend:<9}{base:>15.3f}s'
+            + ''.join(f'{t:>9.3f}s ({t / base:.2f}x)' for t in times[1:])
+        )
@@ -0,0 +1,102 @@
+"""
+Benchmark da Saída em Stream
+
+Compara o tempo até a primeira saída de uma simulação longa executada
+com run(), que só devolve a saída no final, e com stream(), que entrega
+os trechos enquanto o programa roda. Também confere que:
+
+- um leitor lento lê no seu ritmo e, ao desistir, interrompe a
+  execução;
+- o limite de bytes interrompe um laço que só imprime.
+
+Uso:
+    python benchmarks/output_stream.py --steps 10
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from minipar.execution import ExecutionPool  # noqa: E402
+
+SIMULATION = """
+for (var passo: number in range(STEPS)) {
+    print("passo", passo)
+    sleep(0.1)
+}
+"""
+
+FLOOD = """
+var i: number = 0
+while (true) {
+    print("linha de saída número", i)
+    i = i + 1
+}
+"""
+
+
+async def first_output(
+    pool: ExecutionPool, source: str
+) -> tuple[float, float]:
+    start = time.perf_counter()
+    first = None
+    async for _ in pool.stream(source):
+        if first is None:
+            first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+
+async def slow_reader(pool: ExecutionPool) -> int:
+    # Lê 5 trechos com pausas: o programa fica parado enquanto isso
+    chunks = pool.stream(FLOOD)
+    read = 0
+    async for chunk in chunks:
+        read += len(chunk.encode())
+        await asyncio.sleep(0.2)
+        if read >= 5 * 4096:
+            break
+    await chunks.aclose()
+    return read
+
+
+async def capped(pool: ExecutionPool) -> tuple[int, str]:
+    output = [chunk async for chunk in pool.stream(FLOOD)]
+    return len(''.join(output).encode()), output[-1].strip()
+
+
+async def main(steps: int):
+    pool = ExecutionPool(2, 4, timeout=30, stream_limit=64 * 1024)
+    pool.start()
+    source = SIMULATION.replace('STEPS', str(steps))
+    loop = asyncio.get_running_loop()
+
+    start = time.perf_counter()
+    await loop.run_in_executor(None, pool.run, source)
+    buffered = time.perf_counter() - start
+    first, total = await first_output(pool, source)
+    print(f'run():    primeira saída em {buffered:.2f}s')
+    print(f'stream(): primeira saída em {first:.2f}s (total {total:.2f}s)')
+
+    read = await slow_reader(pool)
+    await asyncio.sleep(0.3)
+    metrics = pool.metrics.snapshot()
+    print(
+        f'leitor lento leu {read} bytes; '
+        f'execuções canceladas: {metrics["cancelled"]}'
+    )
+
+    size, last = await capped(pool)
+    print(f'laço sem fim limitado a {size} bytes: {last}')
+    pool.shutdown()
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    arg_parser.add_argument('--steps', type=int, default=10)
+    args = arg_parser.parse_args()
+    asyncio.run(main(args.steps))
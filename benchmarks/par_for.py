@@ -0,0 +1,93 @@
+"""
+Benchmark do `par for`
+
+Mede uma pontuação em lote, em que cada item chama uma função de custo
+fixo, com um `for` sequencial e com o `par for` em pools de tamanhos
+diferentes. Com processos, o ganho deve se aproximar do número de
+trabalhadores enquanto houver núcleos livres.
+
+Uso:
+    python benchmarks/par_for.py --items 400 --workers 1 2 4
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from minipar import ast, par  # noqa: E402
+from minipar.interpreter import Minipar  # noqa: E402
+from minipar.runner import RunnerImpl  # noqa: E402
+
+SCORE = """
+func pontuacao(x: number) -> number {
+    var total: number = 0
+    for (var i: number in range(300)) {
+        total = total + (x * i) % 7
+    }
+    return total
+}
+"""
+
+SEQUENTIAL = (
+    SCORE
+    + """
+var notas: list = []
+for (var x: number in range(ITEMS)) {
+    notas.append(pontuacao(x))
+}
+print(sum(notas))
+"""
+)
+
+PARALLEL = (
+    SCORE
+    + """
+var notas: list = par for (var x: number in range(ITEMS)) -> number {
+    return pontuacao(x)
+}
+print(sum(notas))
+"""
+)
+
+
+def run(program: ast.Program) -> tuple[float, str]:
+    runner = RunnerImpl(func_table={})
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()) as output:
+        runner.run(program)
+    return time.perf_counter() - start, output.getvalue()
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    arg_parser.add_argument('--items', type=int, default=400)
+    arg_parser.add_argument(
+        '--workers', type=int, nargs='+', default=[1, os.cpu_count() or 1]
+    )
+    args = arg_parser.parse_args()
+
+    items = str(args.items)
+    sequential = Minipar.analyse(SEQUENTIAL.replace('ITEMS', items))
+    parallel = Minipar.analyse(PARALLEL.replace('ITEMS', items))
+
+    base, expected = run(sequential)
+    print(f'{"for sequencial":<22}{base:>9.3f}s')
+    for workers in args.workers:
+        par.configure('process', workers)
+        # A primeira execução cria o pool; mede-se a segunda
+        run(parallel)
+        elapsed, output = run(parallel)
+        if output != expected:
+            raise SystemExit('o par for produziu um resultado diferente')
+        print(
+            f'{f"par for ({workers} proc.)":<22}{elapsed:>9.3f}s'
+            f'{base / elapsed:>7.2f}x'
+        )
+    par.scheduler().shutdown()
@@ -0,0 +1,79 @@
+"""
+Benchmark do Pool do `par`
+
+Compara a estratégia anterior do `par`, que criava um multiprocessing.Pool
+a cada bloco e enviava o executor inteiro aos processos, com o
+escalonador atual, que mantém um pool persistente e envia só a função e
+os argumentos. O programa medido executa um `par` dentro de um laço.
+
+Uso:
+    python benchmarks/par_pool.py --blocks 20 --workers 2
+"""
+
+import argparse
+import io
+import sys
+import time
+from contextlib import redirect_stdout
+from multiprocessing import Pool
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from minipar import ast, par  # noqa: E402
+from minipar.interpreter import Minipar  # noqa: E402
+from minipar.runner import RunnerImpl  # noqa: E402
+
+PROGRAM = """
+func soma(n: number) -> number {
+    var total: number = 0
+    for (var i: number in range(n)) {
+        total = total + i
+    }
+    return total
+}
+
+for (var bloco: number in range(BLOCKS)) {
+    par {
+        soma(2000)
+        soma(3000)
+    }
+}
+"""
+
+
+class PoolPerBlockRunnerImpl(RunnerImpl):
+    """Interpretador com um pool novo a cada bloco `par`"""
+
+    def exec_Par(self, node: ast.Par):
+        with Pool() as pool:
+            pool.map(self.execute, node.body)
+
+
+def run(runner_class: type[RunnerImpl], program: ast.Program) -> float:
+    runner = runner_class(func_table={})
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        runner.run(program)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    arg_parser.add_argument('--blocks', type=int, default=20)
+    arg_parser.add_argument('--workers', type=int, default=None)
+    args = arg_parser.parse_args()
+
+    par.configure('process', args.workers)
+    program = Minipar.analyse(PROGRAM.replace('BLOCKS', str(args.blocks)))
+
+    # A primeira execução inclui a criação do pool persistente
+    old = run(PoolPerBlockRunnerImpl, program)
+    first = run(RunnerImpl, program)
+    new = run(RunnerImpl, program)
+
+    print(f'{args.blocks} blocos par')
+    print(f'pool por bloco:       {old:8.3f}s')
+    print(f'pool persistente:     {first:8.3f}s (com criação do pool)')
+    print(f'pool persistente:     {new:8.3f}s ({old / new:.1f}x)')
@@ -0,0 +1,89 @@
+"""
+Benchmark do Cache de Programas
+
+Mede o custo de preparar um programa enviado de novo: a análise
+completa (léxico, sintático, semântico, otimizador e resolvedor), a
+leitura da camada em memória e a leitura da camada em disco, como em
+um processo novo. Em seguida, compara Minipar.run com e sem o cache.
+
+Uso:
+    python benchmarks/program_cache.py --example neuronio --runs 200
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from minipar import interpreter  # noqa: E402
+from minipar.cache import ProgramCache  # noqa: E402
+from minipar.interpreter import Minipar  # noqa: E402
+
+
+def timed(runs: int, step) -> float:
+    start = time.perf_counter()
+    for _ in range(runs):
+        step()
+    return (time.perf_counter() - start) / runs
+
+
+def frontend(source: str, runs: int) -> dict[str, float]:
+    analyse = timed(runs, lambda: Minipar.analyse(source))
+
+    memory = ProgramCache()
+    memory.load(source, True, Minipar.analyse)
+    hit = timed(runs, lambda: memory.load(source, True, Minipar.analyse))
+
+    with tempfile.TemporaryDirectory() as directory:
+        ProgramCache(directory=directory).load(source, True, Minipar.analyse)
+        disk = ProgramCache(directory=directory)
+        key = disk.key(source, True)
+
+        def load_from_disk():
+            disk.clear()
+            disk.get(key)
+
+        cold = timed(runs, load_from_disk)
+        stored = sum(f.stat().st_size for f in Path(directory).iterdir())
+
+    return {
+        'análise completa': analyse,
+        'cache em memória': hit,
+        'cache em disco': cold,
+        'bytes em disco': stored,
+    }
+
+
+def run(source: str, backend: str, runs: int, cached: bool) -> float:
+    interpreter.PROGRAMS = ProgramCache(max_bytes=64 * 1024 * 1024 * cached)
+    minipar = Minipar()
+    return timed(runs, lambda: minipar.run(source, backend=backend))
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    arg_parser.add_argument('--example', default='neuronio')
+    arg_parser.add_argument('--runs', type=int, default=200)
+    arg_parser.add_argument(
+        '--backend', choices=['tree', 'closure', 'vm'], default='tree'
+    )
+    args = arg_parser.parse_args()
+
+    path = ROOT / 'examples' / 'minipar' / f'{args.example}.minipar'
+    source = path.read_text(encoding='utf-8')
+
+    results = frontend(source, args.runs)
+    stored = results.pop('bytes em disco')
+    for name, seconds in results.items():
+        print(f'{name:<20}{seconds * 1e6:>10.1f} µs')
+    print(f'{"tamanho em disco":<20}{stored:>10} bytes')
+
+    plain = run(source, args.backend, args.runs, cached=False)
+    cached = run(source, args.backend, args.runs, cached=True)
+    print(f'{"run sem cache":<20}{plain * 1e6:>10.1f} µs')
+    print(f'{"run com cache":<20}{cached * 1e6:>10.1f} µs')
+    print(f'{"ganho":<20}{plain / cached:>10.2f}x')
@@ -0,0 +1,75 @@
+"""
+Benchmark das Listas Compartilhadas
+
+Atualiza as linhas de uma matriz de pesos com um `par for`, uma linha
+por iteração. Com uma lista comum, cada bloco de tarefas recebe uma
+cópia serializada da matriz inteira e as escritas ficam nos
+trabalhadores; com `shared`, as tarefas levam só o nome do bloco de
+memória e escrevem direto na matriz.
+
+Uso:
+    python benchmarks/shared_lists.py --size 300 --workers 2
+"""
+
+import argparse
+import io
+import sys
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from minipar import ast, par  # noqa: E402
+from minipar.interpreter import Minipar  # noqa: E402
+from minipar.runner import RunnerImpl  # noqa: E402
+
+PROGRAM = """
+var pesos: list = []
+for (var i: number in range(SIZE)) {
+    var linha: list = []
+    for (var j: number in range(SIZE)) {
+        linha.append(0.5)
+    }
+    pesos.append(linha)
+}
+SHARE
+
+par for (var i: number in range(SIZE)) {
+    var linha: list = pesos[i]
+    linha[0] = linha[0] + i
+}
+print(pesos[SIZE - 1][0])
+"""
+
+
+def run(program: ast.Program) -> tuple[float, str]:
+    runner = RunnerImpl(func_table={})
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()) as output:
+        runner.run(program)
+    return time.perf_counter() - start, output.getvalue().strip()
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    arg_parser.add_argument('--size', type=int, default=300)
+    arg_parser.add_argument('--workers', type=int, default=None)
+    args = arg_parser.parse_args()
+
+    par.configure('process', args.workers)
+    source = PROGRAM.replace('SIZE', str(args.size))
+    programs = {
+        'lista comum': Minipar.analyse(source.replace('SHARE', '')),
+        'shared': Minipar.analyse(
+            source.replace('SHARE', 'pesos = shared(pesos)')
+        ),
+    }
+
+    # Cria o pool antes das medições
+    run(programs['shared'])
+    for name, program in programs.items():
+        elapsed, last = run(program)
+        print(f'{name:<14}{elapsed:>9.3f}s   último peso: {last}')
+    par.scheduler().shutdown()
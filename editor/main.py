@@ -1,16 +1,47 @@
+import json
+import os
 import sys
+from contextlib import asynccontextmanager
 
 sys.path.append('./')
 
 import uvicorn
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
 
-from minipar.interpreter import Minipar
+from minipar.execution import ExecutionPool, PoolFull
+
+# Limite de caracteres da saída de uma execução e de bytes da saída
+# enviada em stream
+OUTPUT_LIMIT = int(os.environ.get('MINIPAR_OUTPUT_LIMIT', '100000'))
+STREAM_LIMIT = int(os.environ.get('MINIPAR_STREAM_LIMIT', '1048576'))
+
+# Processos que executam os programas, execuções que podem esperar na
+# fila e tempo limite de cada execução, em segundos
+workers = os.environ.get('MINIPAR_EDITOR_WORKERS')
+WORKERS = int(workers) if workers else None
+QUEUE_LIMIT = int(os.environ.get('MINIPAR_EDITOR_QUEUE', '32'))
+TIMEOUT = float(os.environ.get('MINIPAR_EDITOR_TIMEOUT', '10'))
+
+# Orçamento opcional de passos e de bytes alocados por programa
+fuel = os.environ.get('MINIPAR_FUEL')
+FUEL = int(fuel) if fuel else None
+memory_limit = os.environ.get('MINIPAR_MEMORY_LIMIT')
+MEMORY_LIMIT = int(memory_limit) if memory_limit else None
+
+pool = ExecutionPool(
+    WORKERS,
+    QUEUE_LIMIT,
+    TIMEOUT,
+    OUTPUT_LIMIT,
+    STREAM_LIMIT,
+    FUEL,
+    MEMORY_LIMIT,
+)
 
 
 class RunSchema(BaseModel):
@@ -22,8 +53,16 @@ class RunResponse(BaseModel):
     output: str
 
 
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    # Os trabalhadores sobem junto com o servidor
+    pool.start()
+    yield
+    pool.shutdown()
+
+
 # Inicialização da aplicação FastAPI
-app = FastAPI(title='FastAPI com Jinja2')
+app = FastAPI(title='FastAPI com Jinja2', lifespan=lifespan)
 
 origins = ['http://localhost:8000']
 
@@ -53,10 +92,44 @@ async def read_root(request: Request):
 @app.post('/run', response_model=RunResponse)
 async def run_code(run: RunSchema):
     """
-    Rota que manda o código para o interpretador
+    Rota que manda o código para o pool de execuções. O event loop só
+    espera a resposta do trabalhador, então um programa que não termina
+    não trava as outras requisições
+    """
+    try:
+        output = await pool.run_async(run.source, run.keyboard_input)
+    except PoolFull as e:
+        raise HTTPException(status_code=503, detail=str(e)) from None
+    return {'output': output}
+
+
+@app.post('/run/stream')
+async def stream_code(run: RunSchema):
+    """
+    Rota que envia a saída do programa enquanto ele roda, como Server-Sent
+    Events: cada evento traz um trecho da saída em JSON e o evento `end`
+    marca o fim da execução
+    """
+    try:
+        chunks = pool.stream(run.source, run.keyboard_input)
+    except PoolFull as e:
+        raise HTTPException(status_code=503, detail=str(e)) from None
+
+    async def events():
+        async for chunk in chunks:
+            yield f'data: {json.dumps(chunk)}\n\n'
+        yield 'event: end\ndata: \n\n'
+
+    return StreamingResponse(events(), media_type='text/event-stream')
+
+
+@app.get('/metrics')
+async def metrics():
+    """
+    Rota com as métricas do pool: profundidade da fila, execuções em
+    andamento, tempo de espera e latência
     """
-    minipar = Minipar()
-    return {'output': minipar.run(run.source, run.keyboard_input)}
+    return pool.metrics.snapshot()
 
 
 if __name__ == '__main__':
@@ -39,30 +39,73 @@ function toggleDisable(disable) {
   document.querySelector("#clear-btn").disabled = disable
 }
 
+function appendOutput(text) {
+  const doc = output.getDoc();
+  const lastLine = doc.lineCount() - 1;
+  doc.replaceRange(text, { line: lastLine, ch: doc.getLine(lastLine).length });
+  const end = doc.lineCount() - 1;
+  doc.setCursor({ line: end, ch: doc.getLine(end).length });
+  output.scrollTo(null, output.getScrollInfo().height);
+}
+
+// Lê os eventos do servidor e mostra cada trecho da saída assim que
+// ele chega
+async function readEvents(response) {
+  const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+  let buffer = "";
+  let started = false;
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) {
+      return;
+    }
+    buffer += value;
+    let end;
+    while ((end = buffer.indexOf("\n\n")) !== -1) {
+      const event = buffer.slice(0, end);
+      buffer = buffer.slice(end + 2);
+      if (event.startsWith("event: end")) {
+        return;
+      }
+      if (!started) {
+        output.setValue("");
+        started = true;
+      }
+      appendOutput(JSON.parse(event.slice("data: ".length)));
+    }
+  }
+}
+
 document.querySelector("#run-btn").addEventListener("click", async function () {
   let code = editor.getValue();
   let keyboard_input = input.getValue();
 
   toggleDisable(true);
-  const response = await fetch("/run", {
-    method: "POST",
-    headers: {
-      "Content-Type": "application/json",
-    },
-    body: JSON.stringify({
-      source: code,
-      keyboard_input: keyboard_input
-    }),
-  });
+  try {
+    const response = await fetch("/run/stream", {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+      },
+      body: JSON.stringify({
+        source: code,
+        keyboard_input: keyboard_input
+      }),
+    });
 
-  const res = await response.json();
-  output.setValue(res.output);
-  const doc = output.getDoc();
-  const lastLine = doc.lineCount() - 1;
-  const lastChar = doc.getLine(lastLine).length;
-  doc.setCursor({ line: lastLine, ch: lastChar });
-  output.scrollTo(null, output.getScrollInfo().height);
-  toggleDisable(false);
+    if (response.ok) {
+      await readEvents(response);
+      if (output.getValue() === "Executando...") {
+        output.setValue("");
+      }
+    } else {
+      // Com o servidor ocupado a resposta traz só o motivo da recusa
+      const res = await response.json();
+      output.setValue(`[erro] ${res.detail}`);
+    }
+  } finally {
+    toggleDisable(false);
+  }
 });
 
 document.querySelector("#clear-btn").addEventListener("click", function () {
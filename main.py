@@ -1,28 +1,75 @@
-import pprint
-import traceback
+import argparse
+import sys
 
-from minipar.lexer import LexerImpl
-from minipar.parser import ParserImpl
-from minipar.runner import RunnerImpl
-from minipar.semantic import SemanticImpl
+from minipar import par
+from minipar.compiler import CompilerImpl, disassemble
+from minipar.context import ExecutionContext
+from minipar.fuel import Fuel
+from minipar.interpreter import BACKENDS, PROGRAMS, Minipar
 
 if __name__ == '__main__':
-    filename = input('Digite o nome do arquivo de exemplo: ')
+    arg_parser = argparse.ArgumentParser(description='Interpretador Minipar')
+    arg_parser.add_argument('filename', nargs='?')
+    arg_parser.add_argument(
+        '--backend', choices=list(BACKENDS), default='tree'
+    )
+    arg_parser.add_argument(
+        '--dis', action='store_true', help='exibe o bytecode do programa'
+    )
+    arg_parser.add_argument(
+        '--no-optimize',
+        action='store_true',
+        help='desativa a pré-avaliação e o dobramento de constantes',
+    )
+    arg_parser.add_argument(
+        '--stats',
+        action='store_true',
+        help='exibe na saída de erro o resumo do otimizador',
+    )
+    arg_parser.add_argument(
+        '--par',
+        choices=par.KINDS,
+        help='pool usado pelos blocos par (padrão: MINIPAR_PAR_BACKEND)',
+    )
+    arg_parser.add_argument(
+        '--par-workers',
+        type=int,
+        help='número de trabalhadores do par (padrão: núcleos da máquina)',
+    )
+    arg_parser.add_argument(
+        '--fuel',
+        type=int,
+        help='limite de passos de execução (iterações e chamadas)',
+    )
+    arg_parser.add_argument(
+        '--memory-limit',
+        type=int,
+        help='limite de bytes alocados durante a execução',
+    )
+    args = arg_parser.parse_args()
+
+    if args.par or args.par_workers:
+        par.configure(args.par or par.scheduler().kind, args.par_workers)
+
+    filename = args.filename or input('Digite o nome do arquivo de exemplo: ')
     path_to_source = f'./examples/minipar/{filename}.minipar'
 
     with open(path_to_source, 'r', encoding='utf-8') as f:
         source = f.read()
-        lexer = LexerImpl(source)
-        parser = ParserImpl(lexer)
-        ast = parser.start()
-
-        semantic = SemanticImpl()
-        semantic.visit(ast)
-        try:
-            semantic.visit(ast)
-        except Exception as _:
-            print(traceback.format_exc)
-            pprint.pprint(semantic.context_stack)
-
-        runner = RunnerImpl()
-        runner.run(ast)
+
+    optimize = not args.no_optimize
+    if args.stats:
+        # O resumo vem do front-end, então o cache não é consultado
+        ast = Minipar.analyse(source, optimize, stats=sys.stderr)
+    else:
+        ast = PROGRAMS.load(source, optimize, Minipar.analyse)
+
+    if args.dis:
+        print(disassemble(CompilerImpl().compile(ast)))
+        raise SystemExit
+
+    fuel = None
+    if args.fuel is not None or args.memory_limit is not None:
+        fuel = Fuel(args.fuel, args.memory_limit)
+    runner = BACKENDS[args.backend](context=ExecutionContext(fuel=fuel))
+    runner.run(ast)
@@ -5,7 +5,10 @@ O módulo da AST conta com uma estrutura de classes responsável
 por representa o conjunto de declarações e expressões da linguagem
 """
 
-from dataclasses import dataclass
+import inspect
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass, field, fields, is_dataclass
+from typing import Any, ClassVar, TypeAliasType, get_args, get_origin
 
 from minipar.token import Token
 
@@ -14,6 +17,14 @@ class Node:
     pass
 
 
+def derived(default: Any = None) -> Any:
+    """
+    Campo preenchido pelas análises, como o resolvedor. Não faz parte da
+    estrutura da árvore, então não é percorrido como filho nem comparado.
+    """
+    return field(default=default, compare=False, metadata={'derived': True})
+
+
 @dataclass
 class Statement(Node):
     pass
@@ -40,6 +51,14 @@ class Constant(Expression):
     pass
 
 
+@dataclass
+class Literal(Expression):
+    # Valor já avaliado pelo otimizador; listas e dicionários que podem
+    # ser alterados pelo programa são copiados a cada avaliação
+    value: Any = None
+    copy: bool = False
+
+
 @dataclass
 class Assignable(Expression):
     pass
@@ -48,6 +67,10 @@ class Assignable(Expression):
 @dataclass
 class ID(Assignable):
     decl: bool = False
+    # Endereço léxico preenchido pelo resolvedor: quantos frames de
+    # função acima do atual e a posição da variável nesse frame
+    depth: int | None = derived()
+    slot: int | None = derived()
 
 
 @dataclass
@@ -96,6 +119,7 @@ class Slice(Expression):
 @dataclass
 class Program(Statement):
     stmts: Body | None
+    nlocals: int = derived(0)
 
 
 @dataclass
@@ -138,6 +162,16 @@ class FuncDef(Statement):
     return_type: str
     params: Parameters
     body: Body
+    level: int = derived(0)
+    nlocals: int = derived(0)
+    # Layout dos parâmetros: o parâmetro i ocupa o slot i do frame e
+    # defaults[i] é seu valor padrão, se houver
+    nparams: int = derived(0)
+    defaults: tuple[Expression | None, ...] = derived(())
+    # Variáveis de fora do próprio frame que usa, como pares (nível,
+    # slot), e os nomes que chama, usados para montar as tarefas do `par`
+    outer: frozenset[tuple[int, int]] = derived(frozenset())
+    calls: frozenset[str] = derived(frozenset())
 
 
 @dataclass
@@ -165,6 +199,16 @@ class Par(Statement):
     body: Body
 
 
+@dataclass
+class ParFor(Expression):
+    iterator: Declaration
+    iterable: Expression
+    # O corpo é uma função de um parâmetro, o iterador, chamada uma vez
+    # por elemento; o valor de `return` é o resultado do elemento
+    body: FuncDef
+    reduction: str | None = None
+
+
 @dataclass
 class Seq(Statement):
     body: Body
@@ -197,7 +241,11 @@ class Channel(Statement):
 class SChannel(Channel):
     func_name: str
     description: Expression
+    _mode: Expression | None = None
 
+    @property
+    def mode(self) -> str:
+        return 'thread' if self._mode is None else self._mode.token.value
 
 
 @dataclass
@@ -213,3 +261,90 @@ class ArrayLiteral(Expression):
 @dataclass
 class DictLiteral(Expression):
     entries: dict[str, Expression]
+
+
+def holds_nodes(annotation: Any) -> bool:
+    if isinstance(annotation, TypeAliasType):
+        return holds_nodes(annotation.__value__)
+    if get_origin(annotation) is None and isinstance(annotation, type):
+        return issubclass(annotation, Node)
+    return any(holds_nodes(arg) for arg in get_args(annotation))
+
+
+CHILD_FIELDS: dict[type[Node], tuple[str, ...]] = {}
+
+
+def child_fields(cls: type[Node]) -> tuple[str, ...]:
+    """Campos da classe que podem conter nós filhos, calculados uma vez"""
+    names = CHILD_FIELDS.get(cls)
+    if names is None:
+        names = CHILD_FIELDS[cls] = (
+            tuple(
+                f.name
+                for f in fields(cls)
+                if not f.metadata.get('derived') and holds_nodes(f.type)
+            )
+            if is_dataclass(cls)
+            else ()
+        )
+    return names
+
+
+def nodes_in(value: Any) -> Iterator[Node]:
+    if isinstance(value, Node):
+        yield value
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from nodes_in(item)
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from nodes_in(item)
+
+
+def iter_children(node: Node) -> Iterator[Node]:
+    for name in child_fields(type(node)):
+        yield from nodes_in(getattr(node, name))
+
+
+class Visitor:
+    """
+    Base dos percursos sobre a AST. O método de cada classe de nó
+    (prefixo + nome da classe) é procurado uma única vez e guardado em
+    uma tabela indexada pela classe; classes sem método próprio caem em
+    generic_visit, que por padrão visita os filhos.
+    """
+
+    prefix: ClassVar[str] = 'visit_'
+    table: ClassVar[dict[type, Callable[[Any, Any], Any]]] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.table = {}
+
+    def visit(self, node: Node | None):
+        try:
+            method = self.table[node.__class__]
+        except KeyError:
+            method = self.lookup(node.__class__)
+        return method(self, node)
+
+    @classmethod
+    def lookup(cls, node_class: type) -> Callable[[Any, Any], Any]:
+        name = f'{cls.prefix}{node_class.__name__}'
+        attr = inspect.getattr_static(cls, name, None)
+        if attr is None:
+            attr = inspect.getattr_static(cls, 'generic_visit')
+        if isinstance(attr, staticmethod):
+            function = attr.__func__
+
+            def method(_, node):
+                return function(node)
+
+        else:
+            method = attr
+        cls.table[node_class] = method
+        return method
+
+    def generic_visit(self, node: Node | None):
+        for child in iter_children(node):
+            self.visit(child)
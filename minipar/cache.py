@@ -0,0 +1,168 @@
+"""
+Módulo do Cache de Programas
+
+O ProgramCache guarda programas já analisados (AST verificada,
+otimizada e resolvida), indexados pelo hash do código-fonte. Um mesmo
+programa enviado várias vezes passa pelo front-end uma única vez.
+
+O cache tem duas camadas. A camada em memória é uma LRU limitada pelo
+tamanho serializado dos programas; a camada em disco é opcional e
+guarda cada programa serializado com pickle e comprimido com zlib. A
+chave inclui uma impressão digital do código do front-end e a versão
+do Python, então alterações no interpretador invalidam o cache sem
+intervenção.
+"""
+
+import functools
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+import threading
+import zlib
+from collections import OrderedDict
+from collections.abc import Callable
+
+from minipar import ast
+
+# Módulos cujo código determina a AST produzida
+FRONTEND_MODULES = (
+    'ast',
+    'constants',
+    'token',
+    'lexer',
+    'parser',
+    'semantic',
+    'optimizer',
+    'resolver',
+)
+
+
+@functools.cache
+def fingerprint(modules: tuple[str, ...] = FRONTEND_MODULES) -> bytes:
+    """Hash do código dos `modules` e da versão do Python"""
+    digest = hashlib.sha256(sys.implementation.cache_tag.encode())
+    package = os.path.dirname(os.path.abspath(__file__))
+    for name in modules:
+        with open(os.path.join(package, f'{name}.py'), 'rb') as f:
+            digest.update(f.read())
+    return digest.digest()
+
+
+class ProgramCache:
+    """
+    Cache de programas analisados, com até `max_bytes` em memória e,
+    com `directory`, uma camada em disco. O tamanho de cada programa é
+    o da sua forma serializada, a mesma guardada em disco.
+    """
+
+    def __init__(
+        self, max_bytes: int = 64 * 1024 * 1024, directory: str | None = None
+    ):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.version = fingerprint()
+        self.entries: OrderedDict[str, tuple[ast.Program, int]] = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def key(self, source: str, optimize: bool) -> str:
+        digest = hashlib.sha256(self.version)
+        digest.update(b'1' if optimize else b'0')
+        digest.update(source.encode('utf-8'))
+        return digest.hexdigest()
+
+    def load(
+        self,
+        source: str,
+        optimize: bool,
+        frontend: Callable[[str, bool], ast.Program],
+    ) -> ast.Program:
+        """Programa do cache, ou analisado por `frontend` e guardado"""
+        key = self.key(source, optimize)
+        program = self.get(key)
+        if program is None:
+            program = frontend(source, optimize)
+            self.put(key, program)
+        return program
+
+    def get(self, key: str) -> ast.Program | None:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+        data = self.read(key)
+        program = None
+        if data is not None:
+            try:
+                program = pickle.loads(zlib.decompress(data))
+            except Exception:
+                # Arquivo corrompido: o programa é analisado de novo
+                program = None
+        with self.lock:
+            if program is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        self.remember(key, program, len(data))
+        return program
+
+    def put(self, key: str, program: ast.Program):
+        try:
+            data = zlib.compress(
+                pickle.dumps(program, pickle.HIGHEST_PROTOCOL)
+            )
+        except (pickle.PicklingError, RecursionError):
+            # Programas aninhados demais ficam fora do cache
+            return
+        self.remember(key, program, len(data))
+        self.write(key, data)
+
+    def remember(self, key: str, program: ast.Program, size: int):
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous[1]
+            self.entries[key] = (program, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.size -= evicted
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}.ast')
+
+    def read(self, key: str) -> bytes | None:
+        if self.directory is None:
+            return None
+        try:
+            with open(self.path(key), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def write(self, key: str, data: bytes):
+        if self.directory is None:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self.path(key))
+        except OSError:
+            # Assim como no cache de código, a camada em disco é opcional
+            pass
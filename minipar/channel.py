@@ -0,0 +1,600 @@
+"""
+Módulo dos Servidores dos Canais
+
+Um `s_channel` aceita clientes e responde a cada mensagem com o valor
+da função associada ao canal. O modo do servidor é escolhido no próprio
+canal, por um quinto elemento opcional:
+
+    s_channel server {calc, description, "localhost", 8585, "async"}
+
+No modo `thread`, o padrão, cada cliente tem uma thread própria, que
+fica presa enquanto o cliente está conectado. No modo `async`, um único
+event loop do asyncio atende todas as conexões e só as chamadas da
+função vão para um pool limitado de threads, definido por
+MINIPAR_CHANNEL_WORKERS. Assim milhares de clientes ociosos custam
+apenas os seus sockets, e não milhares de pilhas de threads.
+
+No modo `process`, o servidor cria MINIPAR_CHANNEL_PROCESSES processos
+com fork, cada um com uma cópia do programa e da função do canal já
+carregados. Todos escutam na mesma porta com SO_REUSEPORT e o kernel
+distribui as conexões entre eles, então funções que usam muita CPU
+escalam com os núcleos da máquina. Cada processo atende os seus
+clientes como no modo `async`; as mensagens do servidor passam pelo
+processo pai, que escreve na saída do programa e recria os processos
+que terminarem.
+
+As mensagens trafegam com um cabeçalho de 4 bytes com o tamanho do
+conteúdo, então mensagens grandes, partidas ou coladas umas nas outras
+pelo TCP chegam inteiras e separadas. O conteúdo é um valor do Minipar
+codificado pelo módulo serialization, e a função do canal recebe e
+devolve valores de qualquer tipo transmissível. Uma Connection lê os
+bytes com recv_into para um buffer criado uma vez por conexão, que só
+cresce quando chega uma mensagem maior do que ele, e decodifica cada
+valor direto do buffer.
+
+Um cliente pode enviar vários pedidos sem esperar as respostas
+(pipelining): o servidor lê as mensagens de uma conexão em ordem e
+responde na mesma ordem, e as respostas de pedidos que já chegaram
+juntos seguem em uma única escrita no socket.
+"""
+
+import asyncio
+import os
+import queue
+import select
+import signal
+import socket
+import struct
+import threading
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import get_all_start_methods, get_context
+from multiprocessing.queues import Queue
+from typing import Any
+
+from minipar.serialization import decode, encode
+from minipar.streams import ExecutionIO
+
+# Cabeçalho das mensagens: tamanho do conteúdo em bytes
+HEADER = struct.Struct('!I')
+
+# Tamanho inicial do buffer de recepção de uma conexão
+BUFFER_SIZE = 4096
+
+# Mensagens maiores indicam um par que não fala o protocolo
+MAX_MESSAGE = 64 * 1024 * 1024
+
+# Mensagens recebidas e ainda não respondidas por conexão no modo async
+PIPELINE_DEPTH = 1024
+
+# Devolvido por receive() quando o outro lado fecha a conexão; None é
+# um valor válido, o de uma função void
+CLOSED = object()
+
+type Reply = Callable[[Any], Any]
+
+
+def handler_workers() -> int:
+    """Threads que executam a função do canal no modo async"""
+    workers = os.environ.get('MINIPAR_CHANNEL_WORKERS')
+    if workers:
+        return int(workers)
+    return min(32, (os.cpu_count() or 1) + 4)
+
+
+def server_processes() -> int:
+    """Processos que aceitam conexões no modo process"""
+    processes = os.environ.get('MINIPAR_CHANNEL_PROCESSES')
+    if processes:
+        return int(processes)
+    return os.cpu_count() or 1
+
+
+class Connection:
+    """
+    Conexão de um canal que troca mensagens com prefixo de tamanho. Os
+    bytes recebidos ficam em um buffer reaproveitado entre as mensagens,
+    que pode guardar várias mensagens chegadas juntas
+    """
+
+    __slots__ = ('buffer', 'end', 'output', 'sock', 'start', 'view')
+
+    def __init__(self, sock: socket.socket, size: int = BUFFER_SIZE):
+        self.sock = sock
+        self.buffer = bytearray(size)
+        self.view = memoryview(self.buffer)
+        # Bytes recebidos e ainda não consumidos: buffer[start:end]
+        self.start = 0
+        self.end = 0
+        # Mensagens escritas e ainda não enviadas
+        self.output = bytearray()
+
+    def send(self, value: Any):
+        self.write(value)
+        self.flush()
+
+    def write(self, value: Any):
+        """Acrescenta a mensagem à saída, enviada no próximo flush()"""
+        frame(value, self.output)
+
+    def flush(self):
+        """
+        Envia a saída acumulada. Enquanto o outro lado não aceita mais
+        bytes, o que ele envia vai para o buffer de recepção, então os
+        dois lados nunca ficam presos esperando um pelo outro
+        """
+        if not self.output:
+            return
+        data = memoryview(self.output)
+        sent = 0
+        closed = False
+        self.sock.setblocking(False)
+        try:
+            while sent < len(data):
+                try:
+                    sent += self.sock.send(data[sent:])
+                except BlockingIOError:
+                    readable, _, _ = select.select(
+                        [] if closed else [self.sock], [self.sock], []
+                    )
+                    if readable:
+                        closed = not self.fill()
+        finally:
+            self.sock.setblocking(True)
+            data.release()
+        self.output.clear()
+
+    def receive(self) -> Any:
+        """Próximo valor, ou CLOSED se o outro lado fechou a conexão"""
+        while True:
+            available = self.end - self.start
+            if available >= HEADER.size:
+                (length,) = HEADER.unpack_from(self.buffer, self.start)
+                if length > MAX_MESSAGE:
+                    raise ConnectionError(
+                        f'mensagem de {length} bytes excede o limite'
+                    )
+                needed = HEADER.size + length
+                if available >= needed:
+                    begin = self.start + HEADER.size
+                    self.start += needed
+                    if self.start == self.end:
+                        self.start = self.end = 0
+                    return decode(self.view[begin : begin + length])
+                self.reserve(needed)
+            else:
+                self.reserve(HEADER.size)
+
+            if self.output:
+                # A saída segue antes de esperar pelo outro lado
+                self.flush()
+                continue
+            received = self.sock.recv_into(self.view[self.end :])
+            if not received:
+                if self.end > self.start:
+                    raise ConnectionError(
+                        'conexão encerrada no meio de uma mensagem'
+                    )
+                return CLOSED
+            self.end += received
+
+    def reserve(self, size: int):
+        """Garante espaço para `size` bytes a partir de buffer[start]"""
+        if len(self.buffer) - self.start >= size:
+            return
+        available = self.end - self.start
+        if len(self.buffer) >= size:
+            # Move o começo da mensagem incompleta para o início
+            self.view[:available] = self.view[self.start : self.end]
+        else:
+            buffer = bytearray(max(size, 2 * len(self.buffer)))
+            buffer[:available] = self.view[self.start : self.end]
+            self.view.release()
+            self.buffer = buffer
+            self.view = memoryview(buffer)
+        self.start = 0
+        self.end = available
+
+    def fill(self) -> int:
+        """Lê para o buffer os bytes já disponíveis no socket"""
+        self.reserve(self.end - self.start + BUFFER_SIZE)
+        received = self.sock.recv_into(self.view[self.end :])
+        self.end += received
+        return received
+
+    def close(self):
+        # Respostas que ainda estão na saída seguem antes do fim
+        try:
+            self.flush()
+        except OSError:
+            pass
+        finally:
+            self.sock.close()
+
+
+class ClientConnection(Connection):
+    """
+    Conexão de um `c_channel`. Os pedidos podem ser enviados sem esperar
+    as respostas anteriores: cada um recebe um número, na ordem de
+    envio, e o servidor responde na mesma ordem. As respostas lidas
+    antes de serem pedidas ficam guardadas até reply()
+    """
+
+    __slots__ = ('pending', 'received', 'requests')
+
+    def __init__(self, sock: socket.socket, size: int = BUFFER_SIZE):
+        super().__init__(sock, size)
+        self.requests = 0
+        self.received = 0
+        self.pending: dict[int, Any] = {}
+
+    def request(self, value: Any) -> int:
+        """Envia o pedido sem esperar a resposta e devolve o seu número"""
+        self.send(value)
+        self.requests += 1
+        return self.requests - 1
+
+    def request_many(self, values: list) -> range:
+        """Envia os pedidos em uma única escrita e devolve os números"""
+        mark = len(self.output)
+        try:
+            for value in values:
+                self.write(value)
+        except Exception:
+            del self.output[mark:]
+            raise
+        self.flush()
+        first = self.requests
+        self.requests += len(values)
+        return range(first, self.requests)
+
+    def reply(self, handle: int) -> Any:
+        """Resposta do pedido `handle`, ou CLOSED se a conexão acabou"""
+        if handle in self.pending:
+            return self.pending.pop(handle)
+        if not self.received <= handle < self.requests:
+            raise ValueError(f'pedido {handle} inexistente ou já respondido')
+        while (value := self.receive()) is not CLOSED:
+            index = self.received
+            self.received += 1
+            if index == handle:
+                return value
+            self.pending[index] = value
+        return CLOSED
+
+
+async def receive_message(reader: asyncio.StreamReader) -> Any:
+    """Próximo valor de um leitor do asyncio, ou CLOSED no fim"""
+    try:
+        header = await reader.readexactly(HEADER.size)
+    except asyncio.IncompleteReadError as e:
+        if e.partial:
+            raise ConnectionError(
+                'conexão encerrada no meio de uma mensagem'
+            ) from None
+        return CLOSED
+    (length,) = HEADER.unpack(header)
+    if length > MAX_MESSAGE:
+        raise ConnectionError(f'mensagem de {length} bytes excede o limite')
+    return decode(await reader.readexactly(length))
+
+
+def write_message(writer: asyncio.StreamWriter, value: Any):
+    writer.write(frame(value))
+
+
+def frame(value: Any, out: bytearray | None = None) -> bytearray:
+    """Acrescenta a `out` a mensagem com `value` e o seu cabeçalho"""
+    if out is None:
+        out = bytearray()
+    # O valor é codificado logo depois do espaço do cabeçalho
+    start = len(out)
+    out += bytes(HEADER.size)
+    try:
+        encode(value, out)
+    except Exception:
+        del out[start:]
+        raise
+    HEADER.pack_into(out, start, len(out) - start - HEADER.size)
+    return out
+
+
+class ChannelServer(ABC):
+    """
+    Servidor de um `s_channel` em `host`:`port`. Cada thread que atende
+    clientes chama `handler` uma vez e recebe a função que responde às
+    mensagens, com um executor próprio. As mensagens do servidor vão
+    para os fluxos `io` da execução.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        description: str,
+        handler: Callable[[], Reply],
+        io: ExecutionIO,
+    ):
+        self.host = host
+        self.port = port
+        self.description = description
+        self.handler = handler
+        self.io = io
+
+    @abstractmethod
+    def serve(self):
+        pass
+
+    def log(self, *values: Any):
+        self.io.print(*values)
+
+
+class ThreadServer(ChannelServer):
+    def serve(self):
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.bind((self.host, self.port))
+        server.listen(10)
+
+        self.log(f'Servidor iniciado em {self.host}:{self.port}')
+        try:
+            while True:
+                try:
+                    conn, _ = server.accept()
+                    self.log('Cliente conectado.')
+                    threading.Thread(
+                        target=self.handle_client, args=(conn,)
+                    ).start()
+                except KeyboardInterrupt:
+                    self.log('Encerrando servidor...')
+                    break
+        finally:
+            server.close()
+
+    def handle_client(self, sock: socket.socket):
+        # Cada cliente roda em um contexto próprio, então as chamadas
+        # concorrentes não trocam frames entre si
+        reply = self.handler()
+        conn = Connection(sock)
+        try:
+            conn.send(self.description)
+            # As respostas de pedidos que chegaram juntos se acumulam e
+            # são enviadas quando receive() precisa esperar o cliente
+            while (data := conn.receive()) is not CLOSED:
+                ret = reply(data)
+                self.log(ret)
+                conn.write(ret)
+        except Exception as e:
+            self.log(f'Erro ao processar cliente: {e}')
+        finally:
+            self.log('Cliente desconectado.')
+            conn.close()
+
+
+class AsyncServer(ChannelServer):
+    reuse_port = False
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.executor = ThreadPoolExecutor(
+            handler_workers(), thread_name_prefix='minipar-channel'
+        )
+        # Uma função de resposta por thread do pool, e não por cliente
+        self.local = threading.local()
+
+    def serve(self):
+        try:
+            asyncio.run(self.main())
+        except KeyboardInterrupt:
+            self.log('Encerrando servidor...')
+        finally:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def main(self):
+        server = await asyncio.start_server(
+            self.handle_client,
+            self.host,
+            self.port,
+            family=socket.AF_INET,
+            backlog=socket.SOMAXCONN,
+            reuse_port=self.reuse_port,
+        )
+        self.started()
+        async with server:
+            await server.serve_forever()
+
+    def started(self):
+        self.log(f'Servidor iniciado em {self.host}:{self.port}')
+
+    def reply(self, batch: list) -> list:
+        reply = getattr(self.local, 'reply', None)
+        if reply is None:
+            reply = self.local.reply = self.handler()
+        return [reply(data) for data in batch]
+
+    async def handle_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        self.log('Cliente conectado.')
+        # As mensagens são lidas enquanto as anteriores são respondidas
+        messages = asyncio.Queue(PIPELINE_DEPTH)
+        reading = asyncio.create_task(read_messages(reader, messages))
+        try:
+            write_message(writer, self.description)
+            await writer.drain()
+            await self.answer(messages, writer)
+        except Exception as e:
+            self.log(f'Erro ao processar cliente: {e}')
+        finally:
+            reading.cancel()
+            self.log('Cliente desconectado.')
+            writer.close()
+
+    async def answer(
+        self, messages: asyncio.Queue, writer: asyncio.StreamWriter
+    ):
+        """
+        Responde em ordem às mensagens da fila até o fim da conexão. As
+        que já chegaram vão juntas em uma única chamada ao pool
+        """
+        loop = asyncio.get_running_loop()
+        end = None
+        while end is None:
+            batch = [await messages.get()]
+            while not messages.empty():
+                batch.append(messages.get_nowait())
+            if batch[-1] is CLOSED or isinstance(batch[-1], Exception):
+                end = batch.pop()
+            if batch:
+                replies = await loop.run_in_executor(
+                    self.executor, self.reply, batch
+                )
+                for ret in replies:
+                    self.log(ret)
+                    write_message(writer, ret)
+                await writer.drain()
+        if end is not CLOSED:
+            raise end
+
+
+async def read_messages(reader: asyncio.StreamReader, messages: asyncio.Queue):
+    """
+    Coloca na fila os valores recebidos por `reader` e, no fim, CLOSED
+    ou o erro da leitura. Um valor decodificado nunca é uma exceção
+    """
+    try:
+        while (value := await receive_message(reader)) is not CLOSED:
+            await messages.put(value)
+    except Exception as e:
+        await messages.put(e)
+    else:
+        await messages.put(CLOSED)
+
+
+class MessageWriter:
+    """Saída de um processo do modo process, enviada ao processo pai"""
+
+    __slots__ = ('messages',)
+
+    def __init__(self, messages: Queue):
+        self.messages = messages
+
+    def write(self, text: str) -> int:
+        self.messages.put(('output', text))
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+class ProcessWorker(AsyncServer):
+    """
+    Servidor de um dos processos do modo process. A saída, tanto do
+    servidor quanto da função do canal, vai para o processo pai pela
+    fila `messages`
+    """
+
+    reuse_port = True
+
+    def __init__(self, *args, messages: Queue, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.messages = messages
+        # Criado no processo pai, antes do fork
+        self.parent = os.getpid()
+        self.watcher: asyncio.Task | None = None
+
+    def started(self):
+        self.messages.put(('ready', os.getpid()))
+        self.watcher = asyncio.create_task(self.watch_parent())
+
+    async def watch_parent(self):
+        # Sem o pai, ninguém encerraria este processo, que continuaria
+        # ocupando a porta
+        while os.getppid() == self.parent:
+            await asyncio.sleep(1)
+        os._exit(0)
+
+    def serve(self):
+        # O Ctrl+C chega a todo o grupo; quem encerra os processos é o pai
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        # O ExecutionIO é a cópia do fork, compartilhada pelos executores
+        # deste processo
+        self.io.attach(MessageWriter(self.messages), self.io.stdin)
+        try:
+            super().serve()
+        except OSError as e:
+            self.messages.put(('error', str(e)))
+
+
+class ProcessServer(ChannelServer):
+    def serve(self):
+        if not hasattr(socket, 'SO_REUSEPORT') or (
+            'fork' not in get_all_start_methods()
+        ):
+            raise Exception(
+                'O modo process precisa de fork e SO_REUSEPORT, '
+                'indisponíveis neste sistema.'
+            )
+        context = get_context('fork')
+        messages = context.Queue()
+        processes = [
+            self.fork(context, messages) for _ in range(server_processes())
+        ]
+
+        try:
+            self.supervise(context, messages, processes)
+        except KeyboardInterrupt:
+            self.log('Encerrando servidor...')
+        finally:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.join()
+
+    def supervise(self, context, messages: Queue, processes: list):
+        """Escreve as mensagens dos processos e recria os que terminam"""
+        ready = 0
+        while True:
+            try:
+                kind, value = messages.get(timeout=1)
+            except queue.Empty:
+                self.replace_dead(context, messages, processes)
+                continue
+            if kind == 'output':
+                self.io.write(value)
+            elif kind == 'error':
+                raise Exception(f'Erro ao iniciar o servidor: {value}')
+            else:
+                ready += 1
+                if ready == len(processes):
+                    self.log(
+                        f'Servidor iniciado em {self.host}:{self.port} '
+                        f'com {ready} processos'
+                    )
+
+    def fork(self, context, messages: Queue):
+        worker = ProcessWorker(
+            self.host,
+            self.port,
+            self.description,
+            self.handler,
+            self.io,
+            messages=messages,
+        )
+        # Não é daemon: o `par` dentro da função do canal cria processos
+        process = context.Process(target=worker.serve, name='minipar-channel')
+        process.start()
+        return process
+
+    def replace_dead(self, context, messages: Queue, processes: list):
+        for i, process in enumerate(processes):
+            if not process.is_alive():
+                process.join()
+                processes[i] = self.fork(context, messages)
+
+
+SERVERS: dict[str, type[ChannelServer]] = {
+    'thread': ThreadServer,
+    'async': AsyncServer,
+    'process': ProcessServer,
+}
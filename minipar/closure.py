@@ -0,0 +1,468 @@
+"""
+Módulo do Backend de Closures
+
+O backend de closures percorre a AST uma única vez e a transforma
+em uma árvore de funções Python pré-ligadas: os operadores são
+resolvidos, as constantes pré-avaliadas e os avaliadores dos filhos
+capturados. A execução passa a ser apenas a chamada dessas funções,
+sem o despacho por nome de método a cada nó.
+"""
+
+import operator
+from typing import Any, Callable
+
+from minipar import ast
+from minipar.constants import CHANNEL_METHODS
+from minipar.interruptions import BREAK, CONTINUE, Completion, Kind
+from minipar.runner import RunnerImpl
+from minipar.symbol import Frame
+
+type Closure = Callable[[], Any]
+
+ARITHMETIC_OPERATORS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': operator.truediv,
+    '%': operator.mod,
+}
+
+# Comandos que podem devolver um sinal de término
+CONTROL_FLOW = (
+    ast.Return,
+    ast.Break,
+    ast.Continue,
+    ast.If,
+    ast.While,
+    ast.For,
+    ast.Seq,
+)
+
+RELATIONAL_OPERATORS = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '>': operator.gt,
+    '<': operator.lt,
+    '>=': operator.ge,
+    '<=': operator.le,
+}
+
+
+class ClosureRunnerImpl(RunnerImpl):  # noqa: PLR0904
+    compiled: dict[int, Closure]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.compiled = {}
+
+    def spawn(self) -> 'ClosureRunnerImpl':
+        # As closures capturam o executor que as compilou, então cada
+        # contexto compila as suas
+        runner = super().spawn()
+        runner.compiled = {}
+        return runner
+
+    def run(self, node: ast.Program):
+        self.frame = Frame([None] * node.nlocals)
+        if node.stmts:
+            self.compile_block(node.stmts)()
+
+    def execute(self, node: ast.Node):
+        return self.compile(node)()
+
+    def compile(self, node: ast.Node) -> Closure:
+        method_name = f'compile_{type(node).__name__}'
+        method = getattr(self, method_name, None)
+
+        if method:
+            return method(node)
+
+        # Nós sem compilação dedicada são delegados ao interpretador
+        exec_method = getattr(self, f'exec_{type(node).__name__}', None)
+        if exec_method is None:
+            raise Exception(f'{type(node).__name__} not implemented.')
+        return lambda: exec_method(node)
+
+    def compile_block(self, block: ast.Body) -> Closure:
+        stmts = tuple(self.compile(inst) for inst in block)
+        flow = tuple(isinstance(inst, CONTROL_FLOW) for inst in block)
+
+        if any(flow):
+            if len(stmts) == 1:
+                return stmts[0]
+            steps = tuple(zip(stmts, flow))
+
+            def block_signal():
+                for stmt, signals in steps:
+                    if signals:
+                        signal = stmt()
+                        if signal is not None:
+                            return signal
+                    else:
+                        stmt()
+                return None
+
+            return block_signal
+
+        match len(stmts):
+            case 0:
+                return lambda: None
+            case 1:
+                (only,) = stmts
+
+                def block_one():
+                    only()
+
+                return block_one
+            case _:
+
+                def block_many():
+                    for stmt in stmts:
+                        stmt()
+
+                return block_many
+
+    def compile_function(self, func: ast.FuncDef) -> Closure:
+        key = id(func)
+        body = self.compiled.get(key)
+        if body is None:
+            body = self.compile_block(func.body)
+            body = self.compiled[key] = self.metered(body)
+        return body
+
+    def metered(self, body: Closure) -> Closure:
+        """
+        Com orçamento de execução, o corpo consome um passo cada vez que
+        roda; sem ele, o corpo é devolvido como está
+        """
+        if self.fuel is None:
+            return body
+        consume = self.fuel.consume
+
+        def metered_body():
+            consume()
+            return body()
+
+        return metered_body
+
+    def compile_Declaration(self, node: ast.Declaration) -> Closure:
+        var_name = node.left.name
+        slot = node.left.slot
+        right = self.compile(node.right) if node.right else None
+
+        if right is None:
+
+            def declaration():
+                self.frame.slots[slot] = None
+                return var_name
+
+            return declaration
+
+        def declaration_value():
+            self.frame.slots[slot] = right()
+            return var_name
+
+        return declaration_value
+
+    def compile_Assign(self, node: ast.Assign) -> Closure:
+        right = self.compile(node.right)
+
+        if isinstance(node.left, ast.Access):
+            container = self.compile(node.left.id)
+            key = self.compile(node.left.expr)
+
+            def assign_item():
+                rvalue = right()
+                container()[key()] = rvalue
+
+            return assign_item
+
+        depth, slot = node.left.depth, node.left.slot
+
+        if depth == 0:
+
+            def assign_local():
+                self.frame.slots[slot] = right()
+
+            return assign_local
+
+        def assign():
+            rvalue = right()
+            self.frame.up(depth).slots[slot] = rvalue
+
+        return assign
+
+    def compile_FuncDef(self, node: ast.FuncDef) -> Closure:
+        def func_def():
+            if node.name not in self.func_table:
+                self.func_table[node.name] = node
+
+        return func_def
+
+    def compile_Constant(self, node: ast.Constant) -> Closure:
+        value = self.exec_Constant(node)
+        return lambda: value
+
+    @staticmethod
+    def compile_Literal(node: ast.Literal) -> Closure:
+        value = node.value
+        if node.copy:
+            return value.copy
+        return lambda: value
+
+    def compile_ID(self, node: ast.ID) -> Closure:
+        depth, slot = node.depth, node.slot
+
+        if depth == 0:
+            return lambda: self.frame.slots[slot]
+        return lambda: self.frame.up(depth).slots[slot]
+
+    def compile_Access(self, node: ast.Access) -> Closure:
+        index = self.compile(node.expr)
+        container = self.compile(node.id)
+
+        def access():
+            key = index()
+            return container()[key]
+
+        return access
+
+    def compile_Logical(self, node: ast.Logical) -> Closure:
+        left = self.compile(node.left)
+        right = self.compile(node.right)
+
+        match node.token.value:
+            case '&&':
+                return lambda: right() if (value := left()) else value
+            case '||':
+                # O operador `||` avalia os dois lados
+                def logical_or():
+                    value = left()
+                    other = right()
+                    return value or other
+
+                return logical_or
+            case _:
+
+                def logical_unknown():
+                    left()
+
+                return logical_unknown
+
+    def compile_Relational(self, node: ast.Relational) -> Closure:
+        left = self.compile(node.left)
+        right = self.compile(node.right)
+        oper = RELATIONAL_OPERATORS.get(node.token.value)
+
+        if oper is None:
+            return lambda: (left(), right()) and None
+        return lambda: oper(left(), right())
+
+    def compile_Arithmetic(self, node: ast.Arithmetic) -> Closure:
+        left = self.compile(node.left)
+        right = self.compile(node.right)
+        oper = ARITHMETIC_OPERATORS.get(node.token.value)
+
+        if oper is None:
+            return lambda: (left(), right()) and None
+        return lambda: oper(left(), right())
+
+    def compile_Unary(self, node: ast.Unary) -> Closure:
+        expr = self.compile(node.expr)
+
+        match node.token.value:
+            case '!':
+
+                def negation():
+                    value = expr()
+                    return None if value is None else not value
+
+                return negation
+            case '-':
+
+                def minus():
+                    value = expr()
+                    return None if value is None else value * (-1)
+
+                return minus
+            case _:
+
+                def unary_unknown():
+                    expr()
+
+                return unary_unknown
+
+    def compile_ArrayLiteral(self, node: ast.ArrayLiteral) -> Closure:
+        values = tuple(self.compile(value) for value in node.values)
+        return lambda: [value() for value in values]
+
+    def compile_DictLiteral(self, node: ast.DictLiteral) -> Closure:
+        entries = tuple(
+            (key, self.compile(value)) for key, value in node.entries.items()
+        )
+        return lambda: {key: value() for key, value in entries}
+
+    def compile_Call(self, node: ast.Call) -> Closure:
+        name = node.oper if node.oper else node.token.value
+        args = tuple(self.compile(arg) for arg in node.args)
+
+        if name in CHANNEL_METHODS:
+            conn_name = node.token.value
+            method = getattr(self, name)
+            return lambda: method(conn_name, *[arg() for arg in args])
+
+        if name in self.DEFAULT_FUNCTIONS:
+            function = self.DEFAULT_FUNCTIONS[name]
+            if node.oper:
+                receiver = self.compile(node.id)
+
+                def method_call():
+                    values = [arg() for arg in args]
+                    return function(receiver(), *values)
+
+                return method_call
+            return lambda: function(*[arg() for arg in args])
+
+        # O alvo é resolvido na primeira chamada e reaproveitado nas
+        # seguintes, junto com os valores padrão já compilados
+        site = None
+
+        def user_call():
+            nonlocal site
+            if site is None:
+                func = self.func_table.get(str(name))
+
+                if not func:
+                    self.io.print('DEBUG(not func):', name)
+                    raise Exception(node)
+
+                site = (
+                    func,
+                    self.compile_function(func),
+                    tuple(
+                        self.compile(default) if default else None
+                        for default in func.defaults
+                    ),
+                )
+            func, body, defaults = site
+
+            # Os argumentos são avaliados no frame de quem chama
+            values = [arg() for arg in args]
+            caller = self.frame
+            frame = self.frames.acquire(
+                func.nlocals,
+                caller.up(caller.level - func.level + 1),
+                func.level,
+            )
+            self.frame = frame
+            try:
+                slots = frame.slots
+                argc = min(len(values), func.nparams)
+                slots[:argc] = values[:argc]
+                for slot in range(argc, func.nparams):
+                    default = defaults[slot]
+                    if default is not None:
+                        slots[slot] = default()
+                signal = body()
+            finally:
+                self.frame = caller
+                self.frames.release(frame)
+            return None if signal is None else signal.value
+
+        return user_call
+
+    def compile_Return(self, node: ast.Return) -> Closure:
+        expr = self.compile(node.expr)
+
+        return lambda: Completion(Kind.RETURN, expr())
+
+    @staticmethod
+    def compile_Break(_: ast.Break) -> Closure:
+        return lambda: BREAK
+
+    @staticmethod
+    def compile_Continue(_: ast.Continue) -> Closure:
+        return lambda: CONTINUE
+
+    def compile_Comprehention(self, node: ast.Comprehention) -> Closure:
+        iterable = self.compile(node.iterable)
+        # Cada elemento consome um passo, como uma iteração do for
+        expr = self.metered(self.compile(node.expr))
+        slot = node.iterator.left.slot
+
+        def comprehention():
+            result = []
+            slots = self.frame.slots
+            for value in iterable():
+                slots[slot] = value
+                result.append(expr())
+            return result
+
+        return comprehention
+
+    def compile_For(self, node: ast.For) -> Closure:
+        iterable = self.compile(node.iterable)
+        body = self.metered(self.compile_block(node.body))
+        slot = node.iterator.left.slot
+
+        def for_():
+            slots = self.frame.slots
+            for value in iterable():
+                slots[slot] = value
+                signal = body()
+                if signal is not None:
+                    if signal is BREAK:
+                        break
+                    if signal is not CONTINUE:
+                        return signal
+
+        return for_
+
+    def compile_While(self, node: ast.While) -> Closure:
+        condition = self.compile(node.condition)
+        body = self.metered(self.compile_block(node.body))
+
+        def while_():
+            temp = condition()
+            while temp:
+                signal = body()
+                if signal is not None:
+                    if signal is CONTINUE:
+                        continue
+                    if signal is BREAK:
+                        break
+                    return signal
+                temp = condition()
+
+        return while_
+
+    def compile_If(self, node: ast.If) -> Closure:
+        condition = self.compile(node.condition)
+        body = self.compile_block(node.body)
+        else_body = (
+            self.compile_block(node.else_stmt)
+            if node.else_stmt is not None
+            else None
+        )
+
+        def if_():
+            if condition():
+                return body()
+            elif else_body is not None:
+                return else_body()
+
+        return if_
+
+    def compile_Seq(self, node: ast.Seq) -> Closure:
+        return self.compile_block(node.body)
+
+    def compile_Slice(self, node: ast.Slice) -> Closure:
+        container = self.compile_ID(node.id)
+        initial = self.compile(node.initial) if node.initial else None
+        final = self.compile(node.final) if node.final else None
+
+        if initial is None:
+            return lambda: container()[: final()]
+        if final is None:
+            return lambda: container()[initial() :]
+        return lambda: container()[initial() : final()]
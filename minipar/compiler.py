@@ -0,0 +1,631 @@
+"""
+Módulo do Compilador de Bytecode
+
+O compilador traduz a AST em um bytecode compacto executado pela
+máquina virtual de pilha (minipar.vm). Cada função vira um CodeObject
+com sua tabela de constantes, índices das variáveis locais e alvos de
+salto. Laços e as instruções break, continue e return são compilados
+como saltos, sem o uso de exceções.
+"""
+
+import operator
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any
+
+from minipar import ast
+from minipar.constants import CHANNEL_METHODS
+from minipar.runner import RunnerImpl
+
+
+class Op(IntEnum):
+    NOP = 0
+    LOAD_CONST = 1
+    LOAD_FAST = 2
+    STORE_FAST = 3
+    LOAD_DEREF = 4
+    STORE_DEREF = 5
+    POP_TOP = 6
+    BINARY_OP = 7
+    UNARY_NOT = 8
+    UNARY_NEG = 9
+    BINARY_SUBSCR = 10
+    STORE_SUBSCR = 11
+    SLICE = 12
+    BUILD_LIST = 13
+    BUILD_MAP = 14
+    LIST_APPEND = 15
+    JUMP = 16
+    POP_JUMP_IF_FALSE = 17
+    POP_JUMP_IF_TRUE = 18
+    JUMP_IF_FALSE_OR_POP = 19
+    GET_ITER = 20
+    FOR_ITER = 21
+    CALL_FUNCTION = 22
+    CALL_BUILTIN = 23
+    CALL_METHOD = 24
+    CALL_CHANNEL = 25
+    MAKE_FUNCTION = 26
+    RETURN_VALUE = 27
+    PAR = 28
+    EXEC_NODE = 29
+    SERVE = 30
+    PAR_FOR = 31
+    TICK = 32
+
+
+JUMP_OPS = {
+    Op.JUMP,
+    Op.POP_JUMP_IF_FALSE,
+    Op.POP_JUMP_IF_TRUE,
+    Op.JUMP_IF_FALSE_OR_POP,
+    Op.FOR_ITER,
+}
+
+# O operador `||` avalia os dois lados, por isso é um operador binário
+BINARY_OPERATORS: list[tuple[str, Any]] = [
+    ('+', operator.add),
+    ('-', operator.sub),
+    ('*', operator.mul),
+    ('/', operator.truediv),
+    ('%', operator.mod),
+    ('==', operator.eq),
+    ('!=', operator.ne),
+    ('>', operator.gt),
+    ('<', operator.lt),
+    ('>=', operator.ge),
+    ('<=', operator.le),
+    ('||', lambda a, b: a or b),
+]
+
+BINARY_INDEX = {
+    symbol: index for index, (symbol, _) in enumerate(BINARY_OPERATORS)
+}
+
+# Flags da instrução SLICE
+SLICE_START = 1
+SLICE_END = 2
+
+
+@dataclass
+class CodeObject:
+    name: str
+    level: int
+    code: list[int] = field(default_factory=list)
+    consts: list[Any] = field(default_factory=list)
+    varnames: list[str] = field(default_factory=list)
+    cells: list[tuple[int, int]] = field(default_factory=list)
+    calls: list[tuple] = field(default_factory=list)
+    nparams: int = 0
+    entries: list[int] = field(default_factory=list)
+    node: ast.FuncDef | None = None
+
+    @property
+    def nlocals(self) -> int:
+        return len(self.varnames)
+
+    def entry(self, argc: int) -> int:
+        """Posição inicial para uma chamada com `argc` argumentos"""
+        return self.entries[min(argc, self.nparams)]
+
+
+@dataclass
+class FunctionScope:
+    code: CodeObject
+    blocks: list[dict[str, int]] = field(default_factory=lambda: [{}])
+    loops: list[tuple[list[int], int]] = field(default_factory=list)
+
+    def declare(self, name: str) -> int:
+        slot = len(self.code.varnames)
+        self.code.varnames.append(name)
+        self.blocks[-1][name] = slot
+        return slot
+
+
+class Compiler(ABC):
+    @abstractmethod
+    def compile(self, node: ast.Program) -> CodeObject:
+        pass
+
+
+class CompilerImpl(Compiler):  # noqa: PLR0904
+    scopes: list[FunctionScope]
+    metered: bool
+
+    def __init__(self, metered: bool = False):
+        self.scopes = []
+        # Com orçamento de execução, laços e funções emitem TICK
+        self.metered = metered
+
+    @property
+    def scope(self) -> FunctionScope:
+        return self.scopes[-1]
+
+    @property
+    def code(self) -> CodeObject:
+        return self.scopes[-1].code
+
+    def compile(self, node: ast.Program) -> CodeObject:
+        module = CodeObject(name='<programa>', level=0)
+        module.entries = [0]
+        self.scopes.append(FunctionScope(module))
+        self.compile_block(node.stmts or [], new_scope=False)
+        self.emit(Op.LOAD_CONST, self.const(None))
+        self.emit(Op.RETURN_VALUE)
+        self.scopes.pop()
+        return module
+
+    def compile_expression(self, node: ast.Node) -> CodeObject:
+        """Compila um nó avulso no nível global (usado pelos canais)"""
+        code = CodeObject(name='<expressão>', level=0)
+        code.entries = [0]
+        self.scopes.append(FunctionScope(code))
+        self.visit(node)
+        self.emit(Op.RETURN_VALUE)
+        self.scopes.pop()
+        return code
+
+    # Emissão de instruções
+
+    def emit(self, op: Op, arg: int = 0) -> int:
+        self.code.code.extend((int(op), arg))
+        return len(self.code.code) - 1
+
+    def label(self) -> int:
+        return len(self.code.code)
+
+    def patch(self, position: int, target: int | None = None):
+        self.code.code[position] = self.label() if target is None else target
+
+    def const(self, value: Any) -> int:
+        consts = self.code.consts
+        if isinstance(value, (str, int, float, bool, type(None))):
+            for index, existing in enumerate(consts):
+                if type(existing) is type(value) and existing == value:
+                    return index
+        consts.append(value)
+        return len(consts) - 1
+
+    def call_entry(self, entry: tuple) -> int:
+        calls = self.code.calls
+        if entry in calls:
+            return calls.index(entry)
+        calls.append(entry)
+        return len(calls) - 1
+
+    # Resolução de nomes
+
+    def resolve(self, name: str) -> tuple[int, int]:
+        level = self.code.level
+        for scope in reversed(self.scopes):
+            for block in reversed(scope.blocks):
+                if name in block:
+                    return level - scope.code.level, block[name]
+        raise Exception(f'variável {name} não definida')
+
+    def load(self, name: str):
+        depth, slot = self.resolve(name)
+        if depth == 0:
+            self.emit(Op.LOAD_FAST, slot)
+        else:
+            self.emit(Op.LOAD_DEREF, self.cell(depth, slot))
+
+    def store(self, name: str):
+        depth, slot = self.resolve(name)
+        if depth == 0:
+            self.emit(Op.STORE_FAST, slot)
+        else:
+            self.emit(Op.STORE_DEREF, self.cell(depth, slot))
+
+    def cell(self, depth: int, slot: int) -> int:
+        cells = self.code.cells
+        if (depth, slot) in cells:
+            return cells.index((depth, slot))
+        cells.append((depth, slot))
+        return len(cells) - 1
+
+    # Visitantes
+
+    def visit(self, node: ast.Node):
+        method_name = f'compile_{type(node).__name__}'
+        method = getattr(self, method_name, None)
+
+        if method is None:
+            raise Exception(f'{type(node).__name__} not implemented.')
+        return method(node)
+
+    def compile_block(self, block: ast.Body, new_scope: bool = True):
+        if new_scope:
+            self.scope.blocks.append({})
+        for inst in block:
+            self.compile_statement(inst)
+        if new_scope:
+            self.scope.blocks.pop()
+
+    def compile_statement(self, node: ast.Node):
+        self.visit(node)
+        if isinstance(node, ast.Expression):
+            self.emit(Op.POP_TOP)
+
+    def compile_Declaration(self, node: ast.Declaration):
+        if node.right:
+            self.visit(node.right)
+        else:
+            self.emit(Op.LOAD_CONST, self.const(None))
+        self.emit(Op.STORE_FAST, self.scope.declare(node.left.name))
+
+    def compile_Assign(self, node: ast.Assign):
+        self.visit(node.right)
+
+        if isinstance(node.left, ast.Access):
+            self.visit(node.left.id)
+            self.visit(node.left.expr)
+            self.emit(Op.STORE_SUBSCR)
+        else:
+            self.store(node.left.name)
+
+    def compile_FuncDef(self, node: ast.FuncDef):
+        self.emit(Op.MAKE_FUNCTION, self.const(self.compile_function(node)))
+
+    def compile_function(self, node: ast.FuncDef) -> CodeObject:
+        function = CodeObject(
+            name=node.name,
+            level=self.code.level + 1,
+            nparams=len(node.params),
+            node=node,
+        )
+        self.scopes.append(FunctionScope(function))
+
+        defaults = []
+        for name, (_, default) in node.params.items():
+            defaults.append((self.scope.declare(name), default))
+
+        # Cada argumento ausente começa a execução em um ponto diferente
+        # do prólogo, avaliando apenas os valores padrão necessários
+        starts = []
+        for slot, default in defaults:
+            starts.append(self.label())
+            if default is not None:
+                self.visit(default)
+                self.emit(Op.STORE_FAST, slot)
+        body = self.label()
+        if self.metered:
+            self.emit(Op.TICK)
+        function.entries = [
+            next(
+                (
+                    start
+                    for start, (_, default) in zip(
+                        starts[argc:], defaults[argc:]
+                    )
+                    if default is not None
+                ),
+                body,
+            )
+            for argc in range(len(defaults) + 1)
+        ]
+
+        self.compile_block(node.body, new_scope=False)
+        self.emit(Op.LOAD_CONST, self.const(None))
+        self.emit(Op.RETURN_VALUE)
+        self.scopes.pop()
+        return function
+
+    def compile_Constant(self, node: ast.Constant):
+        self.emit(Op.LOAD_CONST, self.const(RunnerImpl.exec_Constant(node)))
+
+    def compile_Literal(self, node: ast.Literal):
+        if not node.copy:
+            self.emit(Op.LOAD_CONST, self.const(node.value))
+        elif isinstance(node.value, dict):
+            for key, value in node.value.items():
+                self.emit(Op.LOAD_CONST, self.const(key))
+                self.emit(Op.LOAD_CONST, self.const(value))
+            self.emit(Op.BUILD_MAP, len(node.value))
+        else:
+            for value in node.value:
+                self.emit(Op.LOAD_CONST, self.const(value))
+            self.emit(Op.BUILD_LIST, len(node.value))
+
+    def compile_ID(self, node: ast.ID):
+        self.load(node.token.value)
+
+    def compile_Access(self, node: ast.Access):
+        self.visit(node.id)
+        self.visit(node.expr)
+        self.emit(Op.BINARY_SUBSCR)
+
+    def compile_Logical(self, node: ast.Logical):
+        self.visit(node.left)
+
+        match node.token.value:
+            case '&&':
+                jump = self.emit(Op.JUMP_IF_FALSE_OR_POP)
+                self.visit(node.right)
+                self.patch(jump)
+            case '||':
+                self.visit(node.right)
+                self.emit(Op.BINARY_OP, BINARY_INDEX['||'])
+            case _:
+                self.emit(Op.POP_TOP)
+                self.emit(Op.LOAD_CONST, self.const(None))
+
+    def compile_binary(self, node: ast.Relational | ast.Arithmetic):
+        self.visit(node.left)
+        self.visit(node.right)
+
+        index = BINARY_INDEX.get(node.token.value)
+        if index is None:
+            self.emit(Op.POP_TOP)
+            self.emit(Op.POP_TOP)
+            self.emit(Op.LOAD_CONST, self.const(None))
+        else:
+            self.emit(Op.BINARY_OP, index)
+
+    def compile_Relational(self, node: ast.Relational):
+        self.compile_binary(node)
+
+    def compile_Arithmetic(self, node: ast.Arithmetic):
+        self.compile_binary(node)
+
+    def compile_Unary(self, node: ast.Unary):
+        self.visit(node.expr)
+
+        match node.token.value:
+            case '!':
+                self.emit(Op.UNARY_NOT)
+            case '-':
+                self.emit(Op.UNARY_NEG)
+            case _:
+                self.emit(Op.POP_TOP)
+                self.emit(Op.LOAD_CONST, self.const(None))
+
+    def compile_ArrayLiteral(self, node: ast.ArrayLiteral):
+        for value in node.values:
+            self.visit(value)
+        self.emit(Op.BUILD_LIST, len(node.values))
+
+    def compile_DictLiteral(self, node: ast.DictLiteral):
+        for key, value in node.entries.items():
+            self.emit(Op.LOAD_CONST, self.const(key))
+            self.visit(value)
+        self.emit(Op.BUILD_MAP, len(node.entries))
+
+    def compile_Call(self, node: ast.Call):
+        name = node.oper if node.oper else node.token.value
+
+        for arg in node.args:
+            self.visit(arg)
+
+        if name in CHANNEL_METHODS:
+            entry = (name, node.token.value, len(node.args))
+            self.emit(Op.CALL_CHANNEL, self.call_entry(entry))
+        elif name in RunnerImpl.DEFAULT_FUNCTIONS:
+            entry = (name, len(node.args))
+            if node.oper:
+                self.visit(node.id)
+                self.emit(Op.CALL_METHOD, self.call_entry(entry))
+            else:
+                self.emit(Op.CALL_BUILTIN, self.call_entry(entry))
+        else:
+            entry = (str(name), len(node.args))
+            self.emit(Op.CALL_FUNCTION, self.call_entry(entry))
+
+    def compile_Return(self, node: ast.Return):
+        self.visit(node.expr)
+        self.emit(Op.RETURN_VALUE)
+
+    def compile_Break(self, _: ast.Break):
+        breaks, _ = self.scope.loops[-1]
+        breaks.append(self.emit(Op.JUMP))
+
+    def compile_Continue(self, _: ast.Continue):
+        _, start = self.scope.loops[-1]
+        self.emit(Op.JUMP, start)
+
+    def compile_Comprehention(self, node: ast.Comprehention):
+        self.emit(Op.BUILD_LIST, 0)
+        self.visit(node.iterable)
+        self.emit(Op.GET_ITER)
+
+        self.scope.blocks.append({})
+        start = self.label()
+        exit_jump = self.emit(Op.FOR_ITER)
+        self.emit(Op.STORE_FAST, self.scope.declare(node.iterator.left.name))
+        if self.metered:
+            self.emit(Op.TICK)
+        self.visit(node.expr)
+        self.emit(Op.LIST_APPEND, 2)
+        self.emit(Op.JUMP, start)
+        self.patch(exit_jump)
+        self.scope.blocks.pop()
+
+    def compile_For(self, node: ast.For):
+        self.visit(node.iterable)
+        self.emit(Op.GET_ITER)
+
+        self.scope.blocks.append({})
+        start = self.label()
+        exit_jump = self.emit(Op.FOR_ITER)
+        self.emit(Op.STORE_FAST, self.scope.declare(node.iterator.left.name))
+        if self.metered:
+            self.emit(Op.TICK)
+
+        breaks: list[int] = []
+        self.scope.loops.append((breaks, start))
+        self.compile_block(node.body)
+        self.scope.loops.pop()
+        self.emit(Op.JUMP, start)
+
+        # O break precisa descartar o iterador que está na pilha
+        for jump in breaks:
+            self.patch(jump)
+        if breaks:
+            self.emit(Op.POP_TOP)
+        self.patch(exit_jump)
+        self.scope.blocks.pop()
+
+    def compile_While(self, node: ast.While):
+        self.visit(node.condition)
+        exit_jump = self.emit(Op.POP_JUMP_IF_FALSE)
+
+        # Assim como no interpretador, o continue volta para o corpo sem
+        # reavaliar a condição
+        start = self.label()
+        if self.metered:
+            self.emit(Op.TICK)
+        breaks: list[int] = []
+        self.scope.loops.append((breaks, start))
+        self.compile_block(node.body)
+        self.scope.loops.pop()
+        self.visit(node.condition)
+        self.emit(Op.POP_JUMP_IF_TRUE, start)
+
+        self.patch(exit_jump)
+        for jump in breaks:
+            self.patch(jump)
+
+    def compile_If(self, node: ast.If):
+        self.visit(node.condition)
+        else_jump = self.emit(Op.POP_JUMP_IF_FALSE)
+        self.compile_block(node.body)
+
+        if node.else_stmt is not None:
+            end_jump = self.emit(Op.JUMP)
+            self.patch(else_jump)
+            self.compile_block(node.else_stmt)
+            self.patch(end_jump)
+        else:
+            self.patch(else_jump)
+
+    def compile_Par(self, node: ast.Par):
+        tasks = []
+        for inst in node.body:
+            # Cada tarefa só avalia os argumentos no frame atual, com o
+            # mesmo layout de variáveis; a chamada fica com o escalonador
+            outer = self.code
+            thunk = CodeObject(
+                name='<par>',
+                level=outer.level,
+                varnames=outer.varnames,
+                entries=[0],
+            )
+            self.scope.code = thunk
+
+            name = inst.oper if inst.oper else inst.token.value
+            if name in CHANNEL_METHODS:
+                kind = 'channel'
+                self.visit(inst)
+            else:
+                if name in RunnerImpl.DEFAULT_FUNCTIONS:
+                    kind = 'method' if inst.oper else 'builtin'
+                else:
+                    kind = 'function'
+                if kind == 'method':
+                    self.visit(inst.id)
+                for arg in inst.args:
+                    self.visit(arg)
+                self.emit(Op.BUILD_LIST, len(inst.args) + (kind == 'method'))
+
+            self.emit(Op.RETURN_VALUE)
+            self.scope.code = outer
+            tasks.append((kind, str(name), thunk))
+        self.emit(Op.PAR, self.const(tuple(tasks)))
+
+    def compile_ParFor(self, node: ast.ParFor):
+        self.visit(node.iterable)
+        body = self.compile_function(node.body)
+        self.emit(Op.PAR_FOR, self.const((body, node.reduction)))
+
+    def compile_Seq(self, node: ast.Seq):
+        for inst in node.body:
+            self.compile_statement(inst)
+
+    def compile_Slice(self, node: ast.Slice):
+        self.load(node.id.token.value)
+
+        flags = 0
+        if node.initial is not None:
+            self.visit(node.initial)
+            flags |= SLICE_START
+        if node.final is not None:
+            self.visit(node.final)
+            flags |= SLICE_END
+        self.emit(Op.SLICE, flags)
+
+    def compile_CChannel(self, node: ast.CChannel):
+        self.emit(Op.EXEC_NODE, self.const(node))
+
+    def compile_SChannel(self, node: ast.SChannel):
+        self.visit(node.description)
+        self.emit(Op.SERVE, self.const(node))
+
+
+def disassemble(code: CodeObject) -> str:
+    """Gera a listagem legível do bytecode e das funções aninhadas"""
+    lines = [
+        f'Disassembly of {code.name} '
+        f'(level={code.level}, params={code.nparams}, '
+        f'locals={code.nlocals}):'
+    ]
+    targets = {
+        code.code[pc + 1]
+        for pc in range(0, len(code.code), 2)
+        if code.code[pc] in JUMP_OPS
+    }
+    targets.update(code.entries)
+
+    nested = []
+    for pc in range(0, len(code.code), 2):
+        op, arg = Op(code.code[pc]), code.code[pc + 1]
+        marker = '>>' if pc in targets else '  '
+        lines.append(
+            f'{marker} {pc:5} {op.name:22} {arg:<4} {describe(code, op, arg)}'
+        )
+        if op == Op.MAKE_FUNCTION:
+            nested.append(code.consts[arg])
+        elif op == Op.PAR:
+            nested.extend(thunk for *_, thunk in code.consts[arg])
+        elif op == Op.PAR_FOR:
+            nested.append(code.consts[arg][0])
+
+    for inner in nested:
+        lines.append('')
+        lines.append(disassemble(inner))
+    return '\n'.join(lines)
+
+
+def describe(code: CodeObject, op: Op, arg: int) -> str:  # noqa: PLR0911, PLR0912
+    match op:
+        case Op.LOAD_CONST:
+            value = code.consts[arg]
+            if isinstance(value, CodeObject):
+                return f'(<código {value.name}>)'
+            return f'({value!r})'
+        case Op.LOAD_FAST | Op.STORE_FAST:
+            return f'({code.varnames[arg]})'
+        case Op.LOAD_DEREF | Op.STORE_DEREF:
+            depth, slot = code.cells[arg]
+            return f'(depth={depth}, slot={slot})'
+        case Op.BINARY_OP:
+            return f'({BINARY_OPERATORS[arg][0]})'
+        case Op.CALL_FUNCTION | Op.CALL_BUILTIN | Op.CALL_METHOD:
+            name, argc = code.calls[arg]
+            return f'({name}, argc={argc})'
+        case Op.CALL_CHANNEL:
+            name, conn_name, argc = code.calls[arg]
+            return f'({conn_name}.{name}, argc={argc})'
+        case Op.MAKE_FUNCTION:
+            return f'({code.consts[arg].name})'
+        case Op.PAR:
+            return f'({len(code.consts[arg])} tarefas)'
+        case Op.PAR_FOR:
+            _, reduction = code.consts[arg]
+            return f'(redução {reduction})' if reduction else ''
+        case Op.EXEC_NODE | Op.SERVE:
+            return f'({type(code.consts[arg]).__name__})'
+        case _ if op in JUMP_OPS:
+            return f'(to {arg})'
+        case _:
+            return ''
@@ -0,0 +1,19 @@
+"""
+Módulo das Constantes da Linguagem
+
+Nomes compartilhados entre a análise e os módulos de execução, mantidos
+aqui para que o front end não dependa do runtime dos canais
+"""
+
+# Modos de atendimento aceitos por um s_channel
+SERVER_MODES = ('thread', 'async', 'process')
+
+# Métodos das conexões de um c_channel: o ID da chamada é o nome do
+# canal, e não uma variável
+CHANNEL_METHODS = frozenset({
+    'send',
+    'send_async',
+    'receive',
+    'send_many',
+    'close',
+})
@@ -0,0 +1,101 @@
+"""
+Módulo do Contexto de Execução
+
+O contexto de execução guarda o estado de uma execução de programa que
+não pertence à AST: a tabela de funções, as conexões abertas pelos
+canais, os fluxos de entrada e saída, o orçamento de execução e o pool
+de frames. Cada executor recebe o seu contexto, então execuções
+diferentes no mesmo processo não compartilham funções, sockets nem
+saída.
+
+Um contexto pode ser reaproveitado: reset() fecha as conexões, esvazia
+as tabelas e solta os fluxos, mantendo os frames livres do pool, e o
+ContextPool guarda um número limitado de contextos prontos para as
+próximas execuções. Assim a memória de um processo que atende muitas
+execuções não cresce com o número de execuções.
+"""
+
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import TextIO
+
+from minipar import ast
+from minipar.channel import ClientConnection
+from minipar.fuel import Fuel
+from minipar.streams import ExecutionIO
+from minipar.symbol import FramePool
+
+
+class ExecutionContext:
+    __slots__ = ('connection_table', 'frames', 'fuel', 'func_table', 'io')
+
+    def __init__(
+        self,
+        func_table: dict[str, ast.FuncDef] | None = None,
+        connection_table: dict[str, ClientConnection] | None = None,
+        frames: FramePool | None = None,
+        io: ExecutionIO | None = None,
+        fuel: Fuel | None = None,
+    ):
+        self.func_table = {} if func_table is None else func_table
+        self.connection_table = (
+            {} if connection_table is None else connection_table
+        )
+        self.frames = FramePool() if frames is None else frames
+        self.io = ExecutionIO() if io is None else io
+        self.fuel = fuel
+
+    def reset(self):
+        for conn in self.connection_table.values():
+            try:
+                conn.close()
+            except OSError:
+                pass
+        # As tabelas são limpas no lugar: executores que ainda apontam
+        # para elas enxergam o contexto vazio
+        self.connection_table.clear()
+        self.func_table.clear()
+        self.io.attach(None, None)
+        self.fuel = None
+
+
+class ContextPool:
+    """
+    Pool de contextos de execução. Um contexto devolvido é limpo e
+    guardado para a próxima execução, até `limit` contextos.
+    """
+
+    __slots__ = ('free', 'limit', 'lock')
+
+    def __init__(self, limit: int = 8):
+        self.free: list[ExecutionContext] = []
+        self.limit = limit
+        self.lock = threading.Lock()
+
+    def acquire(self) -> ExecutionContext:
+        with self.lock:
+            if self.free:
+                return self.free.pop()
+        return ExecutionContext()
+
+    def release(self, context: ExecutionContext):
+        context.reset()
+        with self.lock:
+            if len(self.free) < self.limit:
+                self.free.append(context)
+
+    @contextmanager
+    def context(
+        self,
+        stdout: TextIO | None = None,
+        stdin: TextIO | None = None,
+        fuel: Fuel | None = None,
+    ) -> Iterator[ExecutionContext]:
+        context = self.acquire()
+        context.io.attach(stdout, stdin)
+        context.fuel = fuel
+        try:
+            yield context
+        finally:
+            self.release(context)
@@ -0,0 +1,405 @@
+"""
+Módulo do Pool de Execuções
+
+O ExecutionPool executa programas Minipar em processos trabalhadores
+criados antes das requisições, cada um com o interpretador já
+importado. Um programa que não termina prende só o seu trabalhador: ao
+passar do tempo limite, o processo é morto, junto com os processos que
+o `par` do programa criou, e substituído por outro.
+
+A fila de espera é limitada. Quando todos os trabalhadores estão
+ocupados e a fila está cheia, a execução é recusada com PoolFull em vez
+de esperar indefinidamente. O pool mantém métricas da profundidade da
+fila, do tempo de espera e da latência das execuções.
+
+Com stream(), a saída chega em trechos enquanto o programa roda. Os
+trechos passam por uma fila pequena até quem os consome: se o leitor
+atrasa, a fila enche, o trabalhador deixa de ser lido e o programa
+espera na próxima escrita. Se o leitor desiste, a execução é
+interrompida.
+"""
+
+import asyncio
+import os
+import queue
+import signal
+import threading
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Callable
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from functools import partial
+from multiprocessing import get_all_start_methods, get_context
+from multiprocessing.connection import Connection
+from typing import Any
+
+# O forkserver carrega o interpretador uma vez e cada trabalhador novo
+# já nasce com ele importado
+if 'forkserver' in get_all_start_methods():
+    CONTEXT = get_context('forkserver')
+    CONTEXT.set_forkserver_preload(['minipar.interpreter'])
+else:
+    CONTEXT = get_context('spawn')
+
+# Execuções mais recentes consideradas nas métricas de latência
+SAMPLES = 1024
+
+# Trechos de saída guardados entre o trabalhador e quem os consome
+STREAM_QUEUE = 8
+
+
+class PoolFull(Exception):
+    def __init__(self):
+        super().__init__('Servidor ocupado, tente novamente em instantes.')
+
+
+class StreamClosed(Exception):
+    pass
+
+
+def limit_memory(memory: int) -> bool:
+    """
+    Limita o espaço de endereçamento do processo ao tamanho atual mais
+    `memory` bytes. Devolve False onde não há como fazer isso
+    """
+    try:
+        import resource  # noqa: PLC0415
+
+        with open('/proc/self/statm', encoding='ascii') as f:
+            size = int(f.read().split()[0]) * os.sysconf('SC_PAGE_SIZE')
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        resource.setrlimit(resource.RLIMIT_AS, (size + memory, hard))
+    except (ImportError, OSError, ValueError):
+        return False
+    return True
+
+
+def serve(conn: Connection, memory_limit: int | None):
+    """
+    Laço do trabalhador: executa os pedidos até receber None. A saída
+    volta como ('chunk', texto) enquanto o programa roda, quando o
+    pedido é de stream, e termina com ('done', texto)
+    """
+    from minipar.interpreter import Minipar  # noqa: PLC0415
+    from minipar.streams import OutputBuffer, OutputStream  # noqa: PLC0415
+
+    # O trabalhador lidera um grupo de processos próprio, herdado pelo
+    # forkserver e pelos processos do `par`: Worker.kill() encerra todos
+    if hasattr(os, 'setpgid'):
+        os.setpgid(0, 0)
+
+    # O limite do processo não custa nada durante a execução; sem ele,
+    # a memória é medida pelo orçamento de cada programa
+    if memory_limit is not None and limit_memory(memory_limit):
+        memory_limit = None
+
+    minipar = Minipar()
+    while (request := conn.recv()) is not None:
+        request['memory_limit'] = memory_limit
+        limit = request.pop('output_limit')
+        if request.pop('stream'):
+            output = OutputStream(partial(send_chunk, conn), limit)
+        else:
+            output = OutputBuffer(limit)
+        try:
+            with output:
+                minipar.execute(output_buffer=output, **request)
+        except Exception as e:
+            output.note(f'[erro] {e}\n')
+            output.flush()
+        conn.send(('done', output.getvalue()))
+
+
+def send_chunk(conn: Connection, text: str):
+    conn.send(('chunk', text))
+
+
+class Worker:
+    __slots__ = ('conn', 'process')
+
+    def __init__(self, memory_limit: int | None = None):
+        self.conn, child = CONTEXT.Pipe()
+        # Não é daemon: o `par` dentro do programa cria processos
+        self.process = CONTEXT.Process(
+            target=serve,
+            args=(child, memory_limit),
+            name='minipar-execution',
+        )
+        self.process.start()
+        child.close()
+
+    def run(
+        self,
+        request: dict[str, Any],
+        timeout: float,
+        sink: Callable[[str], Any] | None = None,
+    ) -> str | None:
+        """
+        Saída do programa, ou None se o tempo limite acabou. Os trechos
+        de um pedido de stream são entregues a `sink`
+        """
+        deadline = time.monotonic() + timeout
+        self.conn.send(request)
+        while (remaining := deadline - time.monotonic()) > 0:
+            if not self.conn.poll(remaining):
+                break
+            kind, text = self.conn.recv()
+            if kind == 'done':
+                return text
+            sink(text)
+        return None
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(1)
+        self.kill()
+
+    def kill(self):
+        if hasattr(os, 'killpg'):
+            try:
+                os.killpg(self.process.pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                # O grupo ainda não existe ou já terminou
+                pass
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class Metrics:
+    __slots__ = (
+        'busy',
+        'cancelled',
+        'completed',
+        'crashes',
+        'latencies',
+        'lock',
+        'pending',
+        'rejected',
+        'timeouts',
+        'waits',
+    )
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Execuções aceitas e ainda não terminadas, na fila ou rodando
+        self.pending = 0
+        self.busy = 0
+        self.cancelled = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.crashes = 0
+        self.latencies: deque[float] = deque(maxlen=SAMPLES)
+        self.waits: deque[float] = deque(maxlen=SAMPLES)
+
+    @staticmethod
+    def percentiles(samples: deque[float]) -> dict[str, float]:
+        if not samples:
+            return {'p50': 0.0, 'p95': 0.0, 'max': 0.0}
+        ordered = sorted(samples)
+        last = len(ordered) - 1
+        return {
+            'p50': ordered[last // 2],
+            'p95': ordered[last * 95 // 100],
+            'max': ordered[last],
+        }
+
+    def snapshot(self) -> dict[str, Any]:
+        with self.lock:
+            return {
+                'queue_depth': self.pending - self.busy,
+                'busy': self.busy,
+                'completed': self.completed,
+                'cancelled': self.cancelled,
+                'rejected': self.rejected,
+                'timeouts': self.timeouts,
+                'crashes': self.crashes,
+                'wait_seconds': self.percentiles(self.waits),
+                'latency_seconds': self.percentiles(self.latencies),
+            }
+
+
+class ExecutionPool:
+    """
+    Pool de `workers` processos com fila de até `queue_limit` execuções
+    em espera e tempo limite de `timeout` segundos por execução. A saída
+    é limitada a `output_limit` caracteres em run() e a `stream_limit`
+    bytes em stream(). `fuel` e `memory_limit` são o orçamento de passos
+    e de memória de cada programa.
+    """
+
+    def __init__(  # noqa: PLR0913, PLR0917
+        self,
+        workers: int | None = None,
+        queue_limit: int = 32,
+        timeout: float = 10.0,
+        output_limit: int | None = None,
+        stream_limit: int | None = None,
+        fuel: int | None = None,
+        memory_limit: int | None = None,
+    ):
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_limit = queue_limit
+        self.timeout = timeout
+        self.output_limit = output_limit
+        self.stream_limit = stream_limit
+        self.fuel = fuel
+        self.memory_limit = memory_limit
+        self.metrics = Metrics()
+        self.idle: queue.SimpleQueue[Worker] = queue.SimpleQueue()
+        self.pool: list[Worker] = []
+        # Threads que esperam pelas respostas sem prender o event loop
+        self.executor = ThreadPoolExecutor(
+            self.workers, thread_name_prefix='minipar-execution'
+        )
+
+    def start(self):
+        for _ in range(self.workers):
+            worker = Worker(self.memory_limit)
+            self.pool.append(worker)
+            self.idle.put(worker)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        for worker in self.pool:
+            worker.stop()
+        self.pool.clear()
+
+    def admit(self):
+        metrics = self.metrics
+        with metrics.lock:
+            if metrics.pending >= self.workers + self.queue_limit:
+                metrics.rejected += 1
+                raise PoolFull
+            metrics.pending += 1
+
+    def run(
+        self, source: str, input_data: str = '', backend: str = 'tree'
+    ) -> str:
+        self.admit()
+        return self.execute(source, input_data, backend, time.monotonic())
+
+    async def run_async(
+        self, source: str, input_data: str = '', backend: str = 'tree'
+    ) -> str:
+        self.admit()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor,
+            self.execute,
+            source,
+            input_data,
+            backend,
+            time.monotonic(),
+        )
+
+    def stream(
+        self, source: str, input_data: str = '', backend: str = 'tree'
+    ) -> AsyncIterator[str]:
+        """
+        Trechos da saída do programa. A admissão acontece já na chamada,
+        então PoolFull é levantado antes do primeiro trecho
+        """
+        self.admit()
+        return self.chunks(source, input_data, backend, time.monotonic())
+
+    async def chunks(
+        self, source: str, input_data: str, backend: str, queued: float
+    ) -> AsyncIterator[str]:
+        loop = asyncio.get_running_loop()
+        chunks: asyncio.Queue[str | None] = asyncio.Queue(STREAM_QUEUE)
+        closed = threading.Event()
+
+        def sink(text: str | None):
+            # Espera vaga na fila; se o leitor desistiu, a execução para
+            future = asyncio.run_coroutine_threadsafe(chunks.put(text), loop)
+            while True:
+                try:
+                    return future.result(0.1)
+                except FutureTimeout:
+                    if closed.is_set():
+                        future.cancel()
+                        raise StreamClosed from None
+
+        def run():
+            try:
+                sink(self.execute(source, input_data, backend, queued, sink))
+                sink(None)
+            except StreamClosed:
+                pass
+
+        done = loop.run_in_executor(self.executor, run)
+        try:
+            while (text := await chunks.get()) is not None:
+                if text:
+                    yield text
+        finally:
+            closed.set()
+        await done
+
+    def execute(
+        self,
+        source: str,
+        input_data: str,
+        backend: str,
+        queued: float,
+        sink: Callable[[str], Any] | None = None,
+    ) -> str:
+        metrics = self.metrics
+        worker = self.idle.get()
+        start = time.monotonic()
+        with metrics.lock:
+            metrics.busy += 1
+            metrics.waits.append(start - queued)
+
+        request = {
+            'source': source,
+            'input_data': input_data,
+            'backend': backend,
+            'stream': sink is not None,
+            'output_limit': self.output_limit
+            if sink is None
+            else self.stream_limit,
+            'fuel': self.fuel,
+        }
+        timeout = crash = cancelled = False
+        try:
+            output = worker.run(request, self.timeout, sink)
+            if output is None:
+                timeout = True
+                output = (
+                    f'[erro] Tempo limite de {self.timeout:g}s excedido.\n'
+                )
+                worker = self.replace(worker)
+        except (EOFError, OSError):
+            crash = True
+            output = '[erro] O processo da execução terminou.\n'
+            worker = self.replace(worker)
+        except StreamClosed:
+            # O programa ficou no meio: o trabalhador não é reaproveitado
+            cancelled = True
+            output = ''
+            worker = self.replace(worker)
+        finally:
+            self.idle.put(worker)
+            with metrics.lock:
+                metrics.pending -= 1
+                metrics.busy -= 1
+                metrics.completed += 1
+                metrics.timeouts += timeout
+                metrics.crashes += crash
+                metrics.cancelled += cancelled
+                metrics.latencies.append(time.monotonic() - start)
+        return output
+
+    def replace(self, worker: Worker) -> Worker:
+        worker.kill()
+        new = Worker(self.memory_limit)
+        self.pool[self.pool.index(worker)] = new
+        return new
@@ -0,0 +1,192 @@
+"""
+Módulo do Orçamento de Execução
+
+O combustível limita o trabalho de um programa: cada iteração de laço e
+cada chamada de função do usuário consome um passo, e o programa é
+interrompido com FuelExhausted quando os passos acabam. Com um limite
+de memória, a memória alocada desde o início da execução é medida com
+tracemalloc a cada CHECK_INTERVAL passos.
+
+Os executores só contam passos quando a execução tem um orçamento: sem
+ele, o código gerado é o mesmo de sempre e a contagem não custa nada.
+A medição de memória vale para o processo inteiro, então é precisa
+quando o processo executa um programa por vez, como os trabalhadores
+do pool do editor. Orçamentos simultâneos compartilham o tracemalloc,
+que só é desligado quando o último deles é fechado.
+
+As tarefas do `par` recebem um orçamento próprio, com uma parte igual
+dos passos que restam à execução, por share() e task_fuel(). Quando o
+bloco termina, os passos usados pelas tarefas são descontados da
+execução por charge(), então N tarefas não gastam N vezes o orçamento.
+"""
+
+import math
+import threading
+import tracemalloc
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+# Passos, bytes e limite informado nos erros de um orçamento, como
+# recebidos por Fuel()
+type Budget = tuple[int | None, int | None, int | None]
+
+# Passos entre duas medições de memória
+CHECK_INTERVAL = 1024
+
+
+class FuelExhausted(Exception):
+    def __init__(self, steps: int):
+        super().__init__(f'limite de {steps} passos de execução excedido')
+        self.steps = steps
+
+    def __reduce__(self):
+        # Volta das tarefas do `par` com o limite, não com a mensagem
+        return type(self), (self.steps,)
+
+
+class MemoryLimitExceeded(Exception):
+    def __init__(self, memory: int):
+        super().__init__(f'limite de memória de {memory} bytes excedido')
+        self.memory = memory
+
+    def __reduce__(self):
+        return type(self), (self.memory,)
+
+
+class MemoryTracer:
+    """
+    Liga o tracemalloc enquanto houver orçamentos com limite de memória
+    abertos no processo. Só o desliga se foi ligado aqui.
+    """
+
+    __slots__ = ('count', 'lock', 'started')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.count = 0
+        self.started = False
+
+    def acquire(self):
+        with self.lock:
+            if self.count == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self.started = True
+            self.count += 1
+
+    def release(self):
+        with self.lock:
+            self.count -= 1
+            if self.count == 0 and self.started:
+                tracemalloc.stop()
+                self.started = False
+
+
+TRACER = MemoryTracer()
+
+
+class Fuel:
+    """
+    Orçamento de `steps` passos e `memory` bytes, ambos opcionais. Os
+    passos são consumidos em lotes: consume() só decrementa um contador
+    e as verificações ficam para o fim de cada lote.
+    """
+
+    __slots__ = (
+        'baseline',
+        'left',
+        'limit',
+        'memory',
+        'remaining',
+        'steps',
+        'traced',
+    )
+
+    def __init__(
+        self,
+        steps: int | None = None,
+        memory: int | None = None,
+        limit: int | None = None,
+    ):
+        self.steps = steps
+        self.memory = memory
+        # Nas tarefas do `par`, os erros informam o limite da execução, e
+        # não a parte dele que coube à tarefa
+        self.limit = steps if limit is None else limit
+        # Passos ainda não entregues a um lote
+        self.left = math.inf if steps is None else steps
+        self.remaining = 0
+        self.traced = False
+        self.baseline = 0
+        if memory is not None:
+            TRACER.acquire()
+            self.traced = True
+            self.baseline = tracemalloc.get_traced_memory()[0]
+        self.refill()
+
+    def refill(self):
+        batch = self.left if self.memory is None else CHECK_INTERVAL
+        batch = min(batch, self.left)
+        self.left -= batch
+        self.remaining = batch
+
+    def consume(self):
+        self.remaining -= 1
+        if self.remaining < 0:
+            self.checkpoint()
+
+    def checkpoint(self):
+        if self.memory is not None:
+            used = tracemalloc.get_traced_memory()[0] - self.baseline
+            if used > self.memory:
+                raise MemoryLimitExceeded(self.memory)
+        if self.left <= 0:
+            raise FuelExhausted(self.limit)
+        self.refill()
+        self.remaining -= 1
+
+    def available(self) -> int:
+        """Passos que ainda podem ser consumidos"""
+        return self.left + max(self.remaining, 0)
+
+    def used(self) -> int:
+        """Passos consumidos desde a criação do orçamento"""
+        if self.steps is None:
+            return 0
+        return self.steps - self.available()
+
+    def share(self, tasks: int = 1) -> Budget:
+        """
+        Orçamento de cada uma de `tasks` tarefas do `par`: uma parte igual
+        dos passos que restam e o mesmo limite de memória
+        """
+        if self.steps is None:
+            return None, self.memory, None
+        return self.available() // tasks, self.memory, self.limit
+
+    def charge(self, steps: int):
+        """Desconta os passos usados pelas tarefas do `par`"""
+        if self.steps is None:
+            return
+        left = self.available() - steps
+        if left < 0:
+            raise FuelExhausted(self.limit)
+        self.left = left
+        self.refill()
+
+    def close(self):
+        if self.traced:
+            TRACER.release()
+            self.traced = False
+
+
+@contextmanager
+def task_fuel(budget: Budget | None) -> Iterator[Fuel | None]:
+    """Orçamento de uma tarefa do `par`, fechado quando ela termina"""
+    if budget is None:
+        yield None
+        return
+    fuel = Fuel(*budget)
+    try:
+        yield fuel
+    finally:
+        fuel.close()
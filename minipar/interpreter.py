@@ -1,22 +1,38 @@
 import io
-import sys
+import os
 from abc import ABC, abstractmethod
-from contextlib import contextmanager, redirect_stderr, redirect_stdout
+from collections.abc import Callable
+from functools import partial
+from typing import Any, TextIO
 
+from minipar import ast
+from minipar.cache import ProgramCache
+from minipar.closure import ClosureRunnerImpl
+from minipar.context import ContextPool
+from minipar.fuel import Fuel
 from minipar.lexer import LexerImpl
+from minipar.optimizer import OptimizerImpl
 from minipar.parser import ParserImpl
-from minipar.runner import RunnerImpl
+from minipar.resolver import ResolverImpl
+from minipar.runner import Runner, RunnerImpl
 from minipar.semantic import SemanticImpl
+from minipar.streams import OutputBuffer
+from minipar.transpiler import PythonRunnerImpl
+from minipar.vm import VirtualMachineImpl
 
+BACKENDS: dict[str, type[Runner]] = {
+    'tree': RunnerImpl,
+    'closure': ClosureRunnerImpl,
+    'vm': VirtualMachineImpl,
+    'python': PythonRunnerImpl,
+}
 
-@contextmanager
-def redirect_stdin(new_stdin):
-    old_stdin = sys.stdin
-    sys.stdin = new_stdin
-    try:
-        yield
-    finally:
-        sys.stdin = old_stdin
+# Contextos de execução reaproveitados entre as chamadas de Minipar.run
+CONTEXTS = ContextPool()
+
+# Programas já analisados, indexados pelo hash do código-fonte. Com
+# MINIPAR_PROGRAM_CACHE, o cache também é guardado nesse diretório
+PROGRAMS = ProgramCache(directory=os.environ.get('MINIPAR_PROGRAM_CACHE'))
 
 
 class Interpreter(ABC):
@@ -26,31 +42,204 @@ class Interpreter(ABC):
 
 
 class Minipar(Interpreter):
-    def run(self, source: str, input_data: str = '') -> str:
+    def run(  # noqa: PLR0913
+        self,
+        source: str,
+        input_data: str = '',
+        backend: str = 'tree',
+        optimize: bool = True,
+        *,
+        output_limit: int | None = None,
+        fuel: int | None = None,
+        memory_limit: int | None = None,
+    ) -> str:
+        """
+        Executa o programa e devolve a saída. `fuel` limita os passos de
+        execução (iterações de laço e chamadas de função) e
+        `memory_limit`, os bytes alocados durante a execução
+        """
+        output_buffer = OutputBuffer(output_limit)
+        self.execute(
+            source,
+            output_buffer,
+            input_data,
+            backend,
+            optimize,
+            fuel=fuel,
+            memory_limit=memory_limit,
+        )
+        return output_buffer.getvalue()
+
+    def execute(  # noqa: PLR0913
+        self,
+        source: str,
+        output_buffer: OutputBuffer,
+        input_data: str = '',
+        backend: str = 'tree',
+        optimize: bool = True,
+        *,
+        fuel: int | None = None,
+        memory_limit: int | None = None,
+    ):
+        """Executa o programa escrevendo a saída em `output_buffer`"""
         if not source:
             raise Exception('Não há código para executar.')
+        if backend not in BACKENDS:
+            raise Exception(f'Backend {backend} desconhecido.')
+
+        def start(runner: Runner):
+            if isinstance(runner, PythonRunnerImpl):
+                # O backend Python reaproveita o código já compilado e só
+                # passa pelo front-end quando não há cache
+                frontend = partial(PROGRAMS.load, frontend=self.analyse)
+                runner.run_source(source, frontend, optimize)
+            else:
+                runner.run(PROGRAMS.load(source, optimize, self.analyse))
+
+        run_in_context(
+            BACKENDS[backend],
+            start,
+            output_buffer,
+            input_data,
+            fuel,
+            memory_limit,
+        )
+
+    def compile(
+        self, source: str, backend: str = 'tree', optimize: bool = True
+    ) -> 'CompiledProgram':
+        """
+        Analisa o programa uma vez para executá-lo várias vezes. Os erros
+        do front-end são levantados aqui, e não escritos na saída
+        """
+        if not source:
+            raise Exception('Não há código para executar.')
+        if backend not in BACKENDS:
+            raise Exception(f'Backend {backend} desconhecido.')
+        return CompiledProgram(
+            PROGRAMS.load(source, optimize, self.analyse), backend
+        )
+
+    @staticmethod
+    def analyse(
+        source: str, optimize: bool = True, *, stats: TextIO | None = None
+    ) -> ast.Program:
+        """
+        Front-end completo: análise léxica, sintática e semântica,
+        otimização e resolução. Com `stats`, escreve nele quantos nós o
+        otimizador pré-avaliou e dobrou
+        """
+        lexer = LexerImpl(source)
+
+        parser = ParserImpl(lexer)
+        program = parser.start()
+
+        semantic = SemanticImpl()
+        semantic.visit(program)
 
-        input_buffer = io.StringIO(input_data)
-        output_buffer = io.StringIO()
-        with (
-            redirect_stdout(output_buffer),
-            redirect_stderr(output_buffer),
-            redirect_stdin(input_buffer),
-        ):
-            try:
-                lexer = LexerImpl(source)
-
-                parser = ParserImpl(lexer)
-                ast = parser.start()
-
-                semantic = SemanticImpl()
-                semantic.visit(ast)
-
-                runner = RunnerImpl()
-                runner.run(ast)
-            except EOFError:
-                print('[erro] Fim da entrada alcançado.')
-            except Exception as e:
-                print(f'[erro] {e}')
+        if optimize:
+            optimizer = OptimizerImpl()
+            optimizer.visit(program)
+            if stats is not None:
+                stats.write(
+                    f'[otimizador] {optimizer.constants} constantes'
+                    f' pré-avaliadas, {optimizer.folded} nós dobrados\n'
+                )
 
+        resolver = ResolverImpl()
+        resolver.visit(program)
+        return program
+
+
+class CompiledProgram:
+    """
+    Programa já analisado, executado por run() quantas vezes for preciso.
+    Cada execução tem um contexto limpo: não enxerga as funções, as
+    conexões nem a saída das anteriores. A forma executável do backend
+    (a AST, o bytecode da VM ou o código Python) é gerada na primeira
+    execução e reaproveitada nas seguintes.
+    """
+
+    __slots__ = ('backend', 'compiled', 'program')
+
+    def __init__(self, program: ast.Program, backend: str = 'tree'):
+        self.program = program
+        self.backend = backend
+        # Forma executável sem e com contagem de passos
+        self.compiled: dict[bool, Any] = {}
+
+    def code(self, metered: bool) -> Any:
+        code = self.compiled.get(metered)
+        if code is None:
+            runner_class = BACKENDS[self.backend]
+            code = runner_class.compile_program(self.program, metered)
+            self.compiled[metered] = code
+        return code
+
+    def run(
+        self,
+        input_data: str = '',
+        *,
+        output_limit: int | None = None,
+        fuel: int | None = None,
+        memory_limit: int | None = None,
+    ) -> str:
+        """Executa o programa com `input_data` e devolve a saída"""
+        output_buffer = OutputBuffer(output_limit)
+        self.execute(
+            output_buffer, input_data, fuel=fuel, memory_limit=memory_limit
+        )
         return output_buffer.getvalue()
+
+    def execute(
+        self,
+        output_buffer: OutputBuffer,
+        input_data: str = '',
+        *,
+        fuel: int | None = None,
+        memory_limit: int | None = None,
+    ):
+        def start(runner: Runner):
+            runner.run_compiled(self.code(runner.fuel is not None))
+
+        run_in_context(
+            BACKENDS[self.backend],
+            start,
+            output_buffer,
+            input_data,
+            fuel,
+            memory_limit,
+        )
+
+
+def run_in_context(  # noqa: PLR0913, PLR0917
+    runner_class: type[Runner],
+    start: Callable[[Runner], None],
+    output_buffer: OutputBuffer,
+    input_data: str,
+    fuel: int | None,
+    memory_limit: int | None,
+):
+    """
+    Cria um executor num contexto do pool e chama `start` com ele. Os
+    erros da execução são escritos em `output_buffer`
+    """
+    budget = None
+    if fuel is not None or memory_limit is not None:
+        budget = Fuel(fuel, memory_limit)
+
+    # Os fluxos pertencem à execução: execuções em threads diferentes
+    # não disputam sys.stdout nem sys.stdin
+    input_buffer = io.StringIO(input_data)
+    with CONTEXTS.context(output_buffer, input_buffer, budget) as context:
+        try:
+            start(runner_class(context=context))
+        except EOFError:
+            output_buffer.note('[erro] Fim da entrada alcançado.\n')
+        except MemoryError:
+            output_buffer.note('[erro] Limite de memória excedido.\n')
+        except Exception as e:
+            output_buffer.note(f'[erro] {e}\n')
+        finally:
+            if budget is not None:
+                budget.close()
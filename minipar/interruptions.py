@@ -1,10 +1,28 @@
-class ReturnInterruption(Exception):
-    def __init__(self, objectValue=None, *args):
-        self.objectValue = objectValue
-        super().__init__(*args)
+"""
+Módulo dos Sinais de Interrupção
 
-class ContinueInterruption(Exception):
-    pass
+Os comandos return, break e continue não levantam exceções: cada um
+devolve um sinal de término (Completion) que o executor de blocos
+propaga pelos comandos compostos até o laço ou a chamada de função que
+o consome. O término normal de um comando é representado por None.
+"""
 
-class BreakInterruption(Exception):
-    pass
\ No newline at end of file
+from dataclasses import dataclass
+from enum import Enum, auto
+from typing import Any
+
+
+class Kind(Enum):
+    RETURN = auto()
+    BREAK = auto()
+    CONTINUE = auto()
+
+
+@dataclass(slots=True)
+class Completion:
+    kind: Kind
+    value: Any = None
+
+
+BREAK = Completion(Kind.BREAK)
+CONTINUE = Completion(Kind.CONTINUE)
@@ -0,0 +1,248 @@
+"""
+Módulo do Otimizador
+
+O otimizador roda entre a análise semântica e a execução. Ele
+converte cada constante em um valor Python uma única vez e dobra as
+subárvores de operadores cujos operandos são todos constantes,
+substituindo-as por nós Literal.
+
+Listas e dicionários formados só por constantes também viram Literal.
+Quando aparecem em uma posição em que nunca são alterados (iterável de
+um for, argumento de funções embutidas que só leem o valor) o mesmo
+objeto é compartilhado entre as execuções; nas demais posições o
+Literal é copiado a cada avaliação, já que o programa pode modificá-lo.
+"""
+
+import math
+from abc import ABC, abstractmethod
+
+from minipar import ast
+from minipar.closure import ARITHMETIC_OPERATORS, RELATIONAL_OPERATORS
+from minipar.runner import RunnerImpl
+
+# Funções embutidas que apenas leem seus argumentos
+READ_ONLY_FUNCTIONS = {
+    'print',
+    'debug',
+    'len',
+    'sum',
+    'contains',
+    'intersection',
+    'to_string',
+}
+
+SCALARS = (int, float, str, bool)
+
+
+class Optimizer(ABC):
+    @abstractmethod
+    def visit(self, node: ast.Node):
+        pass
+
+
+class OptimizerImpl(ast.Visitor, Optimizer):  # noqa: PLR0904
+    folded: int
+    constants: int
+
+    def __init__(self):
+        self.folded = 0
+        self.constants = 0
+
+    @staticmethod
+    def generic_visit(node: ast.Node | None):
+        # Nós sem otimização dedicada são mantidos como estão
+        return node
+
+    def visit_block(self, block: ast.Body | None):
+        for inst in block or []:
+            self.visit(inst)
+
+    def fold(self, node: ast.Expression, value) -> ast.Expression:
+        # Só valores escalares finitos viram literais; o resto fica
+        # para a execução, que reporta os erros normalmente
+        if not isinstance(value, SCALARS):
+            return node
+        if isinstance(value, float) and not math.isfinite(value):
+            return node
+        self.folded += 1
+        return ast.Literal(node.type, node.token, value)
+
+    @staticmethod
+    def scalar(node: ast.Expression) -> bool:
+        return isinstance(node, ast.Literal) and not node.copy
+
+    @staticmethod
+    def share(node: ast.Expression) -> ast.Expression:
+        if isinstance(node, ast.Literal):
+            node.copy = False
+        return node
+
+    def visit_Program(self, node: ast.Program):
+        self.visit_block(node.stmts)
+        return node
+
+    def visit_FuncDef(self, node: ast.FuncDef):
+        for name, (type_, default) in node.params.items():
+            node.params[name] = (type_, self.visit(default))
+        self.visit_block(node.body)
+        return node
+
+    def visit_Declaration(self, node: ast.Declaration):
+        node.right = self.visit(node.right)
+        return node
+
+    def visit_Assign(self, node: ast.Assign):
+        node.left = self.visit(node.left)
+        node.right = self.visit(node.right)
+        return node
+
+    def visit_Constant(self, node: ast.Constant):
+        self.constants += 1
+        return ast.Literal(
+            node.type, node.token, RunnerImpl.exec_Constant(node)
+        )
+
+    def visit_Access(self, node: ast.Access):
+        node.id = self.visit(node.id)
+        node.expr = self.visit(node.expr)
+        return node
+
+    def visit_Slice(self, node: ast.Slice):
+        node.initial = self.visit(node.initial)
+        node.final = self.visit(node.final)
+        return node
+
+    def visit_Logical(self, node: ast.Logical):
+        node.left = self.visit(node.left)
+        node.right = self.visit(node.right)
+
+        if not self.scalar(node.left):
+            return node
+
+        left = node.left.value
+        match node.token.value:
+            case '&&':
+                if self.scalar(node.right):
+                    return self.fold(node, node.right.value if left else left)
+                # `false && x` vale false e `true && x` vale o próprio x
+                self.folded += 1
+                return node.right if left else node.left
+            case '||':
+                # O operador `||` avalia os dois lados, então só é
+                # dobrado quando ambos são constantes
+                if self.scalar(node.right):
+                    return self.fold(node, left or node.right.value)
+        return node
+
+    def visit_Relational(self, node: ast.Relational):
+        return self.binary(node, RELATIONAL_OPERATORS)
+
+    def visit_Arithmetic(self, node: ast.Arithmetic):
+        return self.binary(node, ARITHMETIC_OPERATORS)
+
+    def binary(self, node: ast.Relational | ast.Arithmetic, operators):
+        node.left = self.share(self.visit(node.left))
+        node.right = self.share(self.visit(node.right))
+
+        oper = operators.get(node.token.value)
+        if oper is None or not (
+            self.scalar(node.left) and self.scalar(node.right)
+        ):
+            return node
+
+        try:
+            value = oper(node.left.value, node.right.value)
+        except (ArithmeticError, TypeError, ValueError):
+            return node
+        return self.fold(node, value)
+
+    def visit_Unary(self, node: ast.Unary):
+        node.expr = self.visit(node.expr)
+        if not self.scalar(node.expr) or node.expr.value is None:
+            return node
+
+        value = node.expr.value
+        match node.token.value:
+            case '!':
+                return self.fold(node, not value)
+            case '-':
+                try:
+                    return self.fold(node, value * (-1))
+                except TypeError:
+                    return node
+        return node
+
+    def visit_ArrayLiteral(self, node: ast.ArrayLiteral):
+        node.values = [self.visit(value) for value in node.values]
+        if not all(self.scalar(value) for value in node.values):
+            return node
+        self.folded += 1
+        return ast.Literal(
+            node.type,
+            node.token,
+            [value.value for value in node.values],
+            copy=True,
+        )
+
+    def visit_DictLiteral(self, node: ast.DictLiteral):
+        node.entries = {
+            key: self.visit(value) for key, value in node.entries.items()
+        }
+        if not all(self.scalar(value) for value in node.entries.values()):
+            return node
+        self.folded += 1
+        return ast.Literal(
+            node.type,
+            node.token,
+            {key: value.value for key, value in node.entries.items()},
+            copy=True,
+        )
+
+    def visit_Call(self, node: ast.Call):
+        name = node.oper if node.oper else node.token.value
+        node.args = [self.visit(arg) for arg in node.args]
+        if name in READ_ONLY_FUNCTIONS:
+            node.args = [self.share(arg) for arg in node.args]
+        return node
+
+    def visit_Return(self, node: ast.Return):
+        node.expr = self.visit(node.expr)
+        return node
+
+    def visit_If(self, node: ast.If):
+        node.condition = self.visit(node.condition)
+        self.visit_block(node.body)
+        self.visit_block(node.else_stmt)
+        return node
+
+    def visit_While(self, node: ast.While):
+        node.condition = self.visit(node.condition)
+        self.visit_block(node.body)
+        return node
+
+    def visit_For(self, node: ast.For):
+        node.iterable = self.share(self.visit(node.iterable))
+        self.visit_block(node.body)
+        return node
+
+    def visit_Comprehention(self, node: ast.Comprehention):
+        node.iterable = self.share(self.visit(node.iterable))
+        node.expr = self.visit(node.expr)
+        return node
+
+    def visit_Par(self, node: ast.Par):
+        self.visit_block(node.body)
+        return node
+
+    def visit_ParFor(self, node: ast.ParFor):
+        node.iterable = self.share(self.visit(node.iterable))
+        self.visit(node.body)
+        return node
+
+    def visit_Seq(self, node: ast.Seq):
+        self.visit_block(node.body)
+        return node
+
+    def visit_SChannel(self, node: ast.SChannel):
+        node.description = self.visit(node.description)
+        return node
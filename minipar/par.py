@@ -0,0 +1,337 @@
+"""
+Módulo do Escalonador do `par`
+
+As instruções de um bloco `par` são executadas por um pool de
+trabalhadores criado uma única vez por processo e reaproveitado pelos
+blocos seguintes, inclusive por um `par` dentro de um laço. O pool pode
+ser de processos ou de threads e seu tamanho é definido pela implantação,
+pelas variáveis MINIPAR_PAR_BACKEND e MINIPAR_PAR_WORKERS ou por
+configure().
+
+Cada tarefa leva apenas a função chamada, as funções que ela pode
+alcançar e os valores dos argumentos, já avaliados por quem executa o
+bloco. Em processos, a cadeia de frames externos segue como uma cópia
+com só as variáveis externas que essas funções usam, então valores que
+não podem ser serializados em outras variáveis não atrapalham o `par`. Os resultados voltam na ordem das
+instruções; o primeiro erro é relançado depois que todas as tarefas
+terminam, com os demais anexados como notas. Com orçamento de execução,
+as tarefas dividem os passos que restam e o que usam é descontado da
+execução ao fim do bloco.
+
+O `par for` divide o iterável em blocos contíguos, alguns por
+trabalhador para equilibrar a carga, e cada tarefa percorre um bloco.
+Em processos, o corpo, as funções e as variáveis externas que ele usa
+são serializados uma vez e o mesmo pacote segue com cada bloco.
+Os resultados são juntados na ordem do iterável ou combinados por uma
+redução: `sum` soma os valores, `append` concatena as listas e `merge`
+une os dicionários, com os valores posteriores prevalecendo.
+
+Em processos, alterações nas variáveis globais ficam no trabalhador.
+Quando a execução tem saída própria ou a saída do interpretador foi
+redirecionada, o que os processos imprimem é capturado e repassado a
+ela, tarefa por tarefa.
+"""
+
+import io
+import os
+import pickle
+import sys
+import threading
+from concurrent.futures import (
+    BrokenExecutor,
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from contextlib import redirect_stdout
+from multiprocessing import get_all_start_methods, get_context
+from typing import Any, Callable
+
+from minipar import ast
+from minipar.fuel import Budget, Fuel, task_fuel
+from minipar.streams import ExecutionIO
+from minipar.symbol import Frame
+
+type Task = tuple[Callable[..., Any], tuple]
+
+KINDS = ('process', 'thread')
+
+# Blocos do `par for` por trabalhador: blocos menores equilibram melhor
+# iterações de custo desigual, maiores enviam menos tarefas
+CHUNKS_PER_WORKER = 4
+
+# O forkserver não copia as threads de quem cria o pool (servidor do
+# editor, handlers dos canais); as tarefas só dependem do que é enviado
+START_METHOD = (
+    'forkserver' if 'forkserver' in get_all_start_methods() else 'spawn'
+)
+
+
+def run_task(
+    function: Callable[..., Any],
+    args: tuple,
+    capture: bool,
+    budget: Budget | None = None,
+):
+    """
+    Executa uma tarefa no trabalhador e devolve (valor, saída, erro,
+    passos). Com `budget`, a tarefa recebe o seu orçamento em `fuel`
+    """
+    output = io.StringIO()
+    try:
+        with task_fuel(budget) as fuel:
+            kwargs = {} if fuel is None else {'fuel': fuel}
+            if capture:
+                with redirect_stdout(output):
+                    value = function(*args, **kwargs)
+            else:
+                value = function(*args, **kwargs)
+            used = 0 if fuel is None else fuel.used()
+    except Exception as e:
+        return None, output.getvalue(), e, 0
+    finally:
+        sys.stdout.flush()
+    return value, output.getvalue(), None, used
+
+
+def run_chunk(
+    payload: bytes,
+    chunk: list,
+    reduction: str | None,
+    fuel: Fuel | None = None,
+):
+    """
+    Bloco do `par for` em um processo, com a tarefa e os argumentos
+    comuns serializados uma única vez para todos os blocos
+    """
+    task, args = pickle.loads(payload)
+    return task(*args, chunk, reduction, fuel=fuel)
+
+
+def chunks(values: list, workers: int) -> list[list]:
+    size = max(1, -(-len(values) // (workers * CHUNKS_PER_WORKER)))
+    return [values[i : i + size] for i in range(0, len(values), size)]
+
+
+def reduce(values: list, reduction: str | None) -> Any:
+    match reduction:
+        case 'sum':
+            return sum(values)
+        case 'append':
+            result = []
+            for value in values:
+                result.extend(value)
+            return result
+        case 'merge':
+            result = {}
+            for value in values:
+                result.update(value)
+            return result
+        case _:
+            return values
+
+
+def plan(
+    func: ast.FuncDef, func_table: dict[str, ast.FuncDef]
+) -> tuple[dict[str, ast.FuncDef], frozenset[tuple[int, int]]]:
+    """
+    Funções alcançáveis a partir de `func` e as variáveis externas que a
+    tarefa usa, como pares (nível, slot) dos frames de fora de `func`
+    """
+    needed = {func.name: func}
+    pending = [func]
+    while pending:
+        for name in pending.pop().calls:
+            callee = func_table.get(name)
+            if callee is not None and name not in needed:
+                needed[name] = callee
+                pending.append(callee)
+
+    # As funções aninhadas em `func` já contam nas variáveis dela, e as
+    # dos níveis de dentro de `func` são criadas pela própria tarefa
+    captured = frozenset(
+        (level, slot)
+        for callee in needed.values()
+        for level, slot in callee.outer
+        if level < func.level
+    )
+    return needed, captured
+
+
+def static_link(
+    frame: Frame, level: int, captured: frozenset[tuple[int, int]]
+) -> Frame | None:
+    """
+    Cópia da cadeia de definição de uma função de nível `level` chamada a
+    partir de `frame`, com frames novos que só têm os slots em
+    `captured`; os demais valores externos não são enviados
+    """
+    chain = []
+    source = frame.up(frame.level - level + 1)
+    while source is not None:
+        chain.append(source)
+        source = source.link
+
+    link = None
+    for source in reversed(chain):
+        slots = [slot for depth, slot in captured if depth == source.level]
+        values = [None] * (max(slots) + 1 if slots else 0)
+        for slot in slots:
+            values[slot] = source.slots[slot]
+        link = Frame(values, link, source.level)
+    return link
+
+
+class ParScheduler:
+    kind: str
+    workers: int
+
+    def __init__(self, kind: str = 'process', workers: int | None = None):
+        if kind not in KINDS:
+            raise Exception(f'Pool do par {kind} desconhecido.')
+        self.kind = kind
+        self.workers = workers or os.cpu_count() or 1
+        self._executor: Executor | None = None
+        self._lock = threading.Lock()
+
+    def link(
+        self, frame: Frame, level: int, captured: frozenset[tuple[int, int]]
+    ) -> Frame | None:
+        """
+        Frame de definição de uma tarefa de nível `level`: threads usam a
+        própria cadeia de `frame`, processos recebem só as variáveis
+        externas em `captured`
+        """
+        if self.kind == 'thread':
+            return frame.up(frame.level - level + 1)
+        return static_link(frame, level, captured)
+
+    @property
+    def executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                if self.kind == 'thread':
+                    self._executor = ThreadPoolExecutor(
+                        self.workers, thread_name_prefix='minipar-par'
+                    )
+                else:
+                    self._executor = ProcessPoolExecutor(
+                        self.workers, mp_context=get_context(START_METHOD)
+                    )
+            return self._executor
+
+    def run(
+        self,
+        tasks: list[Task],
+        streams: ExecutionIO | None = None,
+        fuel: Fuel | None = None,
+    ) -> list[Any]:
+        """
+        Executa as tarefas e devolve os resultados na ordem delas. Com
+        `fuel`, cada tarefa recebe uma parte igual dos passos que restam
+        e os passos usados são descontados de `fuel` no fim do bloco
+        """
+        # Threads escrevem direto nos fluxos da execução, que seguem nas
+        # tarefas; processos só precisam de captura quando a saída não é
+        # a saída real do interpretador
+        streams = streams or ExecutionIO()
+        capture = self.kind == 'process' and (
+            streams.stdout is not None or sys.stdout is not sys.__stdout__
+        )
+        budget = None if fuel is None else fuel.share(max(len(tasks), 1))
+        executor = self.executor
+        futures = [
+            executor.submit(run_task, function, args, capture, budget)
+            for function, args in tasks
+        ]
+
+        results = []
+        errors = []
+        steps = 0
+        for future in futures:
+            try:
+                value, output, error, used = future.result()
+            except BrokenExecutor as e:
+                # Um trabalhador morreu: o pool é recriado no próximo bloco
+                self.shutdown()
+                value, output, error, used = None, '', e, 0
+            except Exception as e:
+                value, output, error, used = None, '', e, 0
+
+            if output:
+                streams.write(output)
+            results.append(value)
+            steps += used
+            if error is not None:
+                errors.append(error)
+
+        if errors:
+            error, *others = errors
+            for other in others:
+                error.add_note(f'outra tarefa do par falhou: {other}')
+            raise error
+        if fuel is not None:
+            fuel.charge(steps)
+        return results
+
+    def map(
+        self,
+        task: Callable[..., Any],
+        args: tuple,
+        values: list,
+        reduction: str | None,
+        streams: ExecutionIO | None = None,
+        fuel: Fuel | None = None,
+    ) -> Any:
+        """
+        Executa o `par for`: cada tarefa recebe `args`, um bloco dos
+        valores e a redução, e devolve o resultado já reduzido do bloco
+        """
+        blocks = chunks(values, self.workers)
+        if self.kind == 'thread':
+            tasks = [(task, (*args, chunk, reduction)) for chunk in blocks]
+        else:
+            # Os argumentos comuns não são serializados de novo por bloco
+            payload = pickle.dumps((task, args))
+            tasks = [
+                (run_chunk, (payload, chunk, reduction)) for chunk in blocks
+            ]
+        partials = self.run(tasks, streams, fuel)
+        # Sem redução cada bloco devolve a lista dos seus resultados
+        return reduce(partials, reduction or 'append')
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+_scheduler: ParScheduler | None = None
+_scheduler_lock = threading.Lock()
+
+
+def scheduler() -> ParScheduler:
+    """Escalonador compartilhado, criado a partir do ambiente no 1º uso"""
+    global _scheduler  # noqa: PLW0603
+    with _scheduler_lock:
+        if _scheduler is None:
+            workers = os.environ.get('MINIPAR_PAR_WORKERS')
+            _scheduler = ParScheduler(
+                os.environ.get('MINIPAR_PAR_BACKEND', 'process'),
+                int(workers) if workers else None,
+            )
+        return _scheduler
+
+
+def configure(
+    kind: str = 'process', workers: int | None = None
+) -> ParScheduler:
+    """Substitui o escalonador compartilhado, encerrando o pool anterior"""
+    global _scheduler  # noqa: PLW0603
+    new = ParScheduler(kind, workers)
+    with _scheduler_lock:
+        old, _scheduler = _scheduler, new
+    if old is not None:
+        old.shutdown()
+    return new
@@ -13,7 +13,11 @@ DEFAULT_FUNCTION_NAMES = {
     'to_number': 'NUMBER',
     'to_string': 'STRING',
     'to_bool': 'BOOL',
-    'send': 'STRING',
+    # O valor recebido pelo canal só é conhecido na execução
+    'send': 'ANY',
+    'send_async': 'NUMBER',
+    'receive': 'ANY',
+    'send_many': 'LIST',
     'close': 'VOID',
     'len': 'NUMBER',
     'isalpha': 'BOOL',
@@ -35,6 +39,15 @@ DEFAULT_FUNCTION_NAMES = {
     'items': 'LIST',
     'keys': 'LIST',
     'split': 'LIST',
+    'shared': 'LIST',
+}
+
+# Reduções do `par for` e o tipo do resultado de cada uma
+PAR_REDUCTIONS = {
+    None: 'LIST',
+    'sum': 'NUMBER',
+    'append': 'LIST',
+    'merge': 'DICT',
 }
 
 STATEMENT_TOKENS = {
@@ -194,8 +207,7 @@ class ParserImpl(Parser):  # noqa: PLR0904
                 self.match('SEQ')
                 return ast.Seq(body=self.block())
             case 'PAR':
-                self.match('PAR')
-                return ast.Par(body=self.block())
+                return self.par()
             case 'C_CHANNEL':
                 return self.c_channel()
             case 'S_CHANNEL':
@@ -203,6 +215,13 @@ class ParserImpl(Parser):  # noqa: PLR0904
             case _:
                 return self.expression()
 
+    def par(self) -> ast.Par | ast.ParFor:
+        self.match('PAR')
+        # `par {` abre um bloco; os demais são um `par for`
+        if self.lookahead.label != 'LEFT_BRACE':
+            return self.par_for()
+        return ast.Par(body=self.block())
+
     def func_def(self) -> ast.FuncDef:
         self.match('FUNC')
         name = self.match_id('FUNC').value
@@ -283,6 +302,8 @@ class ParserImpl(Parser):  # noqa: PLR0904
                 f'esperando , no lugar de {self.lookahead.value}',
             )
         port = self.sum()
+        # Modo do servidor, opcional
+        mode = self.sum() if self.match('COMMA') else None
         if not self.match('RIGHT_BRACE'):
             raise Exception(
                 self.line,
@@ -294,6 +315,7 @@ class ParserImpl(Parser):  # noqa: PLR0904
             _port=port,
             func_name=func_id.name,
             description=description,
+            _mode=mode,
         )
 
     def params(self) -> ast.Parameters:
@@ -511,12 +533,9 @@ class ParserImpl(Parser):  # noqa: PLR0904
         match self.lookahead.label:
             case 'ID':
                 expr = self.call()
-            case 'FALSE':
-                expr = ast.Constant('BOOL', self.lookahead)
-                self.match('FALSE')
-            case 'TRUE':
+            case 'FALSE' | 'TRUE':
                 expr = ast.Constant('BOOL', self.lookahead)
-                self.match('TRUE')
+                self.match(self.lookahead.label)
             case 'STRING':
                 expr = ast.Constant('STRING', self.lookahead)
                 self.match('STRING')
@@ -539,6 +558,9 @@ class ParserImpl(Parser):  # noqa: PLR0904
                         self.line,
                         f'esperando ] no lugar de {self.lookahead.value}',
                     )
+            case 'PAR':
+                self.match('PAR')
+                expr = self.par_for()
             case 'LEFT_BRACE':
                 self.match('LEFT_BRACE')
                 expr = self.dict_literal()
@@ -698,6 +720,70 @@ class ParserImpl(Parser):  # noqa: PLR0904
             expr=expr,
         )
 
+    def par_for(self) -> ast.ParFor:
+        reduction = None
+        if self.lookahead.label == 'ID':
+            reduction = self.lookahead.value
+            if reduction not in PAR_REDUCTIONS:
+                raise Exception(
+                    self.line,
+                    f'redução {reduction} desconhecida no par for',
+                )
+            self.match('ID')
+
+        if not self.match('FOR'):
+            raise Exception(
+                self.line,
+                f'esperando for no lugar de {self.lookahead.value}',
+            )
+        if not self.match('LEFT_PARENTHESIS'):
+            raise Exception(
+                self.line,
+                f'esperando ( no lugar de {self.lookahead.value}',
+            )
+
+        iterator = self.declaration(to_table=False)
+
+        if not self.match('IN'):
+            raise Exception(
+                self.line,
+                f'esperando "in" no lugar de {self.lookahead.value}',
+            )
+
+        iterable = self.expression()
+
+        if not self.match('RIGHT_PARENTHESIS'):
+            raise Exception(
+                self.line,
+                f'esperando ) no lugar de {self.lookahead.value}',
+            )
+
+        # O tipo de cada resultado é opcional; sem ele o corpo não
+        # devolve valor
+        _type = 'VOID'
+        if self.match('RARROW'):
+            _type = self.lookahead.value
+            if not self.match('TYPE'):
+                raise Exception(
+                    self.line,
+                    f'esperando tipo no lugar de {self.lookahead.value}',
+                )
+
+        params: ast.Parameters = {
+            iterator.left.name: (iterator.left.type.upper(), None)
+        }
+        body = ast.FuncDef(
+            '<par for>', _type.upper(), params, self.block(params)
+        )
+        return ast.ParFor(
+            type=PAR_REDUCTIONS[reduction],
+            token=Token(label='PAR_FOR', value='par for'),
+            iterator=iterator,
+            iterable=iterable,
+            body=body,
+            reduction=reduction,
+        )
+
     def dict_literal(self) -> ast.DictLiteral:
         entries: ast.DictEntries = {}
 
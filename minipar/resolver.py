@@ -0,0 +1,155 @@
+"""
+Módulo do Resolvedor de Variáveis
+
+O resolvedor percorre a AST já validada pela análise semântica e
+anota cada identificador com seu endereço léxico (depth, slot): o
+número de frames de função a subir a partir do frame atual e a posição
+da variável nesse frame. As variáveis declaradas em blocos internos
+(if, while, for, compreensões) recebem slots no frame da função que os
+contém, então o acesso em tempo de execução não depende da quantidade
+de blocos aninhados.
+"""
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+
+from minipar import ast
+from minipar.constants import CHANNEL_METHODS
+
+
+@dataclass
+class FunctionScope:
+    level: int
+    blocks: list[dict[str, int]] = field(default_factory=lambda: [{}])
+    nlocals: int = 0
+    outer: set[tuple[int, int]] = field(default_factory=set)
+    calls: set[str] = field(default_factory=set)
+
+    def declare(self, name: str) -> int:
+        slot = self.nlocals
+        self.nlocals += 1
+        self.blocks[-1][name] = slot
+        return slot
+
+
+class Resolver(ABC):
+    @abstractmethod
+    def visit(self, node: ast.Node):
+        pass
+
+
+# Nós sem método próprio são percorridos por generic_visit, que apenas
+# visita os filhos em ordem
+class ResolverImpl(ast.Visitor, Resolver):
+    scopes: list[FunctionScope]
+
+    def __init__(self):
+        self.scopes = []
+
+    @property
+    def scope(self) -> FunctionScope:
+        return self.scopes[-1]
+
+    def visit_block(self, block: ast.Body | None):
+        self.scope.blocks.append({})
+        for inst in block or []:
+            self.visit(inst)
+        self.scope.blocks.pop()
+
+    def declare(self, node: ast.ID):
+        node.depth = 0
+        node.slot = self.scope.declare(node.name)
+
+    def visit_Program(self, node: ast.Program):
+        self.scopes.append(FunctionScope(level=0))
+        for inst in node.stmts or []:
+            self.visit(inst)
+        node.nlocals = self.scope.nlocals
+        self.scopes.pop()
+
+    def visit_FuncDef(self, node: ast.FuncDef):
+        self.scopes.append(FunctionScope(level=self.scope.level + 1))
+
+        # Os valores padrão são avaliados no frame da função, mas só
+        # enxergam os nomes externos a ela
+        for _, default in node.params.values():
+            self.visit(default)
+        for name in node.params:
+            self.scope.declare(name)
+        for inst in node.body:
+            self.visit(inst)
+
+        node.level = self.scope.level
+        node.nlocals = self.scope.nlocals
+        node.nparams = len(node.params)
+        node.defaults = tuple(default for _, default in node.params.values())
+        node.outer = frozenset(self.scope.outer)
+        node.calls = frozenset(self.scope.calls)
+        self.scopes.pop()
+
+    def visit_Declaration(self, node: ast.Declaration):
+        self.visit(node.right)
+        self.declare(node.left)
+
+    def visit_ID(self, node: ast.ID):
+        name = node.token.value
+        for scope in reversed(self.scopes):
+            for block in reversed(scope.blocks):
+                if name in block:
+                    node.depth = self.scope.level - scope.level
+                    node.slot = block[name]
+                    # As funções entre o uso e a definição usam uma
+                    # variável externa
+                    for inner in self.scopes[scope.level + 1 :]:
+                        inner.outer.add((scope.level, node.slot))
+                    return
+        raise Exception(f'variável {name} não definida')
+
+    def visit_Call(self, node: ast.Call):
+        for arg in node.args:
+            self.visit(arg)
+        # Em chamadas simples o ID é o nome da função e em send/close é
+        # o nome do canal; só nos demais métodos ele é uma variável
+        if node.oper and node.oper not in CHANNEL_METHODS:
+            self.visit(node.id)
+        if not node.oper:
+            for scope in self.scopes[1:]:
+                scope.calls.add(node.token.value)
+
+    def visit_If(self, node: ast.If):
+        self.visit(node.condition)
+        self.visit_block(node.body)
+        if node.else_stmt is not None:
+            self.visit_block(node.else_stmt)
+
+    def visit_While(self, node: ast.While):
+        # A condição é resolvida fora do corpo: uma declaração no corpo
+        # com o mesmo nome de uma variável da condição não a substitui
+        self.visit(node.condition)
+        self.visit_block(node.body)
+
+    def visit_For(self, node: ast.For):
+        self.visit(node.iterable)
+        self.scope.blocks.append({})
+        self.declare(node.iterator.left)
+        for inst in node.body:
+            self.visit(inst)
+        self.scope.blocks.pop()
+
+    def visit_Comprehention(self, node: ast.Comprehention):
+        self.visit(node.iterable)
+        self.scope.blocks.append({})
+        self.declare(node.iterator.left)
+        self.visit(node.expr)
+        self.scope.blocks.pop()
+
+    def visit_ParFor(self, node: ast.ParFor):
+        self.visit(node.iterable)
+        # O iterador é o parâmetro da função do corpo
+        self.visit(node.body)
+
+    def visit_Par(self, node: ast.Par):
+        self.visit_block(node.body)
+
+    def visit_Seq(self, node: ast.Seq):
+        self.visit_block(node.body)
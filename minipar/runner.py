@@ -1,18 +1,19 @@
 import random
 import socket
-import threading
 from abc import ABC, abstractmethod
-from copy import deepcopy
+from copy import copy, deepcopy
+from functools import partial
 from math import exp
-from multiprocessing import Pool
-
-from minipar import ast
-from minipar.interruptions import (
-    BreakInterruption,
-    ContinueInterruption,
-    ReturnInterruption,
-)
-from minipar.symbol import VarTable
+from typing import Any
+
+from minipar import ast, channel, par
+from minipar.constants import CHANNEL_METHODS
+from minipar.context import ExecutionContext
+from minipar.fuel import Fuel
+from minipar.interruptions import BREAK, CONTINUE, Completion, Kind
+from minipar.shared import SharedArray
+from minipar.streams import ExecutionIO
+from minipar.symbol import Frame, FramePool
 from minipar.utils import Utils
 
 
@@ -26,18 +27,24 @@ class Runner(ABC):
         pass
 
     @abstractmethod
-    def enter_scope(self):
+    def enter_scope(self, frame: Frame) -> Frame:
         pass
 
     @abstractmethod
-    def exit_scope(self):
+    def exit_scope(self, frame: Frame):
         pass
 
 
-class RunnerImpl(Runner):  # noqa: PLR0904
-    var_table: VarTable
+class RunnerImpl(ast.Visitor, Runner):  # noqa: PLR0904
+    prefix = 'exec_'
+    context: ExecutionContext
+    frame: Frame
+    frames: FramePool
+    fuel: Fuel | None
+    io: ExecutionIO
     func_table: dict[str, ast.FuncDef]
-    connection_table: dict[str, socket.socket]
+    connection_table: dict[str, channel.ClientConnection]
+    sites: dict[int, tuple]
     DEFAULT_FUNCTIONS = {
         'print': print,
         'input': input,
@@ -51,63 +58,101 @@ class RunnerImpl(Runner):  # noqa: PLR0904
         # 'close': self.close,
         'items': Utils.items,
         'sum': sum,
-        'pow': lambda a, b: a**b,
+        'pow': Utils.pow,
         'exp': exp,
         'range': range,
         'sqrt': Utils.sqrt,
-        'append': lambda a, b: a.append(b),
+        'append': Utils.append,
         'intersection': Utils.intersection,
         'random': random.random,
         'contains': Utils.contains,
         'lower': Utils.lower,
         'strip': Utils.strip,
-        'split': lambda a, b: a.split(b),
+        'split': Utils.split,
         'len': len,
         'isalpha': Utils.isalpha,
         'isnum': Utils.is_number,
-        'debug': lambda *x: print('\nDEBUG:', *x, end='\n\n'),
+        'debug': Utils.debug,
+        'shared': SharedArray.from_values,
     }
 
     def __init__(
         self,
-        var_table: VarTable = VarTable(),
-        func_table: dict[str, ast.FuncDef] = {},
-        connection_table: dict[str, socket.socket] = {},
+        func_table: dict[str, ast.FuncDef] | None = None,
+        connection_table: dict[str, channel.ClientConnection] | None = None,
+        context: ExecutionContext | None = None,
     ):
-        self.var_table = var_table
-        self.func_table = func_table
-        self.connection_table = connection_table
+        # Sem contexto explícito, cada executor tem o seu próprio
+        self.context = context or ExecutionContext(
+            func_table, connection_table
+        )
+        self.frame = Frame([])
+        self.io = self.context.io
+        # print, input e debug usam os fluxos do contexto
+        self.DEFAULT_FUNCTIONS = {
+            **type(self).DEFAULT_FUNCTIONS,
+            **self.io.functions(),
+        }
+        self.frames = self.context.frames
+        self.fuel = self.context.fuel
+        self.func_table = self.context.func_table
+        self.connection_table = self.context.connection_table
+        # Alvo de cada chamada já executada: (chamada, tipo, alvo). Fica
+        # no executor, e não na AST, que é compartilhada pelo cache
+        self.sites = {}
 
     def run(self, node: ast.Program):
+        self.frame = Frame([None] * node.nlocals)
         if node.stmts:
             for inst in node.stmts:
                 self.execute(inst)
 
-    def execute(self, node: ast.Node):
-        method_name = f'exec_{type(node).__name__}'
-        method = getattr(self, method_name, None)
-
-        if method:
-            return method(node)
-        else:
-            import pprint
-
-            pprint.pprint(node)
-            print(f'exec_{type(node).__name__}')
-            raise Exception(f'{type(node).__name__} not implemented.')
-
-    def enter_scope(self):
-        self.var_table = VarTable(prev=self.var_table)
-
-    def exit_scope(self):
-        if self.var_table.prev:
-            self.var_table = self.var_table.prev
+    @staticmethod
+    def compile_program(node: ast.Program, metered: bool = False) -> Any:
+        """
+        Forma executável do programa, que não depende do executor e pode
+        ser executada várias vezes com run_compiled(). Aqui é a própria
+        AST
+        """
+        return node
+
+    def run_compiled(self, code: Any):
+        self.run(code)
+
+    # Despacho pela tabela indexada pela classe do nó
+    execute = ast.Visitor.visit
+
+    @staticmethod
+    def generic_visit(node: ast.Node):
+        import pprint
+
+        pprint.pprint(node)
+        print(f'exec_{type(node).__name__}')
+        raise Exception(f'{type(node).__name__} not implemented.')
+
+    def spawn(self) -> 'RunnerImpl':
+        """
+        Executor para outra thread. Compartilha o estado do programa
+        (funções, conexões, variáveis globais) e tem o seu próprio
+        contexto de execução: frame atual e pool de frames.
+        """
+        runner = copy(self)
+        runner.frames = FramePool()
+        runner.sites = {}
+        return runner
+
+    def enter_scope(self, frame: Frame) -> Frame:
+        caller = self.frame
+        self.frame = frame
+        return caller
+
+    def exit_scope(self, frame: Frame):
+        self.frame = frame
 
     def exec_Declaration(self, node: ast.Declaration):
         rvalue = self.execute(node.right) if node.right else None
-        var_name = node.left.name
-        self.var_table.table[var_name] = rvalue
-        return var_name
+        self.frame.slots[node.left.slot] = rvalue
+        return node.left.name
 
     def exec_Assign(self, node: ast.Assign):
         rvalue = self.execute(node.right)
@@ -117,18 +162,14 @@ class RunnerImpl(Runner):  # noqa: PLR0904
             key = self.execute(node.left.expr)
             dict_obj[key] = rvalue
         else:
-            var_name = node.left.name
-            lvalue_table = self.var_table.find(var_name)
-            if lvalue_table:
-                lvalue_table.table[var_name] = rvalue
-            else:
-                self.var_table.table[var_name] = rvalue
+            self.frame.up(node.left.depth).slots[node.left.slot] = rvalue
 
     def exec_FuncDef(self, node: ast.FuncDef):
         if node.name not in self.func_table:
             self.func_table[node.name] = node
 
-    def exec_Constant(self, node: ast.Constant):
+    @staticmethod
+    def exec_Constant(node: ast.Constant):
         match node.type:
             case 'STRING':
                 return node.token.value
@@ -139,27 +180,17 @@ class RunnerImpl(Runner):  # noqa: PLR0904
             case _:
                 return node.token.value
 
+    def exec_Literal(self, node: ast.Literal):  # noqa: PLR6301
+        return node.value.copy() if node.copy else node.value
+
     def exec_ID(self, node: ast.ID):
-        var_name = node.token.value
-        lvalue_table = self.var_table.find(var_name)
-        if lvalue_table:
-            return lvalue_table.table[var_name]
-        else:
-            raise Exception(f'variável {var_name} não definida')
+        if node.depth == 0:
+            return self.frame.slots[node.slot]
+        return self.frame.up(node.depth).slots[node.slot]
 
     def exec_Access(self, node: ast.Access):
         index = self.execute(node.expr)
-
-        if isinstance(node.id, ast.Access):
-            result_inner = self.execute(node.id)
-            return result_inner[index]
-
-        var_name = node.id.token.value
-        lvalue_table = self.var_table.find(var_name)
-        if lvalue_table:
-            return lvalue_table.table[var_name][index]
-        else:
-            raise Exception(f'variável {var_name} não definida')
+        return self.execute(node.id)[index]
 
     def exec_Logical(self, node: ast.Logical):
         left = self.execute(node.left)
@@ -240,217 +271,334 @@ class RunnerImpl(Runner):  # noqa: PLR0904
         return computed_values
 
     def exec_Call(self, node: ast.Call):
-        name = node.oper if node.oper else node.token.value
+        # O alvo é resolvido uma vez por executor, já que as entradas da
+        # tabela de funções nunca são substituídas
+        site = self.sites.get(id(node))
+        if site is None or site[0] is not node:
+            site = self.sites[id(node)] = self.bind(node)
+        _, kind, target = site
+
+        if kind == 'function':
+            return self.call_function(node, target)
 
-        if name in ['send', 'close']:
+        if kind == 'channel':
             conn_name = node.token.value
-            if name == 'send':
-                args = [self.execute(arg) for arg in node.args]
-                return self.send(conn_name, *args)
-            elif name == 'close':
-                return self.close(conn_name)
+            args = [self.execute(arg) for arg in node.args]
+            return getattr(self, target)(conn_name, *args)
+
+        args = [self.execute(arg) for arg in node.args]
+        if kind == 'method':
+            return target(self.execute(node.id), *args)
+        return target(*args)
+
+    def bind(self, node: ast.Call) -> tuple:
+        name = node.oper if node.oper else node.token.value
+
+        if name in CHANNEL_METHODS:
+            return node, 'channel', name
 
         if name in self.DEFAULT_FUNCTIONS:
-            args = [self.execute(arg) for arg in node.args]
-            if node.oper:
-                args = [self.execute(node.id), *args]
-            return self.DEFAULT_FUNCTIONS[name](*args)
+            kind = 'method' if node.oper else 'builtin'
+            return node, kind, self.DEFAULT_FUNCTIONS[name]
 
         func = self.func_table.get(str(name))
 
         if not func:
-            print('DEBUG(not func):', name)
+            self.io.print('DEBUG(not func):', name)
             raise Exception(node)
 
-        self.enter_scope()
-        # Compute default values from function parameters
-        for param_name, (_, default) in func.params.items():
-            if default:
-                self.var_table.table[param_name] = self.execute(default)
+        return node, 'function', func
+
+    def call_function(self, node: ast.Call, func: ast.FuncDef):
+        # Os argumentos são avaliados no frame de quem chama
+        args = [self.execute(arg) for arg in node.args]
 
-        # Map args to parameters in function var_table
-        for (param_name, _), arg in zip(func.params.items(), node.args):
-            self.var_table.table[param_name] = self.execute(arg)
+        # Encadeamento estático: frame da função onde o chamado foi definido
+        return self.invoke(
+            func, args, self.frame.up(self.frame.level - func.level + 1)
+        )
+
+    def invoke(self, func: ast.FuncDef, args: list, link: Frame | None):
+        if self.fuel is not None:
+            self.fuel.consume()
+        frame = self.frames.acquire(func.nlocals, link, func.level)
+        caller = self.enter_scope(frame)
 
         try:
-            block_result = self.exec_block(func.body)
-        except ReturnInterruption as ret:
-            return ret.objectValue
+            # Os parâmetros ocupam os primeiros slots do frame
+            slots = frame.slots
+            argc = min(len(args), func.nparams)
+            slots[:argc] = args[:argc]
+
+            # Valores padrão só são avaliados para parâmetros sem argumento
+            for slot in range(argc, func.nparams):
+                default = func.defaults[slot]
+                if default is not None:
+                    slots[slot] = self.execute(default)
+
+            signal = self.exec_block(func.body)
         finally:
-            self.exit_scope()
-        return block_result
+            self.exit_scope(caller)
+            self.frames.release(frame)
+        return None if signal is None else signal.value
 
     def exec_Return(self, node: ast.Return):
-        raise ReturnInterruption(objectValue=self.execute(node.expr))
+        return Completion(Kind.RETURN, self.execute(node.expr))
 
-    def exec_Break(self, _: ast.Break):
-        raise BreakInterruption
+    @staticmethod
+    def exec_Break(_: ast.Break):
+        return BREAK
 
-    def exec_Continue(self, _: ast.Continue):
-        raise ContinueInterruption
+    @staticmethod
+    def exec_Continue(_: ast.Continue):
+        return CONTINUE
 
-    def exec_block(self, block: ast.Body):
-        ret = None
+    def exec_block(self, block: ast.Body) -> Completion | None:
         for inst in block:
-            self.execute(inst)
+            signal = self.execute(inst)
+            # Expressões usadas como comando devolvem valores comuns
+            if type(signal) is Completion:
+                return signal
         return None
 
     def exec_Comprehention(self, node: ast.Comprehention):
         result = []
         iterable = self.execute(node.iterable)
+        slots = self.frame.slots
+        slot = node.iterator.left.slot
+        fuel = self.fuel
         for value in iterable:
-            try:
-                self.enter_scope()
-                self.var_table.table[node.iterator.left.name] = value
-                result.append(self.execute(node.expr))
-            finally:
-                self.exit_scope()
+            if fuel is not None:
+                fuel.consume()
+            slots[slot] = value
+            result.append(self.execute(node.expr))
         return result
 
     def exec_For(self, node: ast.For):
         iterable = self.execute(node.iterable)
+        slots = self.frame.slots
+        slot = node.iterator.left.slot
+        fuel = self.fuel
         for value in iterable:
-            try:
-                self.enter_scope()
-                self.var_table.table[node.iterator.left.name] = value
-                self.exec_block(node.body)
-            except ContinueInterruption:
-                continue
-            except BreakInterruption:
-                break
-            finally:
-                self.exit_scope()
+            if fuel is not None:
+                fuel.consume()
+            slots[slot] = value
+            signal = self.exec_block(node.body)
+            if signal is not None:
+                if signal is BREAK:
+                    break
+                if signal is not CONTINUE:
+                    return signal
 
     def exec_While(self, node: ast.While):
         temp = self.execute(node.condition)
+        fuel = self.fuel
         while temp:
-            try:
-                self.enter_scope()
-                self.exec_block(node.body)
-                temp = self.execute(node.condition)
-            except ContinueInterruption:
-                continue
-            except BreakInterruption:
-                break
-            finally:
-                self.exit_scope()
+            if fuel is not None:
+                fuel.consume()
+            signal = self.exec_block(node.body)
+            if signal is not None:
+                if signal is CONTINUE:
+                    continue
+                if signal is BREAK:
+                    break
+                return signal
+            temp = self.execute(node.condition)
 
     def exec_If(self, node: ast.If):
         if self.execute(node.condition):
-            try:
-                self.enter_scope()
-                self.exec_block(node.body)
-            finally:
-                self.exit_scope()
+            return self.exec_block(node.body)
         elif node.else_stmt != None:
-            try:
-                self.enter_scope()
-                self.exec_block(node.else_stmt)
-            finally:
-                self.exit_scope()
+            return self.exec_block(node.else_stmt)
 
     def exec_Par(self, node: ast.Par):
-        with Pool() as pool:
-            pool.map(self.execute, node.body)
+        scheduler = par.scheduler()
+        tasks = [self.par_task(inst, scheduler) for inst in node.body]
+        scheduler.run(
+            [task for task in tasks if task is not None], self.io, self.fuel
+        )
+
+    def par_task(
+        self, node: ast.Call, scheduler: par.ParScheduler
+    ) -> par.Task | None:
+        site = self.sites.get(id(node))
+        if site is None or site[0] is not node:
+            site = self.sites[id(node)] = self.bind(node)
+        _, kind, target = site
+
+        if kind == 'channel':
+            # Conexões não podem ser enviadas aos trabalhadores, então
+            # send/close rodam aqui mesmo
+            self.exec_Call(node)
+            return None
+
+        args = [self.execute(arg) for arg in node.args]
+        if kind == 'function':
+            functions, captured = par.plan(target, self.func_table)
+            link = scheduler.link(self.frame, target.level, captured)
+            return type(self).run_function, (
+                functions,
+                target.name,
+                args,
+                link,
+                self.io,
+            )
+
+        if kind == 'method':
+            args.insert(0, self.execute(node.id))
+        name = node.oper if node.oper else node.token.value
+        return type(self).run_builtin, (name, args, self.io)
+
+    @classmethod
+    def run_function(  # noqa: PLR0913, PLR0917
+        cls,
+        functions: dict[str, Any],
+        name: str,
+        args: list,
+        link: Frame | None,
+        io: ExecutionIO,
+        fuel: Fuel | None = None,
+    ):
+        """Tarefa do `par`: chama uma função em um executor novo"""
+        context = ExecutionContext(dict(functions), io=io, fuel=fuel)
+        return cls(context=context).invoke(functions[name], args, link)
+
+    def exec_ParFor(self, node: ast.ParFor):
+        values = list(self.execute(node.iterable))
+        functions, captured = par.plan(node.body, self.func_table)
+        scheduler = par.scheduler()
+        link = scheduler.link(self.frame, node.body.level, captured)
+        return scheduler.map(
+            type(self).run_chunk,
+            (functions, node.body, link, self.io),
+            values,
+            node.reduction,
+            self.io,
+            self.fuel,
+        )
+
+    @classmethod
+    def run_chunk(  # noqa: PLR0913, PLR0917
+        cls,
+        functions: dict[str, Any],
+        func: ast.FuncDef,
+        link: Frame | None,
+        io: ExecutionIO,
+        chunk: list,
+        reduction: str | None,
+        fuel: Fuel | None = None,
+    ):
+        """Tarefa do `par for`: executa o corpo para um bloco de valores"""
+        context = ExecutionContext(dict(functions), io=io, fuel=fuel)
+        runner = cls(context=context)
+        results = [runner.invoke(func, [value], link) for value in chunk]
+        return par.reduce(results, reduction)
+
+    @classmethod
+    def run_builtin(
+        cls, name: str, args: list, io: ExecutionIO, fuel: Fuel | None = None
+    ):
+        """Tarefa do `par`: chama uma função padrão, que não gasta passos"""
+        function = io.functions().get(name) or cls.DEFAULT_FUNCTIONS[name]
+        return function(*args)
 
     def exec_Seq(self, node: ast.Seq):
-        for instruction in node.body:
-            self.execute(instruction)
+        return self.exec_block(node.body)
 
     def exec_Slice(self, node: ast.Slice):
-        var_name = node.id.token.value
         if not isinstance(node.id, ast.ID):
             return Exception(
-                f'{var_name} deve ser uma variável definida'
+                f'{node.id.token.value} deve ser uma variável definida'
             ).add_note
 
-        lvalue_table = self.var_table.find(var_name)
-        if not lvalue_table:
-            raise Exception(f'variável {var_name} não definida')
-
+        value = self.execute(node.id)
         if node.initial is None:
             end = self.execute(node.final)
-            return lvalue_table.table[var_name][:end]
+            return value[:end]
         elif node.final is None:
             start = self.execute(node.initial)
-            return lvalue_table.table[var_name][start:]
+            return value[start:]
         else:
             start = self.execute(node.initial)
             end = self.execute(node.final)
-            return lvalue_table.table[var_name][start:end]
+            return value[start:end]
 
     def exec_CChannel(self, node: ast.CChannel):
-        client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        client.connect((node.host, int(node.port)))
-        print(client.recv(2040).decode())
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.connect((node.host, int(node.port)))
+        client = channel.ClientConnection(sock)
         self.connection_table[node.name] = client
+        self.io.print(client.receive())
 
     def exec_SChannel(self, node: ast.SChannel):
-        def handle_client(conn, func):
-            try:
-                conn.send(self.execute(node.description).encode('utf-8'))
-                while True:
-                    data = conn.recv(2048).decode('utf-8')
-                    if not data:
-                        conn.close()
-                        break
-                    call = ast.Call(
-                        type=func.return_type,
-                        token=ast.Token('ID', func.name),
-                        args=[
-                            ast.Constant(
-                                type='STRING', token=ast.Token('STRING', data)
-                            )
-                        ],
-                        id=None,
-                        oper=None,
-                    )
-                    ret = self.execute(call)
-                    print(ret)
-                    conn.send(str(ret).encode())
-            except Exception as e:
-                print(f'Erro ao processar cliente: {e}')
-            finally:
-                print('Cliente desconectado.')
-                conn.close()
-
-        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        server.bind((node.host, int(node.port)))
-        server.listen(10)
+        self.serve(node, self.execute(node.description))
 
+    def serve(self, node: ast.SChannel, description: str):
         func: ast.FuncDef = self.func_table.get(node.func_name)
         if not func:
             raise Exception(
                 f'Função {node.func_name} não encontrada na tabela de funções.'
             )
-
-        print(f'Servidor iniciado em {node.host}:{node.port}')
-        try:
-            while True:
-                try:
-                    conn, _ = server.accept()
-                    print('Cliente conectado.')
-                    threading.Thread(
-                        target=handle_client, args=(conn, func)
-                    ).start()
-                except KeyboardInterrupt:
-                    print('Encerrando servidor...')
-                    break
-        finally:
-            server.close()
-
-    def send(self, conn_name: str, msg: str):
+        server = channel.SERVERS[node.mode](
+            node.host,
+            int(node.port),
+            description,
+            partial(self.handler, func),
+            self.io,
+        )
+        server.serve()
+
+    def handler(self, func: ast.FuncDef) -> channel.Reply:
+        """
+        Função que responde às mensagens de um canal com `func`. Cada
+        uma tem o seu executor, então pode rodar em uma thread própria
+        """
+        runner = self.spawn()
+        # O valor já decodificado entra na chamada como um literal. A
+        # chamada é montada uma vez e só o literal muda a cada mensagem
+        argument = ast.Literal(type=None, token=None)
+        call = ast.Call(
+            type=func.return_type,
+            token=ast.Token('ID', func.name),
+            args=[argument],
+            id=None,
+            oper=None,
+        )
+
+        def reply(value: Any) -> Any:
+            argument.value = value
+            return runner.execute(call)
+
+        return reply
+
+    def connection(self, conn_name: str) -> channel.ClientConnection:
         conn = self.connection_table.get(conn_name)
-        if conn:
-            conn.send(msg.encode())
-        else:
+        if conn is None:
             raise Exception(f'Conexão {conn_name} não encontrada')
-        return conn.recv(2048).decode('utf-8')
+        return conn
+
+    def send(self, conn_name: str, msg: Any):
+        return self.receive(conn_name, self.send_async(conn_name, msg))
+
+    def send_async(self, conn_name: str, msg: Any) -> int:
+        """Envia sem esperar a resposta, lida depois por receive()"""
+        return self.connection(conn_name).request(msg)
+
+    def receive(self, conn_name: str, handle: int):
+        reply = self.connection(conn_name).reply(handle)
+        if reply is channel.CLOSED:
+            raise Exception(f'Conexão {conn_name} encerrada pelo servidor')
+        return reply
+
+    def send_many(self, conn_name: str, messages: list) -> list:
+        """Envia todas as mensagens de uma vez e devolve as respostas"""
+        if isinstance(messages, SharedArray):
+            messages = messages.tolist()
+        elif not isinstance(messages, (list, range)):
+            raise Exception('send_many espera uma lista de mensagens')
+        handles = self.connection(conn_name).request_many(messages)
+        return [self.receive(conn_name, handle) for handle in handles]
 
     def close(self, conn_name: str):
-        conn = self.connection_table.get(conn_name)
-        if conn:
-            conn.close()
-            del self.connection_table[conn_name]
-        else:
-            raise Exception(f'Conexão {conn_name} não encontrada')
+        self.connection(conn_name).close()
+        del self.connection_table[conn_name]
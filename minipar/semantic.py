@@ -2,8 +2,12 @@ from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
 
 from minipar import ast
+from minipar.constants import SERVER_MODES
 from minipar.parser import DEFAULT_FUNCTION_NAMES
 
+# Tipos dos valores que podem ser enviados pelos canais
+CHANNEL_TYPES = {'NUMBER', 'BOOL', 'STRING', 'LIST', 'DICT'}
+
 
 class Semantic(ABC):
     @abstractmethod
@@ -16,29 +20,18 @@ class Semantic(ABC):
 
 
 @dataclass  # noqa: PLR0904
-class SemanticImpl(Semantic):
+class SemanticImpl(ast.Visitor, Semantic):
     context_stack: list[ast.Node] = field(default_factory=list)
     function_table: dict[str, ast.FuncDef] = field(default_factory=dict)
 
     def __post_init__(self):
         self.default_func_names = list(DEFAULT_FUNCTION_NAMES.keys())
 
-    def visit(self, node: ast.Node):
-        meth_name: str = f'visit_{type(node).__name__}'
-        visitor = getattr(self, meth_name, self.generic_visit)
-        return visitor(node)
-
     def generic_visit(self, node: ast.Node):
         self.context_stack.append(node)
 
-        for attr in dir(node):
-            value = getattr(node, attr)
-            if isinstance(value, list):
-                for item in value:
-                    if isinstance(item, ast.Node):
-                        self.visit(item)
-            elif isinstance(value, ast.Node):
-                self.visit(node)
+        for child in ast.iter_children(node):
+            self.visit(child)
 
         self.context_stack.pop()
 
@@ -56,6 +49,7 @@ class SemanticImpl(Semantic):
         if (
             isinstance(node.left, ast.Access)
             or left_type == 'LIST'
+            or right_type == 'ANY'
             or isinstance(node.right, ast.Arithmetic)
         ):
             return
@@ -76,11 +70,17 @@ class SemanticImpl(Semantic):
             right_type = self.visit(node.right)
 
             if (
-                isinstance(node.right, ast.Access)
+                isinstance(
+                    node.right,
+                    (
+                        ast.Access,
+                        ast.ArrayLiteral,
+                        ast.Comprehention,
+                        ast.Arithmetic,
+                    ),
+                )
                 or isinstance(node.left, ast.Access)
-                or isinstance(node.right, ast.ArrayLiteral)
-                or isinstance(node.right, ast.Comprehention)
-                or isinstance(node.right, ast.Arithmetic)
+                or right_type == 'ANY'
             ):
                 return
             elif left_type != right_type:
@@ -102,7 +102,7 @@ class SemanticImpl(Semantic):
             raise Exception('Erro: declaração de retorno fora de uma função.')
 
         expr_type = self.visit(node.expr)
-        if function.return_type != expr_type:
+        if expr_type not in {function.return_type, 'ANY'}:
             raise Exception(
                 f'Erro de Tipagem: tipo de retorno esperado {function.return_type}, mas obteve {expr_type}.'
             )
@@ -183,6 +183,21 @@ class SemanticImpl(Semantic):
                 'Erro: Apenas chamadas de função são permitidas dentro de execução paralela.'
             )
 
+    def visit_ParFor(self, node: ast.ParFor):
+        iterable_type = self.visit(node.iterable)
+
+        if iterable_type not in {'LIST', 'DICT'}:
+            raise Exception(
+                'Erro de Tipagem: O interável deve ser do tipo LIST ou DICT.'
+            )
+
+        # O corpo roda isolado em cada trabalhador, como uma função:
+        # laços externos não valem para break e continue
+        outer, self.context_stack = self.context_stack, [node.body]
+        self.visit_Block(node.body.body)
+        self.context_stack = outer
+        return node.type
+
     def visit_CChannel(self, node: ast.CChannel):
         host_type = self.visit(node._host)
         port_type = self.visit(node._port)
@@ -218,11 +233,24 @@ class SemanticImpl(Semantic):
                 'Erro de Tipagem: A descrição deve ser do tipo STRING'
             )
 
-        if function.return_type != 'STRING':
+        if function.return_type not in CHANNEL_TYPES:
             raise Exception(
-                'Erro de Tipagem: A função associada ao canal deve retornar um valor do tipo STRING.'
+                'Erro de Tipagem: A função associada ao canal deve retornar '
+                'um valor do tipo NUMBER, BOOL, STRING, LIST ou DICT.'
             )
 
+        if node._mode is not None:
+            if not isinstance(node._mode, ast.Constant) or (
+                self.visit(node._mode) != 'STRING'
+            ):
+                raise Exception(
+                    'Erro de Tipagem: O modo do servidor deve ser um texto.'
+                )
+            if node.mode not in SERVER_MODES:
+                raise Exception(
+                    f'Erro: modo de servidor {node.mode} desconhecido.'
+                )
+
     def visit_Slice(self, node: ast.Slice):
         inital_type = self.visit(node.initial)
         final_type = self.visit(node.final)
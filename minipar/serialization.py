@@ -0,0 +1,282 @@
+"""
+Módulo da Serialização dos Valores dos Canais
+
+Os canais transportam valores do Minipar, e não apenas texto: number,
+bool, string, list e dict são codificados em um formato binário
+compacto. Cada valor começa com um byte que indica o seu tipo:
+
+    N       void
+    T, F    true e false
+    i, q    inteiros de 32 e de 64 bits
+    I       inteiro maior: tamanho e bytes em complemento de dois
+    d       número de ponto flutuante
+    s       texto: tamanho e bytes em UTF-8
+    l       lista: quantidade e valores
+    D       dicionário: quantidade e pares de chave e valor
+    a       lista só de números de ponto flutuante
+    w, x    listas só de inteiros de 32 e de 64 bits
+
+Tamanhos e quantidades são inteiros de tamanho variável (LEB128) e os
+números são little-endian. As listas numéricas homogêneas, como os
+vetores das redes neurais, são copiadas de uma vez por um array, sem
+codificar elemento por elemento: cada número ocupa 8 bytes, ou 4 para
+inteiros pequenos, cerca de metade do texto equivalente.
+"""
+
+import struct
+import sys
+from array import array
+from collections.abc import Callable
+from typing import Any
+
+INT32 = struct.Struct('<i')
+INT64 = struct.Struct('<q')
+DOUBLE = struct.Struct('<d')
+
+INT32_MIN, INT32_MAX = -(2**31), 2**31 - 1
+INT64_MIN, INT64_MAX = -(2**63), 2**63 - 1
+
+# Bit dos tamanhos que indica que há mais um byte
+CONTINUATION = 0x80
+
+# O array usa a ordem de bytes da máquina
+SWAP = sys.byteorder == 'big'
+
+
+class SerializationError(Exception):
+    pass
+
+
+def encode(value: Any, out: bytearray | None = None) -> bytearray:
+    """Acrescenta a codificação de `value` a `out` e o devolve"""
+    if out is None:
+        out = bytearray()
+    write(out, value)
+    return out
+
+
+def decode(data: bytes | bytearray | memoryview) -> Any:
+    view = data if isinstance(data, memoryview) else memoryview(data)
+    try:
+        value, end = read(view, 0)
+    except (IndexError, TypeError, struct.error, UnicodeDecodeError) as e:
+        raise SerializationError(f'mensagem inválida: {e}') from None
+    if end != len(view):
+        raise SerializationError('mensagem inválida: bytes sobrando')
+    return value
+
+
+def write(out: bytearray, value: Any):
+    writer = WRITERS.get(type(value))
+    if writer is not None:
+        writer(out, value)
+        return
+    # Listas compartilhadas do `par` seguem como listas comuns
+    tolist = getattr(value, 'tolist', None)
+    if tolist is None:
+        raise SerializationError(
+            f'valores do tipo {type(value).__name__} não podem ser '
+            'enviados pelo canal'
+        )
+    write_list(out, tolist())
+
+
+def write_size(out: bytearray, size: int):
+    while size >= CONTINUATION:
+        out.append(size & 0x7F | CONTINUATION)
+        size >>= 7
+    out.append(size)
+
+
+def write_none(out: bytearray, _: None):
+    out += b'N'
+
+
+def write_bool(out: bytearray, value: bool):
+    out += b'T' if value else b'F'
+
+
+def write_int(out: bytearray, value: int):
+    if INT32_MIN <= value <= INT32_MAX:
+        out += b'i'
+        out += INT32.pack(value)
+    elif INT64_MIN <= value <= INT64_MAX:
+        out += b'q'
+        out += INT64.pack(value)
+    else:
+        data = value.to_bytes(
+            (value.bit_length() + 8) // 8, 'little', signed=True
+        )
+        out += b'I'
+        write_size(out, len(data))
+        out += data
+
+
+def write_float(out: bytearray, value: float):
+    out += b'd'
+    out += DOUBLE.pack(value)
+
+
+def write_str(out: bytearray, value: str):
+    data = value.encode('utf-8')
+    out += b's'
+    write_size(out, len(data))
+    out += data
+
+
+def write_list(out: bytearray, value: list | tuple | range):
+    numbers = numeric(value)
+    if numbers is not None:
+        out += numbers[0]
+        write_size(out, len(value))
+        out += numbers[1]
+        return
+    out += b'l'
+    write_size(out, len(value))
+    for item in value:
+        write(out, item)
+
+
+def numeric(value: list | tuple | range) -> tuple[bytes, bytes] | None:
+    """Tipo e bytes de uma lista só de floats ou só de inteiros"""
+    if not value:
+        return None
+    types = set(map(type, value))
+    if types == {float}:
+        numbers = array('d', value)
+        tag = b'a'
+    elif types == {int}:
+        low, high = min(value), max(value)
+        if INT32_MIN <= low and high <= INT32_MAX:
+            numbers = array('i', value)
+            tag = b'w'
+        elif INT64_MIN <= low and high <= INT64_MAX:
+            numbers = array('q', value)
+            tag = b'x'
+        else:
+            return None
+    else:
+        return None
+    if SWAP:
+        numbers.byteswap()
+    return tag, numbers.tobytes()
+
+
+def write_dict(out: bytearray, value: dict):
+    out += b'D'
+    write_size(out, len(value))
+    for key, item in value.items():
+        write(out, key)
+        write(out, item)
+
+
+WRITERS: dict[type, Callable[[bytearray, Any], None]] = {
+    type(None): write_none,
+    bool: write_bool,
+    int: write_int,
+    float: write_float,
+    str: write_str,
+    list: write_list,
+    tuple: write_list,
+    range: write_list,
+    dict: write_dict,
+}
+
+
+def read(view: memoryview, pos: int) -> tuple[Any, int]:
+    reader = READERS.get(view[pos])
+    if reader is None:
+        raise SerializationError(
+            f'mensagem inválida: tipo {chr(view[pos])!r} desconhecido'
+        )
+    return reader(view, pos + 1)
+
+
+def read_size(view: memoryview, pos: int) -> tuple[int, int]:
+    size = shift = 0
+    while True:
+        byte = view[pos]
+        pos += 1
+        size |= (byte & 0x7F) << shift
+        if byte < CONTINUATION:
+            return size, pos
+        shift += 7
+
+
+def read_int32(view: memoryview, pos: int) -> tuple[int, int]:
+    return INT32.unpack_from(view, pos)[0], pos + 4
+
+
+def read_int64(view: memoryview, pos: int) -> tuple[int, int]:
+    return INT64.unpack_from(view, pos)[0], pos + 8
+
+
+def read_bigint(view: memoryview, pos: int) -> tuple[int, int]:
+    size, pos = read_size(view, pos)
+    end = pos + size
+    if end > len(view):
+        raise IndexError('inteiro incompleto')
+    return int.from_bytes(view[pos:end], 'little', signed=True), end
+
+
+def read_float(view: memoryview, pos: int) -> tuple[float, int]:
+    return DOUBLE.unpack_from(view, pos)[0], pos + 8
+
+
+def read_str(view: memoryview, pos: int) -> tuple[str, int]:
+    size, pos = read_size(view, pos)
+    end = pos + size
+    if end > len(view):
+        raise IndexError('texto incompleto')
+    return str(view[pos:end], 'utf-8'), end
+
+
+def read_list(view: memoryview, pos: int) -> tuple[list, int]:
+    count, pos = read_size(view, pos)
+    values = []
+    append = values.append
+    for _ in range(count):
+        value, pos = read(view, pos)
+        append(value)
+    return values, pos
+
+
+def read_dict(view: memoryview, pos: int) -> tuple[dict, int]:
+    count, pos = read_size(view, pos)
+    values = {}
+    for _ in range(count):
+        key, pos = read(view, pos)
+        values[key], pos = read(view, pos)
+    return values, pos
+
+
+def array_reader(typecode: str) -> Callable[[memoryview, int], tuple]:
+    def read_array(view: memoryview, pos: int) -> tuple[list, int]:
+        count, pos = read_size(view, pos)
+        numbers = array(typecode)
+        end = pos + count * numbers.itemsize
+        if end > len(view):
+            raise IndexError('lista incompleta')
+        numbers.frombytes(view[pos:end])
+        if SWAP:
+            numbers.byteswap()
+        return numbers.tolist(), end
+
+    return read_array
+
+
+READERS: dict[int, Callable[[memoryview, int], tuple[Any, int]]] = {
+    ord('N'): lambda _, pos: (None, pos),
+    ord('T'): lambda _, pos: (True, pos),
+    ord('F'): lambda _, pos: (False, pos),
+    ord('i'): read_int32,
+    ord('q'): read_int64,
+    ord('I'): read_bigint,
+    ord('d'): read_float,
+    ord('s'): read_str,
+    ord('l'): read_list,
+    ord('D'): read_dict,
+    ord('a'): array_reader('d'),
+    ord('w'): array_reader('i'),
+    ord('x'): array_reader('q'),
+}
@@ -0,0 +1,185 @@
+"""
+Módulo das Listas Numéricas Compartilhadas
+
+A função padrão `shared` copia uma lista de números, ou uma matriz com
+linhas de mesmo tamanho, para um bloco de multiprocessing.shared_memory.
+A lista resultante se comporta como uma lista de tamanho fixo e, ao ser
+enviada aos trabalhadores do `par`, leva apenas o nome do bloco: os
+processos leem e escrevem os mesmos bytes, sem cópia. Tarefas que
+escrevem em fatias disjuntas não precisam de sincronização.
+
+Os valores são guardados como float64. O processo que cria a lista é o
+dono do bloco e o remove quando ela deixa de ser usada; os trabalhadores
+apenas se conectam a ele.
+"""
+
+import weakref
+from array import array as DoubleArray
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Iterable
+
+ITEM_SIZE = 8
+
+# Blocos abertos neste processo, para que as listas de uma mesma tarefa
+# compartilhem o mapeamento
+_blocks: weakref.WeakValueDictionary[str, 'SharedBlock'] = (
+    weakref.WeakValueDictionary()
+)
+
+
+def _release(view: memoryview, memory: SharedMemory, owner: bool):
+    view.release()
+    memory.close()
+    if owner:
+        memory.unlink()
+
+
+class SharedBlock:
+    __slots__ = ('__weakref__', 'memory', 'view')
+
+    def __init__(self, memory: SharedMemory, owner: bool):
+        self.memory = memory
+        self.view = memory.buf.cast('d')
+        weakref.finalize(self, _release, self.view, memory, owner)
+
+    @classmethod
+    def create(cls, size: int) -> 'SharedBlock':
+        memory = SharedMemory(create=True, size=max(1, size) * ITEM_SIZE)
+        block = _blocks[memory.name] = cls(memory, owner=True)
+        return block
+
+    @classmethod
+    def attach(cls, name: str) -> 'SharedBlock':
+        block = _blocks.get(name)
+        if block is None:
+            # Sem rastreamento: só o dono remove o bloco
+            memory = SharedMemory(name, track=False)
+            block = _blocks[name] = cls(memory, owner=False)
+        return block
+
+
+class SharedArray:
+    """
+    Lista de números em memória compartilhada. Com `width`, é uma matriz
+    e cada índice devolve a linha, uma SharedArray sobre o mesmo bloco.
+    """
+
+    __slots__ = ('block', 'length', 'offset', 'width')
+
+    def __init__(
+        self,
+        block: SharedBlock,
+        offset: int,
+        length: int,
+        width: int | None = None,
+    ):
+        self.block = block
+        self.offset = offset
+        self.length = length
+        self.width = width
+
+    @classmethod
+    def from_values(cls, values: Iterable) -> 'SharedArray':
+        values = list(values)
+        if values and all(isinstance(row, list) for row in values):
+            width = len(values[0])
+            if any(len(row) != width for row in values):
+                raise Exception(
+                    'as linhas de uma matriz compartilhada devem ter o '
+                    'mesmo tamanho'
+                )
+            flat = [value for row in values for value in row]
+            array = cls(SharedBlock.create(len(flat)), 0, len(values), width)
+        else:
+            flat = values
+            array = cls(SharedBlock.create(len(flat)), 0, len(flat))
+
+        try:
+            array.block.view[: len(flat)] = DoubleArray('d', flat)
+        except TypeError:
+            raise Exception(
+                'listas compartilhadas só podem conter números'
+            ) from None
+        return array
+
+    def __reduce__(self):
+        # Só o nome do bloco e a posição seguem para o trabalhador
+        return _attach, (
+            self.block.memory.name,
+            self.offset,
+            self.length,
+            self.width,
+        )
+
+    def __len__(self) -> int:
+        return self.length
+
+    def position(self, index: int) -> int:
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError('índice fora da lista compartilhada')
+        return index
+
+    def row(self, index: int) -> 'SharedArray':
+        start = self.offset + self.position(index) * self.width
+        return SharedArray(self.block, start, self.width)
+
+    def __getitem__(self, index: int | slice) -> Any:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.length))]
+        if self.width is not None:
+            return self.row(index)
+        return self.block.view[self.offset + self.position(index)]
+
+    def __setitem__(self, index: int | slice, value: Any):
+        if isinstance(index, slice):
+            positions = range(*index.indices(self.length))
+            values = list(value)
+            if len(values) != len(positions):
+                raise Exception('lista compartilhada tem tamanho fixo')
+            for i, item in zip(positions, values):
+                self[i] = item
+        elif self.width is not None:
+            self.row(index)[:] = value
+        else:
+            self.block.view[self.offset + self.position(index)] = value
+
+    def __iter__(self):
+        if self.width is not None:
+            return (self.row(i) for i in range(self.length))
+        start = self.offset
+        return iter(self.block.view[start : start + self.length].tolist())
+
+    def __eq__(self, other: object) -> bool:
+        return self.tolist() == other
+
+    # Mutável e comparada pelo conteúdo, como list
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return repr(self.tolist())
+
+    def tolist(self) -> list:
+        if self.width is not None:
+            return [row.tolist() for row in self]
+        return list(self)
+
+    def copy(self) -> list:
+        return self.tolist()
+
+    def count(self, value: Any) -> int:
+        return self.tolist().count(value)
+
+    def sort(self, reverse: bool = False):
+        self[:] = sorted(self, reverse=reverse)
+
+    @staticmethod
+    def append(_: Any):
+        raise Exception('lista compartilhada tem tamanho fixo')
+
+
+def _attach(
+    name: str, offset: int, length: int, width: int | None
+) -> SharedArray:
+    return SharedArray(SharedBlock.attach(name), offset, length, width)
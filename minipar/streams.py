@@ -0,0 +1,193 @@
+"""
+Módulo dos Fluxos de Entrada e Saída
+
+As funções padrão `print`, `input` e `debug` leem e escrevem nos fluxos
+do contexto de execução, e não em sys.stdout e sys.stdin. Assim várias
+execuções podem rodar ao mesmo tempo no mesmo processo, cada uma com a
+sua saída, sem trocar os fluxos globais do interpretador.
+
+Sem fluxos próprios, um ExecutionIO usa os fluxos do processo, o que
+mantém o comportamento da linha de comando e dos trabalhadores do `par`.
+A saída de uma execução é guardada por um OutputBuffer, que junta os
+trechos escritos só no final e interrompe o programa quando a saída
+passa do limite configurado. Um OutputStream entrega a saída em trechos
+enquanto o programa roda, para quem precisa mostrá-la aos poucos.
+"""
+
+import sys
+import threading
+from typing import Any, Callable, TextIO
+
+# Bytes acumulados pelo OutputStream antes de entregar um trecho
+CHUNK_SIZE = 4096
+
+
+class OutputLimitExceeded(Exception):
+    def __init__(self, limit: int, unit: str = 'caracteres'):
+        super().__init__(f'limite de saída de {limit} {unit} excedido')
+
+
+class OutputBuffer:
+    """
+    Saída bufferizada de uma execução. Com `limit`, a escrita que passa
+    do limite guarda só o que cabe e levanta OutputLimitExceeded.
+    """
+
+    __slots__ = ('chunks', 'limit', 'lock', 'size')
+
+    def __init__(self, limit: int | None = None):
+        self.chunks: list[str] = []
+        self.limit = limit
+        self.lock = threading.Lock()
+        self.size = 0
+
+    def write(self, text: str) -> int:
+        with self.lock:
+            if self.limit is not None and self.size + len(text) > self.limit:
+                text = text[: self.limit - self.size]
+                self.chunks.append(text)
+                self.size = self.limit
+                raise OutputLimitExceeded(self.limit)
+            self.chunks.append(text)
+            self.size += len(text)
+        return len(text)
+
+    def note(self, text: str):
+        """Escreve uma mensagem do interpretador, mesmo após o limite"""
+        with self.lock:
+            self.chunks.append(text)
+
+    def flush(self):
+        pass
+
+    def __enter__(self) -> 'OutputBuffer':
+        return self
+
+    def __exit__(self, *_):
+        pass
+
+    def getvalue(self) -> str:
+        with self.lock:
+            value = ''.join(self.chunks)
+            # Mantém um único trecho para as próximas leituras
+            self.chunks[:] = [value]
+        return value
+
+
+class OutputStream(OutputBuffer):
+    """
+    Saída entregue a `sink` em trechos enquanto o programa roda. O texto
+    é acumulado até CHUNK_SIZE bytes ou até o próximo ciclo de
+    `interval` segundos. Se `sink` bloqueia porque o leitor está
+    atrasado, as escritas seguintes esperam e o programa também. Aqui o
+    limite conta bytes em UTF-8.
+    """
+
+    __slots__ = ('closed', 'flusher', 'interval', 'pending', 'sink')
+
+    def __init__(
+        self,
+        sink: Callable[[str], Any],
+        limit: int | None = None,
+        interval: float = 0.05,
+    ):
+        super().__init__(limit)
+        self.sink = sink
+        self.interval = interval
+        self.pending = 0
+        self.closed = threading.Event()
+        self.flusher = threading.Thread(target=self.run_flusher, daemon=True)
+
+    def __enter__(self) -> 'OutputStream':
+        self.flusher.start()
+        return self
+
+    def __exit__(self, *_):
+        self.closed.set()
+        self.flusher.join()
+        self.flush()
+
+    def run_flusher(self):
+        # Entrega o que um programa lento escreveu sem esperar o trecho
+        # encher
+        while not self.closed.wait(self.interval):
+            try:
+                self.flush()
+            except OSError:
+                return
+
+    def write(self, text: str) -> int:
+        data = text.encode()
+        with self.lock:
+            if self.limit is not None and self.size + len(data) > self.limit:
+                data = data[: self.limit - self.size]
+                self.chunks.append(data.decode(errors='ignore'))
+                self.size = self.limit
+                self.send()
+                raise OutputLimitExceeded(self.limit, 'bytes')
+            self.chunks.append(text)
+            self.size += len(data)
+            self.pending += len(data)
+            if self.pending >= CHUNK_SIZE:
+                self.send()
+        return len(text)
+
+    def flush(self):
+        with self.lock:
+            self.send()
+
+    def send(self):
+        # Chamado com a trava: escritas concorrentes esperam a entrega
+        if self.chunks:
+            text = ''.join(self.chunks)
+            self.chunks.clear()
+            self.pending = 0
+            self.sink(text)
+
+
+class ExecutionIO:
+    """
+    Fluxos de uma execução. Os campos podem ser trocados a cada
+    execução: as funções padrão já ligadas a este objeto passam a usar
+    os novos fluxos.
+    """
+
+    __slots__ = ('stdin', 'stdout')
+
+    def __init__(
+        self, stdout: TextIO | None = None, stdin: TextIO | None = None
+    ):
+        self.stdout = stdout
+        self.stdin = stdin
+
+    def __reduce__(self):
+        # Os fluxos ficam no processo dono; no trabalhador do `par` a
+        # saída vai para sys.stdout, que é capturado e devolvido
+        return ExecutionIO, ()
+
+    def attach(self, stdout: TextIO | None, stdin: TextIO | None):
+        self.stdout = stdout
+        self.stdin = stdin
+
+    def write(self, text: str):
+        (self.stdout or sys.stdout).write(text)
+
+    def print(self, *values: Any, sep: str = ' ', end: str = '\n'):
+        self.write(sep.join(map(str, values)) + end)
+
+    def input(self, prompt: str = '') -> str:
+        if prompt:
+            stdout = self.stdout or sys.stdout
+            stdout.write(str(prompt))
+            stdout.flush()
+        line = (self.stdin or sys.stdin).readline()
+        if not line:
+            raise EOFError
+        return line.removesuffix('\n')
+
+    def debug(self, *values: Any):
+        self.print('\nDEBUG:', *values, end='\n\n')
+
+    def functions(self) -> dict[str, Any]:
+        """Funções padrão que dependem dos fluxos"""
+        return {'print': self.print, 'input': self.input, 'debug': self.debug}
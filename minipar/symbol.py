@@ -7,7 +7,7 @@ sintática e no módulo de execução
 """
 
 from dataclasses import dataclass, field
-from typing import Any, Optional, Union
+from typing import Any, Optional
 
 
 @dataclass
@@ -37,14 +37,54 @@ class SymTable:
             return value
 
 
-@dataclass
-class VarTable:
-    table: dict[str, Any] = field(default_factory=dict)
-    prev: Optional['VarTable'] = None
+@dataclass(slots=True)
+class Frame:
+    slots: list[Any]
+    link: Optional['Frame'] = None
+    level: int = 0
 
-    def find(self, string: str) -> Union['VarTable', None]:
-        st = self
-        while st:
-            if string in st.table:
-                return st
-            st = st.prev
+    def up(self, depth: int) -> 'Frame':
+        frame = self
+        for _ in range(depth):
+            frame = frame.link
+        return frame
+
+
+class FramePool:
+    """
+    Free-list de frames agrupados pelo número de slots. Um frame
+    devolvido tem os slots limpos e é reaproveitado pela próxima chamada
+    de mesmo tamanho, evitando alocar uma lista nova a cada chamada.
+    Com `limit=0` nenhum frame é guardado.
+    """
+
+    __slots__ = ('allocated', 'blank', 'free', 'limit')
+
+    def __init__(self, limit: int = 32):
+        self.free: dict[int, list[Frame]] = {}
+        self.blank: dict[int, tuple[None, ...]] = {}
+        self.limit = limit
+        self.allocated = 0
+
+    def acquire(self, size: int, link: Frame | None, level: int) -> Frame:
+        try:
+            # `pop` é atômico, então handlers em threads podem disputar
+            # a mesma lista sem trava
+            frame = self.free[size].pop()
+        except (KeyError, IndexError):
+            self.allocated += 1
+            return Frame([None] * size, link, level)
+        frame.link = link
+        frame.level = level
+        return frame
+
+    def release(self, frame: Frame):
+        size = len(frame.slots)
+        free = self.free.get(size)
+        if free is None:
+            free = self.free[size] = []
+            self.blank[size] = (None,) * size
+        if len(free) < self.limit:
+            frame.slots[:] = self.blank[size]
+            frame.link = None
+            free.append(frame)
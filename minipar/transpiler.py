@@ -0,0 +1,736 @@
+"""
+Módulo do Transpilador para Python
+
+O transpilador converte um programa já verificado pela análise
+semântica em código-fonte Python equivalente: funções viram `def`,
+laços viram laços nativos e as funções padrão, os canais e o `par`
+são delegados a um objeto de runtime. O código gerado é compilado
+com `compile()` e o code object resultante é guardado pelo CodeCache,
+indexado pelo hash do código-fonte Minipar.
+
+As tarefas do `par` vão para o escalonador compartilhado, como nos
+outros executores. Em um pool de processos, cada função do programa
+segue descrita por export(): o code object, as funções e as variáveis
+globais que ela alcança são recriados no trabalhador por restore().
+"""
+
+import hashlib
+import marshal
+import os
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from types import CellType, CodeType, FunctionType
+from typing import Any, Callable
+
+from minipar import ast, par
+from minipar.cache import FRONTEND_MODULES, fingerprint
+from minipar.constants import CHANNEL_METHODS
+from minipar.context import ExecutionContext
+from minipar.fuel import Fuel
+from minipar.runner import RunnerImpl
+
+
+class Unset:
+    """
+    Valor padrão dos parâmetros com default. Cada processo tem o seu,
+    e o pickle leva a referência ao do módulo, não uma cópia
+    """
+
+    __slots__ = ()
+
+    def __reduce__(self):
+        return '_UNSET'
+
+
+_UNSET = Unset()
+
+PYTHON_OPERATORS = {'+', '-', '*', '/', '%', '==', '!=', '>', '<', '>=', '<='}
+
+# Nomes globais do código gerado que pertencem ao programa: variáveis,
+# funções e corpos de `par for`. Os demais são montados pelo runtime
+PROGRAM_PREFIXES = ('v_', 'f_', '_par_for_')
+
+
+def _run_chunk(function: Callable, chunk: list, reduction: str | None):
+    return par.reduce([function(value) for value in chunk], reduction)
+
+
+def _or(left, right):
+    # O operador `||` avalia os dois lados antes de decidir
+    return left or right
+
+
+# Função exportada: (índice da função, funções, variáveis globais)
+type Exported = tuple[int, list[tuple], dict[str, Any]]
+
+
+@dataclass(slots=True, frozen=True)
+class FunctionRef:
+    """Referência, dentro de uma função exportada, a outra função"""
+
+    index: int
+
+
+def global_names(code: CodeType) -> Iterator[str]:
+    yield from code.co_names
+    for const in code.co_consts:
+        if isinstance(const, CodeType):
+            yield from global_names(const)
+
+
+def export(function: FunctionType) -> Exported:
+    """
+    Descreve uma função do código gerado, com as funções e variáveis
+    do programa que ela alcança, como (índice, funções, globais)
+    """
+    specs: list[tuple | None] = []
+    positions: dict[int, int] = {}
+    values: dict[str, Any] = {}
+
+    def portable(value: Any) -> Any:
+        if isinstance(value, FunctionType):
+            return FunctionRef(visit(value))
+        return value
+
+    def visit(function: FunctionType) -> int:
+        position = positions.get(id(function))
+        if position is not None:
+            return position
+        position = positions[id(function)] = len(specs)
+        specs.append(None)
+
+        namespace = function.__globals__
+        for name in global_names(function.__code__):
+            if (
+                name.startswith(PROGRAM_PREFIXES)
+                and name in namespace
+                and name not in values
+            ):
+                values[name] = portable(namespace[name])
+
+        cells = []
+        for cell in function.__closure__ or ():
+            try:
+                cells.append((portable(cell.cell_contents),))
+            except ValueError:
+                cells.append(())
+        specs[position] = (
+            marshal.dumps(function.__code__),
+            function.__name__,
+            function.__defaults__,
+            tuple(cells),
+        )
+        return position
+
+    return visit(function), specs, values
+
+
+def restore(
+    position: int,
+    specs: list[tuple],
+    values: dict[str, Any],
+    fuel: Fuel | None = None,
+):
+    """Recria no processo atual uma função descrita por export()"""
+    context = ExecutionContext(fuel=fuel)
+    namespace = PythonRunnerImpl(context=context).namespace()
+    closures = [tuple(CellType() for _ in spec[3]) for spec in specs]
+    functions = [
+        FunctionType(marshal.loads(code), namespace, name, defaults, closure)
+        for (code, name, defaults, _), closure in zip(specs, closures)
+    ]
+
+    def resolve(value: Any) -> Any:
+        if isinstance(value, FunctionRef):
+            return functions[value.index]
+        return value
+
+    for (*_, cells), closure in zip(specs, closures):
+        for cell, contents in zip(closure, cells):
+            if contents:
+                cell.cell_contents = resolve(contents[0])
+    namespace.update((name, resolve(value)) for name, value in values.items())
+    return functions[position]
+
+
+class Transpiler(ABC):
+    @abstractmethod
+    def transpile(self, node: ast.Program) -> str:
+        pass
+
+
+class TranspilerImpl(Transpiler):  # noqa: PLR0904
+    lines: list[str]
+    indent: int
+    scopes: list[dict[str, tuple[int, str]]]
+    functions: list[dict]
+    counters: dict[str, int]
+    metered: bool
+
+    def __init__(self, metered: bool = False):
+        # Com orçamento de execução, laços e funções chamam _tick() e as
+        # compreensões percorrem o iterável por _rt.meter()
+        self.metered = metered
+        self.lines = []
+        self.indent = 0
+        self.scopes = []
+        self.functions = []
+        self.counters = {}
+
+    def transpile(self, node: ast.Program) -> str:
+        self.scopes.append({})
+        self.functions.append({'level': 0, 'outer': set()})
+        self.emit_block(node.stmts or [], new_scope=False)
+        body = self.lines
+
+        header = ['# Código gerado pelo transpilador Minipar']
+        return '\n'.join(header + body) + '\n'
+
+    # Emissão
+
+    def line(self, text: str):
+        self.lines.append('    ' * self.indent + text)
+
+    def declare(self, name: str) -> str:
+        # Cada declaração recebe um nome Python único no programa, o que
+        # resolve o sombreamento entre blocos sem escopos extras. O
+        # contador vem antes do nome: identificadores do Minipar não
+        # começam com dígito, então v_1_a nunca coincide com v_{nome}
+        count = self.counters.get(name, 0)
+        self.counters[name] = count + 1
+        py_name = f'v_{name}' if count == 0 else f'v_{count}_{name}'
+        self.scopes[-1][name] = (self.functions[-1]['level'], py_name)
+        return py_name
+
+    def resolve(self, name: str, store: bool = False) -> str:
+        for scope in reversed(self.scopes):
+            if name in scope:
+                level, py_name = scope[name]
+                function = self.functions[-1]
+                if store and level != function['level']:
+                    keyword = 'global' if level == 0 else 'nonlocal'
+                    function['outer'].add((keyword, py_name))
+                return py_name
+        raise Exception(f'variável {name} não definida')
+
+    def visit(self, node: ast.Node) -> str | None:
+        method_name = f'emit_{type(node).__name__}'
+        method = getattr(self, method_name, None)
+
+        if method is None:
+            raise Exception(f'{type(node).__name__} not implemented.')
+        return method(node)
+
+    def emit_block(self, block: ast.Body, new_scope: bool = True):
+        if new_scope:
+            self.scopes.append({})
+        start = len(self.lines)
+        for inst in block:
+            result = self.visit(inst)
+            if isinstance(inst, ast.Expression):
+                self.line(result)
+        if len(self.lines) == start:
+            self.line('pass')
+        if new_scope:
+            self.scopes.pop()
+
+    def emit_indented(self, block: ast.Body):
+        self.indent += 1
+        self.emit_block(block)
+        self.indent -= 1
+
+    # Instruções
+
+    def emit_Declaration(self, node: ast.Declaration):
+        value = self.visit(node.right) if node.right else 'None'
+        self.line(f'{self.declare(node.left.name)} = {value}')
+
+    def emit_Assign(self, node: ast.Assign):
+        value = self.visit(node.right)
+
+        if isinstance(node.left, ast.Access):
+            container = self.visit(node.left.id)
+            key = self.visit(node.left.expr)
+            self.line(f'{container}[{key}] = {value}')
+        else:
+            self.line(f'{self.resolve(node.left.name, store=True)} = {value}')
+
+    def emit_FuncDef(self, node: ast.FuncDef):
+        func_name = f'f_{node.name}'
+        self.emit_function(node, func_name)
+        self.line(
+            f'_rt.define({node.name!r}, {func_name}, {node.return_type!r})'
+        )
+
+    def emit_function(self, node: ast.FuncDef, func_name: str):
+        function = {'level': self.functions[-1]['level'] + 1, 'outer': set()}
+        self.functions.append(function)
+        self.scopes.append({})
+
+        params = []
+        prologue = []
+        for name, (_, default) in node.params.items():
+            py_name = self.declare(name)
+            if default is None:
+                params.append(f'{py_name}=None')
+                continue
+            params.append(f'{py_name}=_UNSET')
+            prologue.append((py_name, default))
+        params.append('*_')
+
+        outer_lines, self.lines = self.lines, []
+        self.indent += 1
+        # Valores padrão só são avaliados para argumentos ausentes
+        for py_name, default in prologue:
+            self.line(f'if {py_name} is _UNSET:')
+            self.indent += 1
+            self.line(f'{py_name} = {self.visit(default)}')
+            self.indent -= 1
+        if self.metered:
+            self.line('_tick()')
+        self.emit_block(node.body, new_scope=False)
+        # Atribuições a variáveis externas precisam ser declaradas antes
+        # do corpo da função
+        body, self.lines = self.lines, []
+        for keyword, py_name in sorted(function['outer']):
+            self.line(f'{keyword} {py_name}')
+        body = self.lines + body
+        self.lines = outer_lines
+        self.indent -= 1
+
+        self.scopes.pop()
+        self.functions.pop()
+
+        self.line(f'def {func_name}({", ".join(params)}):')
+        self.lines.extend(body)
+
+    def emit_Return(self, node: ast.Return):
+        self.line(f'return {self.visit(node.expr)}')
+
+    def emit_Break(self, _: ast.Break):
+        self.line('break')
+
+    def emit_Continue(self, _: ast.Continue):
+        self.line('continue')
+
+    def emit_If(self, node: ast.If):
+        self.line(f'if {self.visit(node.condition)}:')
+        self.emit_indented(node.body)
+        if node.else_stmt is not None:
+            self.line('else:')
+            self.emit_indented(node.else_stmt)
+
+    def emit_While(self, node: ast.While):
+        # Assim como no interpretador, o continue volta para o corpo sem
+        # reavaliar a condição
+        self.line(f'if {self.visit(node.condition)}:')
+        self.indent += 1
+        self.line('while True:')
+        self.indent += 1
+        if self.metered:
+            self.line('_tick()')
+        self.emit_block(node.body)
+        self.line(f'if not {self.visit(node.condition)}:')
+        self.indent += 1
+        self.line('break')
+        self.indent -= 3
+
+    def emit_For(self, node: ast.For):
+        iterable = self.visit(node.iterable)
+        self.scopes.append({})
+        target = self.declare(node.iterator.left.name)
+        self.line(f'for {target} in {iterable}:')
+        self.indent += 1
+        if self.metered:
+            self.line('_tick()')
+        self.emit_block(node.body)
+        self.indent -= 1
+        self.scopes.pop()
+
+    def emit_Seq(self, node: ast.Seq):
+        for inst in node.body:
+            result = self.visit(inst)
+            if isinstance(inst, ast.Expression):
+                self.line(result)
+
+    def emit_Par(self, node: ast.Par):
+        # Cada chamada vira (função, argumentos), avaliados aqui na ordem
+        # do bloco. Canais rodam aqui mesmo e ficam com função None
+        tasks = ', '.join(self.emit_task(inst) for inst in node.body)
+        self.line(f'_rt.par({tasks})')
+
+    def emit_task(self, node: ast.Call) -> str:
+        name = node.oper if node.oper else node.token.value
+        if name in CHANNEL_METHODS:
+            return f'(None, {self.visit(node)})'
+
+        args = [self.visit(arg) for arg in node.args]
+        if name in RunnerImpl.DEFAULT_FUNCTIONS:
+            if node.oper:
+                args.insert(0, self.visit(node.id))
+            return f'({name!r}, [{", ".join(args)}])'
+        return f'(f_{name}, [{", ".join(args)}])'
+
+    def emit_CChannel(self, node: ast.CChannel):
+        self.line(f'_rt.cchannel({node.name!r}, {node.host!r}, {node.port!r})')
+
+    def emit_SChannel(self, node: ast.SChannel):
+        description = self.visit(node.description)
+        self.line(
+            f'_rt.schannel({node.name!r}, {node.func_name!r}, '
+            f'{description}, {node.host!r}, {node.port!r}, {node.mode!r})'
+        )
+
+    # Expressões
+
+    @staticmethod
+    def emit_Constant(node: ast.Constant) -> str:
+        return repr(RunnerImpl.exec_Constant(node))
+
+    @staticmethod
+    def emit_Literal(node: ast.Literal) -> str:
+        # O literal Python já cria um objeto novo a cada avaliação
+        return repr(node.value)
+
+    def emit_ID(self, node: ast.ID) -> str:
+        return self.resolve(node.token.value)
+
+    def emit_Access(self, node: ast.Access) -> str:
+        return f'{self.visit(node.id)}[{self.visit(node.expr)}]'
+
+    def emit_Slice(self, node: ast.Slice) -> str:
+        container = self.resolve(node.id.token.value)
+        start = self.visit(node.initial) if node.initial else ''
+        end = self.visit(node.final) if node.final else ''
+        return f'{container}[{start}:{end}]'
+
+    def emit_Logical(self, node: ast.Logical) -> str:
+        left = self.visit(node.left)
+        right = self.visit(node.right)
+
+        match node.token.value:
+            case '&&':
+                return f'({left} and {right})'
+            case '||':
+                return f'_or({left}, {right})'
+            case _:
+                return f'({left}, None)[1]'
+
+    def emit_binary(self, node: ast.Relational | ast.Arithmetic) -> str:
+        left = self.visit(node.left)
+        right = self.visit(node.right)
+
+        if node.token.value not in PYTHON_OPERATORS:
+            return f'({left}, {right}, None)[2]'
+        return f'({left} {node.token.value} {right})'
+
+    def emit_Relational(self, node: ast.Relational) -> str:
+        return self.emit_binary(node)
+
+    def emit_Arithmetic(self, node: ast.Arithmetic) -> str:
+        return self.emit_binary(node)
+
+    def emit_Unary(self, node: ast.Unary) -> str:
+        expr = self.visit(node.expr)
+
+        match node.token.value:
+            case '!':
+                return f'(not {expr})'
+            case '-':
+                return f'({expr} * -1)'
+            case _:
+                return f'({expr}, None)[1]'
+
+    def emit_ArrayLiteral(self, node: ast.ArrayLiteral) -> str:
+        return f'[{", ".join(self.visit(value) for value in node.values)}]'
+
+    def emit_DictLiteral(self, node: ast.DictLiteral) -> str:
+        entries = ', '.join(
+            f'{key!r}: {self.visit(value)}'
+            for key, value in node.entries.items()
+        )
+        return f'{{{entries}}}'
+
+    def emit_Comprehention(self, node: ast.Comprehention) -> str:
+        iterable = self.visit(node.iterable)
+        self.scopes.append({})
+        target = self.declare(node.iterator.left.name)
+        expr = self.visit(node.expr)
+        self.scopes.pop()
+        if self.metered:
+            iterable = f'_rt.meter({iterable})'
+        return f'[{expr} for {target} in {iterable}]'
+
+    def emit_ParFor(self, node: ast.ParFor) -> str:
+        iterable = self.visit(node.iterable)
+        # O corpo vira uma função definida antes da instrução que a usa
+        count = self.counters.get('<par for>', 0)
+        self.counters['<par for>'] = count + 1
+        func_name = f'_par_for_{count}'
+        self.emit_function(node.body, func_name)
+        return f'_rt.par_for({func_name}, {iterable}, {node.reduction!r})'
+
+    def emit_Call(self, node: ast.Call) -> str:
+        name = node.oper if node.oper else node.token.value
+        args = [self.visit(arg) for arg in node.args]
+
+        if name in CHANNEL_METHODS:
+            args.insert(0, repr(node.token.value))
+            return f'_rt.{name}({", ".join(args)})'
+
+        if name in RunnerImpl.DEFAULT_FUNCTIONS:
+            if node.oper:
+                args.insert(0, self.visit(node.id))
+            return f'_b_{name}({", ".join(args)})'
+
+        return f'f_{name}({", ".join(args)})'
+
+
+class CodeCache:
+    """
+    Code objects compilados, indexados pelo hash do código-fonte
+    Minipar. Os `max_entries` mais recentes ficam em memória e, com
+    `directory`, todos são guardados também em disco. A chave inclui o
+    código do front-end e do transpilador, então alterações neles
+    invalidam o cache sem intervenção.
+    """
+
+    directory: str | None
+
+    def __init__(self, directory: str | None = None, max_entries: int = 256):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.version = fingerprint((*FRONTEND_MODULES, 'transpiler'))
+        self.entries: OrderedDict[str, CodeType] = OrderedDict()
+        self.lock = threading.Lock()
+
+    def key(self, source: str, metered: bool, optimize: bool) -> str:
+        digest = hashlib.sha256(self.version)
+        # O código com contagem de passos e o sem otimização ficam à parte
+        digest.update(b'1' if metered else b'0')
+        digest.update(b'1' if optimize else b'0')
+        digest.update(source.encode('utf-8'))
+        return digest.hexdigest()
+
+    def load(
+        self, source: str, metered: bool = False, optimize: bool = True
+    ) -> CodeType | None:
+        key = self.key(source, metered, optimize)
+        with self.lock:
+            code = self.entries.get(key)
+            if code is not None:
+                self.entries.move_to_end(key)
+                return code
+        if self.directory is None:
+            return None
+        try:
+            with open(self.path(key), 'rb') as f:
+                code = marshal.load(f)
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        self.remember(key, code)
+        return code
+
+    def store(
+        self,
+        source: str,
+        code: CodeType,
+        metered: bool = False,
+        optimize: bool = True,
+    ):
+        key = self.key(source, metered, optimize)
+        self.remember(key, code)
+        if self.directory is None:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+            with os.fdopen(fd, 'wb') as f:
+                marshal.dump(code, f)
+            os.replace(tmp_path, self.path(key))
+        except OSError:
+            # A camada em disco é opcional: sem permissão de escrita
+            # apenas recompilamos na próxima execução
+            pass
+
+    def remember(self, key: str, code: CodeType):
+        with self.lock:
+            self.entries[key] = code
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}.pyc')
+
+
+# Code objects compartilhados pelas execuções do processo. Com
+# MINIPAR_CACHE_DIR, também são guardados nesse diretório
+CODES = CodeCache(os.environ.get('MINIPAR_CACHE_DIR'))
+
+
+class PythonRunnerImpl(RunnerImpl):
+    functions: dict[str, Callable]
+    cache: CodeCache
+
+    def __init__(self, *args, cache: CodeCache | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.functions = {}
+        self.cache = cache or CODES
+
+    def run(self, node: ast.Program):
+        self.run_code(self.compile_program(node, self.fuel is not None))
+
+    def run_source(
+        self,
+        source: str,
+        frontend: Callable[[str, bool], ast.Program],
+        optimize: bool = True,
+    ):
+        metered = self.fuel is not None
+        code = self.cache.load(source, metered, optimize)
+        if code is None:
+            code = self.compile_program(frontend(source, optimize), metered)
+            self.cache.store(source, code, metered, optimize)
+        self.run_code(code)
+
+    @staticmethod
+    def compile_program(node: ast.Program, metered: bool = False) -> CodeType:
+        source = TranspilerImpl(metered).transpile(node)
+        return compile(source, '<minipar>', 'exec')
+
+    def run_compiled(self, code: CodeType):
+        self.run_code(code)
+
+    def run_code(self, code: CodeType):
+        exec(code, self.namespace())
+
+    def namespace(self) -> dict[str, Any]:
+        """Globais do código gerado, antes das definições do programa"""
+        namespace = {
+            '__name__': '__minipar__',
+            '_rt': self,
+            '_UNSET': _UNSET,
+            '_or': _or,
+            '_tick': self.fuel.consume if self.fuel is not None else None,
+        }
+        namespace.update(
+            (f'_b_{name}', function)
+            for name, function in self.DEFAULT_FUNCTIONS.items()
+        )
+        return namespace
+
+    def execute(self, node: ast.Node):
+        # Usado pelo servidor dos canais para chamar a função associada
+        if not isinstance(node, ast.Call):
+            return super().execute(node)
+        args = [super().execute(arg) for arg in node.args]
+        return self.functions[node.token.value](*args)
+
+    def meter(self, iterable: Iterable) -> Iterator:
+        """Elementos de uma compreensão, consumindo um passo por elemento"""
+        consume = self.fuel.consume
+        for value in iterable:
+            consume()
+            yield value
+
+    def define(self, name: str, function: Callable, return_type: str):
+        if name not in self.functions:
+            self.functions[name] = function
+            self.func_table[name] = ast.FuncDef(name, return_type, {}, [])
+
+    def par(self, *tasks: tuple[Callable | str | None, list]):
+        scheduler = par.scheduler()
+        jobs = []
+        for function, args in tasks:
+            if function is None:
+                continue
+            if isinstance(function, str):
+                jobs.append((
+                    type(self).run_builtin,
+                    (function, args, self.io),
+                ))
+            elif scheduler.kind == 'thread':
+                jobs.append((function, tuple(args)))
+            else:
+                jobs.append((
+                    type(self).run_function,
+                    (export(function), args),
+                ))
+        scheduler.run(jobs, self.io, self.par_fuel(scheduler.kind))
+
+    def par_for(
+        self, function: Callable, iterable, reduction: str | None = None
+    ):
+        scheduler = par.scheduler()
+        if scheduler.kind == 'thread':
+            task, args = _run_chunk, (function,)
+        else:
+            task, args = type(self).run_chunk, (export(function),)
+        return scheduler.map(
+            task,
+            args,
+            list(iterable),
+            reduction,
+            self.io,
+            self.par_fuel(scheduler.kind),
+        )
+
+    def par_fuel(self, kind: str) -> Fuel | None:
+        """
+        Orçamento repartido entre as tarefas do `par`. Em threads, as
+        closures já consomem os passos da própria execução por _tick()
+        """
+        return None if kind == 'thread' else self.fuel
+
+    @classmethod
+    def run_function(
+        cls, exported: Exported, args: list, fuel: Fuel | None = None
+    ):
+        """Tarefa do `par`: recria a função e a chama"""
+        return restore(*exported, fuel)(*args)
+
+    @classmethod
+    def run_chunk(
+        cls,
+        exported: Exported,
+        chunk: list,
+        reduction: str | None,
+        fuel: Fuel | None = None,
+    ):
+        """Tarefa do `par for`: recria o corpo e o executa para o bloco"""
+        return _run_chunk(restore(*exported, fuel), chunk, reduction)
+
+    def cchannel(self, name: str, host: str, port: str):
+        self.exec_CChannel(
+            ast.CChannel(
+                name=name,
+                _host=ast.Constant('STRING', ast.Token('STRING', host)),
+                _port=ast.Constant('NUMBER', ast.Token('NUMBER', port)),
+            )
+        )
+
+    def schannel(  # noqa: PLR0913, PLR0917
+        self,
+        name: str,
+        func_name: str,
+        description: str,
+        host: str,
+        port: str,
+        mode: str = 'thread',
+    ):
+        node = ast.SChannel(
+            name=name,
+            _host=ast.Constant('STRING', ast.Token('STRING', host)),
+            _port=ast.Constant('NUMBER', ast.Token('NUMBER', port)),
+            func_name=func_name,
+            description=ast.Constant(
+                'STRING', ast.Token('STRING', description)
+            ),
+            _mode=ast.Constant('STRING', ast.Token('STRING', mode)),
+        )
+        self.serve(node, description)
@@ -0,0 +1,362 @@
+"""
+Módulo da Máquina Virtual
+
+A máquina virtual executa o bytecode gerado pelo compilador
+(minipar.compiler) em um único laço de despacho, com uma pilha de
+operandos compartilhada e uma pilha explícita de chamadas. Variáveis
+locais ficam em vetores indexados pelo slot calculado na compilação.
+"""
+
+from typing import Any
+
+from minipar import ast, par
+from minipar.compiler import (
+    BINARY_OPERATORS,
+    SLICE_END,
+    SLICE_START,
+    CodeObject,
+    CompilerImpl,
+    Op,
+)
+from minipar.context import ExecutionContext
+from minipar.fuel import Fuel
+from minipar.runner import RunnerImpl
+from minipar.streams import ExecutionIO
+from minipar.symbol import Frame
+
+_DONE = object()
+
+
+class VirtualMachineImpl(RunnerImpl):
+    functions: dict[str, CodeObject]
+    globals: Frame | None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.functions = {}
+        self.globals = None
+
+    def run(self, node: ast.Program):
+        self.run_compiled(self.compile_program(node, self.fuel is not None))
+
+    @staticmethod
+    def compile_program(
+        node: ast.Program, metered: bool = False
+    ) -> CodeObject:
+        return CompilerImpl(metered).compile(node)
+
+    def run_compiled(self, code: CodeObject):
+        self.globals = Frame([None] * code.nlocals, None, 0)
+        self.run_code(code, self.globals)
+
+    def execute(self, node: ast.Node):
+        code = CompilerImpl(self.fuel is not None).compile_expression(node)
+        frame = self.globals or Frame([], None, 0)
+        return self.run_code(code, frame)
+
+    def exec_par(self, tasks: tuple[tuple], frame: Frame):
+        scheduler = par.scheduler()
+        jobs = []
+        for kind, name, thunk in tasks:
+            # Os argumentos são avaliados aqui; só os valores seguem
+            values = self.run_code(thunk, frame)
+            if kind == 'channel':
+                continue
+            if kind != 'function':
+                jobs.append((type(self).run_builtin, (name, values, self.io)))
+                continue
+
+            callee = self.functions.get(name)
+            if callee is None:
+                raise Exception(f'função {name} não definida')
+            needed, captured = par.plan(callee.node, self.func_table)
+            functions = {
+                key: self.functions[key]
+                for key in needed
+                if key in self.functions
+            }
+            link = scheduler.link(frame, callee.level, captured)
+            jobs.append((
+                type(self).run_function,
+                (functions, name, values, link, self.io),
+            ))
+        scheduler.run(jobs, self.io, self.fuel)
+
+    def exec_par_for(
+        self,
+        body: CodeObject,
+        reduction: str | None,
+        iterable: Any,
+        frame: Frame,
+    ):
+        needed, captured = par.plan(body.node, self.func_table)
+        functions = {
+            key: self.functions[key] for key in needed if key in self.functions
+        }
+        scheduler = par.scheduler()
+        link = scheduler.link(frame, body.level, captured)
+        return scheduler.map(
+            type(self).run_chunk,
+            (functions, body, link, self.io),
+            list(iterable),
+            reduction,
+            self.io,
+            self.fuel,
+        )
+
+    @classmethod
+    def worker(
+        cls,
+        functions: dict[str, CodeObject],
+        io: ExecutionIO,
+        fuel: Fuel | None,
+    ) -> 'VirtualMachineImpl':
+        """Máquina de uma tarefa do `par`, só com as funções enviadas"""
+        func_table = {
+            function.name: function.node for function in functions.values()
+        }
+        vm = cls(context=ExecutionContext(func_table, io=io, fuel=fuel))
+        vm.functions = dict(functions)
+        return vm
+
+    @classmethod
+    def run_chunk(  # noqa: PLR0913, PLR0917
+        cls,
+        functions: dict[str, Any],
+        body: CodeObject,
+        link: Frame | None,
+        io: ExecutionIO,
+        chunk: list,
+        reduction: str | None,
+        fuel: Fuel | None = None,
+    ):
+        results = []
+        vm = cls.worker(functions, io, fuel)
+        for value in chunk:
+            frame = Frame([None] * body.nlocals, link, body.level)
+            frame.slots[0] = value
+            results.append(vm.run_code(body, frame, 1))
+        return par.reduce(results, reduction)
+
+    @classmethod
+    def run_function(  # noqa: PLR0913, PLR0917
+        cls,
+        functions: dict[str, Any],
+        name: str,
+        args: list,
+        link: Frame | None,
+        io: ExecutionIO,
+        fuel: Fuel | None = None,
+    ):
+        callee = functions[name]
+        frame = Frame([None] * callee.nlocals, link, callee.level)
+        argc = min(len(args), callee.nparams)
+        frame.slots[:argc] = args[:argc]
+        vm = cls.worker(functions, io, fuel)
+        return vm.run_code(callee, frame, len(args))
+
+    def run_code(self, code: CodeObject, frame: Frame, argc: int = 0):  # noqa: PLR0912, PLR0914, PLR0915
+        LOAD_CONST = int(Op.LOAD_CONST)
+        LOAD_FAST = int(Op.LOAD_FAST)
+        STORE_FAST = int(Op.STORE_FAST)
+        LOAD_DEREF = int(Op.LOAD_DEREF)
+        STORE_DEREF = int(Op.STORE_DEREF)
+        POP_TOP = int(Op.POP_TOP)
+        BINARY_OP = int(Op.BINARY_OP)
+        UNARY_NOT = int(Op.UNARY_NOT)
+        UNARY_NEG = int(Op.UNARY_NEG)
+        BINARY_SUBSCR = int(Op.BINARY_SUBSCR)
+        STORE_SUBSCR = int(Op.STORE_SUBSCR)
+        SLICE = int(Op.SLICE)
+        BUILD_LIST = int(Op.BUILD_LIST)
+        BUILD_MAP = int(Op.BUILD_MAP)
+        LIST_APPEND = int(Op.LIST_APPEND)
+        JUMP = int(Op.JUMP)
+        POP_JUMP_IF_FALSE = int(Op.POP_JUMP_IF_FALSE)
+        POP_JUMP_IF_TRUE = int(Op.POP_JUMP_IF_TRUE)
+        JUMP_IF_FALSE_OR_POP = int(Op.JUMP_IF_FALSE_OR_POP)
+        GET_ITER = int(Op.GET_ITER)
+        FOR_ITER = int(Op.FOR_ITER)
+        CALL_FUNCTION = int(Op.CALL_FUNCTION)
+        CALL_BUILTIN = int(Op.CALL_BUILTIN)
+        CALL_METHOD = int(Op.CALL_METHOD)
+        CALL_CHANNEL = int(Op.CALL_CHANNEL)
+        MAKE_FUNCTION = int(Op.MAKE_FUNCTION)
+        RETURN_VALUE = int(Op.RETURN_VALUE)
+        PAR = int(Op.PAR)
+        EXEC_NODE = int(Op.EXEC_NODE)
+        SERVE = int(Op.SERVE)
+        PAR_FOR = int(Op.PAR_FOR)
+        TICK = int(Op.TICK)
+
+        binary = [function for _, function in BINARY_OPERATORS]
+        builtins = self.DEFAULT_FUNCTIONS
+        functions = self.functions
+        fuel = self.fuel
+        acquire = self.frames.acquire
+        release = self.frames.release
+
+        # Pilha de chamadas: (código, pc, base da pilha, frame)
+        call_stack: list[tuple[CodeObject, int, int, Frame]] = []
+        stack: list[Any] = []
+        push = stack.append
+        pop = stack.pop
+
+        instructions = code.code
+        consts = code.consts
+        locals_ = frame.slots
+        pc = code.entry(argc)
+        base = 0
+
+        while True:
+            op = instructions[pc]
+            arg = instructions[pc + 1]
+            pc += 2
+
+            if op == LOAD_FAST:
+                push(locals_[arg])
+            elif op == LOAD_CONST:
+                push(consts[arg])
+            elif op == STORE_FAST:
+                locals_[arg] = pop()
+            elif op == BINARY_OP:
+                right = pop()
+                stack[-1] = binary[arg](stack[-1], right)
+            elif op == BINARY_SUBSCR:
+                key = pop()
+                stack[-1] = stack[-1][key]
+            elif op == POP_JUMP_IF_FALSE:
+                if not pop():
+                    pc = arg
+            elif op == POP_JUMP_IF_TRUE:
+                if pop():
+                    pc = arg
+            elif op == JUMP:
+                pc = arg
+            elif op == FOR_ITER:
+                value = next(stack[-1], _DONE)
+                if value is _DONE:
+                    pop()
+                    pc = arg
+                else:
+                    push(value)
+            elif op == CALL_BUILTIN:
+                name, argc = code.calls[arg]
+                if argc:
+                    args = stack[-argc:]
+                    del stack[-argc:]
+                    push(builtins[name](*args))
+                else:
+                    push(builtins[name]())
+            elif op == CALL_METHOD:
+                name, argc = code.calls[arg]
+                receiver = pop()
+                args = stack[len(stack) - argc :]
+                del stack[len(stack) - argc :]
+                push(builtins[name](receiver, *args))
+            elif op == CALL_FUNCTION:
+                name, argc = code.calls[arg]
+                callee = functions.get(name)
+                if callee is None:
+                    raise Exception(f'função {name} não definida')
+
+                # Encadeamento estático: o frame da função que contém a
+                # definição do chamado
+                link = frame.up(frame.level - callee.level + 1)
+
+                call_stack.append((code, pc, base, frame))
+                frame = acquire(callee.nlocals, link, callee.level)
+                locals_ = frame.slots
+                if argc:
+                    count = min(argc, callee.nparams)
+                    locals_[:count] = stack[-argc:][:count]
+                    del stack[-argc:]
+
+                code = callee
+                instructions = code.code
+                consts = code.consts
+                base = len(stack)
+                pc = code.entry(argc)
+            elif op == RETURN_VALUE:
+                value = pop()
+                if not call_stack:
+                    return value
+                del stack[base:]
+                release(frame)
+                code, pc, base, frame = call_stack.pop()
+                instructions = code.code
+                consts = code.consts
+                locals_ = frame.slots
+                push(value)
+            elif op == POP_TOP:
+                pop()
+            elif op == JUMP_IF_FALSE_OR_POP:
+                if stack[-1]:
+                    pop()
+                else:
+                    pc = arg
+            elif op == GET_ITER:
+                stack[-1] = iter(stack[-1])
+            elif op == LIST_APPEND:
+                value = pop()
+                stack[-arg].append(value)
+            elif op == LOAD_DEREF:
+                depth, slot = code.cells[arg]
+                push(frame.up(depth).slots[slot])
+            elif op == STORE_DEREF:
+                depth, slot = code.cells[arg]
+                frame.up(depth).slots[slot] = pop()
+            elif op == STORE_SUBSCR:
+                key = pop()
+                container = pop()
+                container[key] = pop()
+            elif op == UNARY_NOT:
+                value = stack[-1]
+                stack[-1] = None if value is None else not value
+            elif op == UNARY_NEG:
+                value = stack[-1]
+                stack[-1] = None if value is None else value * (-1)
+            elif op == SLICE:
+                end = pop() if arg & SLICE_END else None
+                start = pop() if arg & SLICE_START else None
+                stack[-1] = stack[-1][start:end]
+            elif op == BUILD_LIST:
+                if arg:
+                    values = stack[-arg:]
+                    del stack[-arg:]
+                    push(values)
+                else:
+                    push([])
+            elif op == BUILD_MAP:
+                if arg:
+                    items = stack[-2 * arg :]
+                    del stack[-2 * arg :]
+                    push(dict(zip(items[::2], items[1::2])))
+                else:
+                    push({})
+            elif op == CALL_CHANNEL:
+                name, conn_name, argc = code.calls[arg]
+                args = stack[len(stack) - argc :]
+                del stack[len(stack) - argc :]
+                push(getattr(self, name)(conn_name, *args))
+            elif op == MAKE_FUNCTION:
+                function = consts[arg]
+                if function.name not in functions:
+                    functions[function.name] = function
+                    self.func_table[function.name] = function.node
+            elif op == PAR:
+                self.exec_par(consts[arg], frame)
+            elif op == EXEC_NODE:
+                RunnerImpl.execute(self, consts[arg])
+            elif op == SERVE:
+                self.serve(consts[arg], pop())
+            elif op == PAR_FOR:
+                body, reduction = consts[arg]
+                push(self.exec_par_for(body, reduction, pop(), frame))
+            elif op == TICK:
+                # Só existe no código compilado com orçamento; as tarefas
+                # do par rodam sem ele
+                if fuel is not None:
+                    fuel.consume()
+            else:
+                raise Exception(f'instrução {op} desconhecida')
@@ -0,0 +1,33 @@
+from minipar import ast
+from minipar.interpreter import BACKENDS, PROGRAMS, Minipar
+
+SOURCE = """
+func dobro(x: number) -> number {
+  return x * 2
+}
+var xs: list = [1, 2, 3]
+xs.append(dobro(pow(2, 3)))
+for (var x: number in xs) {
+  print(dobro(x))
+}
+"""
+
+
+def snapshot(node: ast.Node) -> list[tuple[ast.Node, dict]]:
+    """Cada nó da árvore com uma cópia rasa dos seus atributos"""
+    nodes = [(node, dict(vars(node)))]
+    for child in ast.iter_children(node):
+        nodes.extend(snapshot(child))
+    return nodes
+
+
+def test_running_leaves_the_cached_program_untouched():
+    # Todos os backends executam a mesma AST guardada no cache
+    program = PROGRAMS.load(SOURCE, True, Minipar.analyse)
+    before = snapshot(program)
+    minipar = Minipar()
+    for backend in BACKENDS:
+        assert minipar.run(SOURCE, backend=backend) == '2\n4\n6\n32\n'
+    assert PROGRAMS.load(SOURCE, True, Minipar.analyse) is program
+    for node, attributes in before:
+        assert vars(node) == attributes
@@ -0,0 +1,81 @@
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import pytest
+
+from minipar import channel
+from minipar.interpreter import BACKENDS, Minipar
+
+PROGRAM = """
+func eco(mensagem: string) -> string {
+  var propria: string = mensagem
+  var i: number = 0
+  while (i < 100) {
+    i = i + 1
+  }
+  # Cede a vez aos outros handlers antes de ler a variável local
+  sleep(0.001)
+  return propria
+}
+s_channel servidor {eco, "ECO", "localhost", PORT, "MODE"}
+"""
+
+CLIENTS = 6
+MESSAGES = 20
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+        probe.bind(('localhost', 0))
+        return probe.getsockname()[1]
+
+
+def start_server(backend: str, mode: str) -> int:
+    port = free_port()
+    source = PROGRAM.replace('PORT', str(port)).replace('MODE', mode)
+    threading.Thread(
+        target=Minipar().run,
+        args=(source,),
+        kwargs={'backend': backend},
+        daemon=True,
+    ).start()
+
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('localhost', port)).close()
+            return port
+        except OSError:
+            time.sleep(0.05)
+    pytest.fail(f'o servidor do backend {backend} não subiu')
+
+
+def client(port: int, index: int) -> list[str]:
+    """Envia as mensagens do cliente e devolve as respostas trocadas"""
+    conn = channel.ClientConnection(
+        socket.create_connection(('localhost', port))
+    )
+    wrong = []
+    try:
+        assert conn.receive() == 'ECO'
+        for count in range(MESSAGES):
+            message = f'cliente{index}-{count}'
+            reply = conn.reply(conn.request(message))
+            if reply != message:
+                wrong.append(f'{message} recebeu {reply}')
+    finally:
+        conn.close()
+    return wrong
+
+
+@pytest.mark.parametrize('mode', ['thread', 'async'])
+@pytest.mark.parametrize('backend', list(BACKENDS))
+def test_each_client_gets_its_own_reply(backend: str, mode: str):
+    port = start_server(backend, mode)
+    with ThreadPoolExecutor(CLIENTS) as executor:
+        replies = executor.map(partial(client, port), range(CLIENTS))
+        wrong = [reply for client_wrong in replies for reply in client_wrong]
+    assert not wrong
@@ -0,0 +1,27 @@
+from pathlib import Path
+
+import pytest
+
+from minipar.interpreter import BACKENDS, Minipar
+
+EXAMPLES = Path(__file__).resolve().parent.parent / 'examples' / 'minipar'
+
+# Passos suficientes para o exemplo terminar; um laço que não para
+# esgota o combustível em vez de travar a suíte
+FUEL = 1_000_000
+
+# Linhas impressas até a rede acertar a saída desejada
+SIMPLE_NN_LINES = 308
+
+
+@pytest.mark.parametrize('backend', list(BACKENDS))
+def test_simple_nn_learns_and_stops(backend: str):
+    source = (EXAMPLES / 'simple_nn.minipar').read_text()
+    lines = Minipar().run(source, backend=backend, fuel=FUEL).splitlines()
+    assert len(lines) == SIMPLE_NN_LINES
+    assert lines[-4:] == [
+        'Saída:  0',
+        'Erro:  0',
+        'Parabéns!! A Rede de um Neurônio Aprendeu',
+        'Valor desejado:  0',
+    ]
@@ -0,0 +1,74 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from minipar.execution import ExecutionPool
+
+SPIN = """
+func spin(n: number) -> number {
+  var i: number = 0
+  while (true) {
+    i = i + n
+  }
+  return i
+}
+par {
+  spin(1)
+  spin(2)
+}
+"""
+
+# Forkserver do trabalhador e ao menos um processo do `par`
+PAR_PROCESSES = 2
+
+
+def processes() -> dict[int, tuple[str, int]]:
+    """Estado e processo pai de cada processo, lidos de /proc"""
+    table = {}
+    for stat in Path('/proc').glob('[0-9]*/stat'):
+        try:
+            text = stat.read_text()
+        except OSError:
+            continue
+        # Os campos seguem o nome do executável, que pode ter espaços
+        state, parent = text.rpartition(')')[2].split()[:2]
+        table[int(stat.parent.name)] = (state, int(parent))
+    return table
+
+
+def descendants(pid: int) -> set[int]:
+    table = processes()
+    found = {pid}
+    size = 0
+    while size != len(found):
+        size = len(found)
+        found |= {
+            child for child, (_, parent) in table.items() if parent in found
+        }
+    return found - {pid}
+
+
+def running(pids: set[int]) -> set[int]:
+    table = processes()
+    return {pid for pid in pids if pid in table and table[pid][0] != 'Z'}
+
+
+@pytest.mark.skipif(not Path('/proc').is_dir(), reason='precisa de /proc')
+def test_timeout_kills_the_par_processes_of_the_worker():
+    pool = ExecutionPool(workers=1, timeout=3)
+    pool.start()
+    try:
+        worker = pool.pool[0].process.pid
+        with ThreadPoolExecutor(1) as executor:
+            future = executor.submit(pool.run, SPIN)
+            children: set[int] = set()
+            while len(children) < PAR_PROCESSES and not future.done():
+                children |= descendants(worker)
+                time.sleep(0.05)
+            assert 'Tempo limite' in future.result()
+        assert len(children) >= PAR_PROCESSES
+        assert not running(children)
+    finally:
+        pool.shutdown()
@@ -0,0 +1,130 @@
+import tracemalloc
+
+import pytest
+
+from minipar import par
+from minipar.fuel import Fuel
+from minipar.interpreter import BACKENDS, Minipar
+
+LOOP = """
+func loop(n: number) -> number {
+  var total: number = 0
+  for (var i: number in range(n)) {
+    total = total + i
+  }
+  return total
+}
+"""
+
+PAR = (
+    LOOP
+    + """
+par {
+  loop(10)
+  loop(N)
+}
+"""
+)
+
+PAR_FOR = (
+    LOOP
+    + """
+var sizes: list = [10, N]
+var totals: list = par for (var n: number in sizes) -> number {
+  return loop(n)
+}
+print(totals)
+"""
+)
+
+# Três tarefas com mais passos, somadas, do que o orçamento
+SPLIT = (
+    LOOP
+    + """
+par {
+  loop(N)
+  loop(N)
+  loop(N)
+}
+"""
+)
+
+# Os passos das tarefas contam para o que vem depois do bloco
+CHARGED = (
+    LOOP
+    + """
+par {
+  loop(300)
+  loop(300)
+}
+print(loop(N))
+"""
+)
+
+COMPREHENSION = """
+var xs: list = [for (var i: number in range(500)) -> i * 2]
+print(len(xs))
+"""
+
+
+def test_memory_budgets_share_tracemalloc():
+    first = Fuel(memory=1 << 30)
+    second = Fuel(memory=1 << 30)
+    first.close()
+    assert tracemalloc.is_tracing()
+    second.close()
+    assert not tracemalloc.is_tracing()
+
+
+@pytest.mark.parametrize('kind', par.KINDS)
+@pytest.mark.parametrize('source', [PAR, PAR_FOR], ids=['par', 'par for'])
+def test_par_tasks_are_metered(source: str, kind: str):
+    par.configure(kind, 2)
+    try:
+        minipar = Minipar()
+        for backend in BACKENDS:
+            output = minipar.run(
+                source.replace('N', '100000'), backend=backend, fuel=1000
+            )
+            assert output.endswith(
+                'limite de 1000 passos de execução excedido\n'
+            )
+            output = minipar.run(
+                source.replace('N', '100'), backend=backend, fuel=1000
+            )
+            assert 'erro' not in output
+    finally:
+        par.configure()
+
+
+@pytest.mark.parametrize('kind', par.KINDS)
+def test_par_tasks_split_the_fuel_and_charge_it_back(kind: str):
+    par.configure(kind, 2)
+    try:
+        minipar = Minipar()
+        for backend in BACKENDS:
+            for source, over, under in [
+                (SPLIT, '400', '200'),
+                (CHARGED, '500', '300'),
+            ]:
+                output = minipar.run(
+                    source.replace('N', over), backend=backend, fuel=1000
+                )
+                assert output.endswith(
+                    'limite de 1000 passos de execução excedido\n'
+                ), backend
+                output = minipar.run(
+                    source.replace('N', under), backend=backend, fuel=1000
+                )
+                assert 'erro' not in output, backend
+    finally:
+        par.configure()
+
+
+def test_comprehensions_consume_one_step_per_element():
+    minipar = Minipar()
+    for backend in BACKENDS:
+        output = minipar.run(COMPREHENSION, backend=backend, fuel=499)
+        assert output.endswith('excedido\n'), backend
+        output = minipar.run(COMPREHENSION, backend=backend, fuel=500)
+        assert output == '500\n', backend
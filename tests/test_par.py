@@ -0,0 +1,113 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from minipar import par
+from minipar.interpreter import BACKENDS, Minipar
+
+SOURCE = """
+func f(x: number) -> number {
+  return pow(x, 2)
+}
+print(f(3))
+par {
+  f(4)
+  print(f(5))
+}
+var r: list = par for (var i: number in range(1, 4)) -> number {
+  return f(i)
+}
+print(r)
+"""
+
+
+@pytest.fixture(scope='module')
+def process_pool():
+    scheduler = par.configure('process', 2)
+    yield scheduler
+    par.configure()
+
+
+@pytest.mark.usefixtures('process_pool')
+def test_par_after_sequential_call_in_every_backend():
+    # Todos os backends usam a mesma AST em cache: o que um deles guarda
+    # nela ao chamar `f` não pode impedir que outro a envie ao pool
+    minipar = Minipar()
+    for backend in [*BACKENDS, *BACKENDS]:
+        assert minipar.run(SOURCE, backend=backend) == '9\n25\n[1, 4, 9]\n'
+
+
+@pytest.mark.usefixtures('process_pool')
+def test_concurrent_python_runs_keep_their_tasks():
+    # Cada execução envia as próprias funções ao pool, sem estado global
+    # compartilhado entre execuções simultâneas
+    template = """
+func f(x: number) -> number {
+  return x * FACTOR
+}
+par {
+  print(f(1))
+  print(f(2))
+}
+"""
+    sources = [template.replace('FACTOR', str(n)) for n in range(1, 9)]
+    with ThreadPoolExecutor(4) as executor:
+        outputs = list(
+            executor.map(
+                lambda source: Minipar().run(source, backend='python'),
+                sources,
+            )
+        )
+    assert outputs == [f'{n}\n{2 * n}\n' for n in range(1, 9)]
+
+
+@pytest.mark.usefixtures('process_pool')
+def test_par_ships_only_the_outer_variables_it_uses():
+    # `k` e `pares` não podem ser serializados, mas nenhuma tarefa os usa
+    source = """
+var d: dict = {"a": 1, "b": 2}
+var k: list = keys(d)
+var factor: number = 3
+func scale(x: number) -> number {
+  print(x * factor)
+  return 0
+}
+func outer(base: number) -> number {
+  var pares: list = items(d)
+  func inner(x: number) -> number {
+    print(x * factor + base)
+    return 0
+  }
+  par {
+    inner(1)
+    scale(2)
+  }
+  return 0
+}
+factor = 4
+outer(10)
+"""
+    minipar = Minipar()
+    for backend in BACKENDS:
+        assert minipar.run(source, backend=backend) == '14\n8\n', backend
+
+
+@pytest.mark.usefixtures('process_pool')
+def test_par_for_ships_only_the_outer_variables_it_uses():
+    source = """
+var notas: dict = {"ana": 7, "bia": 9}
+var nomes: list = keys(notas)
+var bonus: number = 1
+bonus = bonus + 1
+var r: list = par for (var i: number in range(4)) -> number {
+  return i + bonus
+}
+print(r)
+var total: number = par sum for (var i: number in range(4)) -> number {
+  return i * bonus
+}
+print(total)
+"""
+    minipar = Minipar()
+    for backend in BACKENDS:
+        assert minipar.run(source, backend=backend) == '[2, 3, 4, 5]\n12\n'
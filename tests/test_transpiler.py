@@ -0,0 +1,17 @@
+from minipar.interpreter import BACKENDS, Minipar
+
+# A declaração interna de `a` não pode ganhar o nome Python de `a_1`
+SHADOWING = """
+var a: number = 0
+var a_1: number = 5
+if (true) {
+  var a: number = 7
+}
+print(a_1)
+"""
+
+
+def test_shadowed_names_do_not_clash_with_user_names():
+    minipar = Minipar()
+    for backend in BACKENDS:
+        assert minipar.run(SHADOWING, backend=backend) == '5\n', backend